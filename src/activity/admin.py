@@ -2,7 +2,7 @@ from django.contrib.admin import ModelAdmin, register
 
 from csvexport.actions import csvexport
 
-from activity.models import Activity
+from activity.models import Activity, TrackBalance, TrackCheckpoint, TrackRollup
 
 
 @register(Activity)
@@ -15,3 +15,42 @@ class ActivityAdmin(ModelAdmin):
     ordering = ("activity_date", "billig_amount")
     search_fields = ("^id", "^track_id")
     actions = (csvexport,)
+
+
+@register(TrackBalance)
+class TrackBalanceAdmin(ModelAdmin):
+    list_display = (
+        "track_id",
+        "amount",
+        "last_status",
+        "last_activity_date",
+    )
+    ordering = ("track_id",)
+    search_fields = ("^track_id",)
+
+
+@register(TrackCheckpoint)
+class TrackCheckpointAdmin(ModelAdmin):
+    list_display = (
+        "track_id",
+        "checkpoint_date",
+        "amount",
+        "last_status",
+    )
+    ordering = ("track_id", "checkpoint_date")
+    search_fields = ("^track_id",)
+
+
+@register(TrackRollup)
+class TrackRollupAdmin(ModelAdmin):
+    list_display = (
+        "track_id",
+        "granularity",
+        "bucket_start",
+        "amount_s",
+        "amount_r",
+        "last_status",
+    )
+    list_filter = ("granularity",)
+    ordering = ("track_id", "granularity", "bucket_start")
+    search_fields = ("^track_id",)
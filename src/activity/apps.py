@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = "activity"
+
+    def ready(self):
+        from activity.tools.caches import activity_cache
+        from core.metrics import request_metrics
+
+        request_metrics.register_collector(activity_cache.metrics)
@@ -0,0 +1,20 @@
+from typing import List
+
+from django.urls import path
+
+from activity.async_views import (
+    activity_aggregate_batch_async_view,
+    activity_retrieve_async_view,
+)
+
+
+urlpatterns: List[path] = [
+    path(
+        "aggregate/",
+        activity_aggregate_batch_async_view,
+        name="activity_aggregate_batch_async",
+    ),
+    path(
+        "<str:track_id>/", activity_retrieve_async_view, name="activity_aggregate_async"
+    ),
+]
@@ -0,0 +1,90 @@
+import json
+from typing import Callable
+
+from django.db import close_old_connections
+from django.http import HttpRequest, HttpResponse, HttpResponseNotAllowed, JsonResponse
+
+from asgiref.sync import sync_to_async
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+from rest_framework.utils.encoders import JSONEncoder
+
+from activity.conditional import not_modified, version_headers
+from activity.exceptions.activity_exceptions import TrackIDDoesNotExists
+from activity.serializers import ActivityAggregateBatchSerializer
+from activity.tools.readers import activity_reader
+
+
+def database_sync_to_async(func: Callable) -> Callable:
+    # ORM calls run in the shared thread pool instead of the single
+    # thread-sensitive executor, so reads from many requests can overlap.
+    # Connections live in pool threads, so they are cleaned up the same way
+    # as at the end of a sync request.
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=False)
+
+
+def json_response(data: dict, status: int, **kwargs) -> JsonResponse:
+    # Same encoding as DRF JSONRenderer used by the sync views.
+    return JsonResponse(
+        data,
+        status=status,
+        encoder=JSONEncoder,
+        json_dumps_params={"separators": (",", ":")},
+        **kwargs,
+    )
+
+
+async def activity_retrieve_async_view(
+    request: HttpRequest, track_id: str
+) -> HttpResponse:
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    try:
+        aggregated_data, hit, version = await database_sync_to_async(
+            activity_reader.retrieve
+        )(track_id=track_id)
+    except TrackIDDoesNotExists:
+        return json_response(
+            {"message": f"Track ID {track_id} does not exists"},
+            HTTP_404_NOT_FOUND,
+        )
+    response = not_modified(request=request, version=version)
+    if response is not None:
+        return response
+    return json_response(
+        aggregated_data,
+        HTTP_200_OK,
+        headers={
+            **version_headers(version=version),
+            "X-Cache": "HIT" if hit else "MISS",
+        },
+    )
+
+
+async def activity_aggregate_batch_async_view(request: HttpRequest) -> HttpResponse:
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return json_response({"message": "Invalid JSON"}, HTTP_400_BAD_REQUEST)
+    serializer = ActivityAggregateBatchSerializer(data=data)
+    if not serializer.is_valid():
+        return json_response(serializer.errors, HTTP_400_BAD_REQUEST)
+
+    track_ids = list(dict.fromkeys(serializer.validated_data["track_ids"]))
+    return json_response(
+        await database_sync_to_async(activity_reader.retrieve_many)(
+            track_ids=track_ids
+        ),
+        HTTP_200_OK,
+    )
+
+
+activity_aggregate_batch_async_view.csrf_exempt = True  # type: ignore
@@ -0,0 +1,34 @@
+import calendar
+from datetime import datetime
+from typing import Dict, Optional
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def version_headers(version: datetime) -> Dict[str, str]:
+    # Versions are naive UTC times of the last change of a track balance.
+    return {
+        "ETag": f'"{version:%Y%m%d%H%M%S%f}"',
+        "Last-Modified": http_date(calendar.timegm(version.utctimetuple())),
+    }
+
+
+def not_modified(
+    request: HttpRequest, version: Optional[datetime]
+) -> Optional[HttpResponse]:
+    # 304 (or 412 for a failed If-Match) when the client already has this
+    # version, evaluated by Django the same way as the condition decorator.
+    if version is None:
+        return None
+    headers = version_headers(version=version)
+    response = get_conditional_response(
+        request,
+        etag=headers["ETag"],
+        last_modified=calendar.timegm(version.utctimetuple()),
+    )
+    if response is not None:
+        for name, value in headers.items():
+            response[name] = value
+    return response
@@ -1,2 +1,14 @@
 class TrackIDDoesNotExists(Exception):
     pass
+
+
+class InvalidActivity(Exception):
+    pass
+
+
+class ActivityIDConflict(Exception):
+    pass
+
+
+class ActivitiesArchived(Exception):
+    pass
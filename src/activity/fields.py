@@ -0,0 +1,122 @@
+from decimal import Context, Decimal, InvalidOperation
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import BigIntegerField, SmallIntegerField
+
+
+def compact_storage() -> bool:
+    return settings.ACTIVITY_COMPACT_STORAGE
+
+
+class StatusField(SmallIntegerField):
+    # Stores one-letter statuses as small integer codes with compact storage,
+    # as they are in a one-letter column otherwise. Python code, lookups and
+    # the API keep using the letters. Unknown statuses are stored as NULL, so
+    # they fail on the NOT NULL constraint and match nothing in lookups.
+    def __init__(self, *args, codes: Optional[Dict[str, int]] = None, **kwargs):
+        self.codes = dict(codes or {})
+        self.statuses = {code: status for status, code in self.codes.items()}
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["codes"] = self.codes
+        return name, path, args, kwargs
+
+    def get_internal_type(self) -> str:
+        return "SmallIntegerField" if compact_storage() else "CharField"
+
+    def db_type_parameters(self, connection) -> dict:
+        # The one-letter column.
+        return {**super().db_type_parameters(connection), "max_length": 1}
+
+    @property
+    def validators(self):
+        # Range validators of integer fields cannot compare letters.
+        return [*self.default_validators, *self._validators]
+
+    def from_db_value(self, value, expression, connection):
+        if value is None or not compact_storage():
+            return value
+        return self.statuses[value]
+
+    def to_python(self, value):
+        if value is None or value in self.codes:
+            return value
+        if value in self.statuses:
+            return self.statuses[value]
+        raise ValidationError(
+            self.error_messages["invalid_choice"],
+            code="invalid_choice",
+            params={"value": value},
+        )
+
+    def get_prep_value(self, value):
+        if value is None or value not in self.codes:
+            return None
+        return self.codes[value] if compact_storage() else value
+
+
+class CentsField(BigIntegerField):
+    # Stores a fixed-point amount as a whole number of its smallest units
+    # with compact storage, as a numeric column otherwise. In Python it stays
+    # a Decimal with decimal_places digits.
+    def __init__(
+        self,
+        *args,
+        max_digits: Optional[int] = None,
+        decimal_places: int = 2,
+        **kwargs,
+    ):
+        self.max_digits = max_digits
+        self.decimal_places = decimal_places
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs["max_digits"] = self.max_digits
+        kwargs["decimal_places"] = self.decimal_places
+        return name, path, args, kwargs
+
+    @property
+    def validators(self):
+        return [*self.default_validators, *self._validators]
+
+    def get_internal_type(self) -> str:
+        return "BigIntegerField" if compact_storage() else "DecimalField"
+
+    @property
+    def context(self) -> Context:
+        # Used by converters of decimal columns, as of DecimalField.
+        return Context(prec=self.max_digits)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        if not compact_storage():
+            return Decimal(value)
+        return Decimal(value).scaleb(-self.decimal_places)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, Decimal):
+            return value
+        try:
+            if isinstance(value, float):
+                return Decimal(repr(value))
+            return Decimal(value)
+        except (InvalidOperation, TypeError, ValueError):
+            raise ValidationError(
+                self.error_messages["invalid"],
+                code="invalid",
+                params={"value": value},
+            )
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+        amount = self.to_python(value)
+        if not compact_storage():
+            return amount
+        return int(amount.scaleb(self.decimal_places).to_integral_value())
@@ -0,0 +1,97 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.status import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_409_CONFLICT,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
+
+from activity.models import IdempotencyKey
+
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# A request which died without storing its response frees its key after that.
+PENDING_TIMEOUT = timedelta(seconds=60)
+
+
+def _fingerprint(request: Request) -> str:
+    payload = json.dumps(
+        [request.path, sorted(request.query_params.lists()), request.data],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def idempotent(method):
+    # The first response to a key is stored and replayed for every retry with
+    # the same key and request, so a retried batch is never written twice.
+    @wraps(method)
+    def wrapper(view, request: Request, *args, **kwargs) -> Response:
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if key is None:
+            return method(view, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"message": f"Invalid {IDEMPOTENCY_KEY_HEADER}"}, HTTP_400_BAD_REQUEST
+            )
+
+        # Records are rows with a unique key, unlike cache entries they are
+        # neither evicted nor cleared before they expire.
+        records = IdempotencyKey.objects.filter(path=request.path, key=key)
+        fingerprint = _fingerprint(request=request)
+        now = timezone.now()
+        records.filter(expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    path=request.path,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + PENDING_TIMEOUT,
+                )
+        except IntegrityError:
+            stored = records.first()
+            if stored is not None and stored.fingerprint != fingerprint:
+                return Response(
+                    {"message": "Key was already used for a different request"},
+                    HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if stored is None or stored.status is None:
+                return Response(
+                    {"message": "Request with this key is in progress"},
+                    HTTP_409_CONFLICT,
+                )
+            return Response(
+                stored.data,
+                stored.status,
+                headers={"Idempotent-Replayed": "true"},
+            )
+
+        try:
+            response = method(view, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            records.filter(pk=record.pk).update(
+                status=response.status_code,
+                data=response.data,
+                expires_at=timezone.now()
+                + timedelta(seconds=settings.ACTIVITY_IDEMPOTENCY_TTL),
+            )
+        return response
+
+    return wrapper
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from activity.tools.partitions import activity_partitioner
+from activity.tools.shards import activity_shards
+
+
+def parse_month(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m")
+
+
+class Command(BaseCommand):
+    help = (
+        "Create monthly activity partitions ahead of time and detach old ones, "
+        "run it once a day"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=3,
+            help="Number of months to create partitions for after the current one",
+        )
+        parser.add_argument(
+            "--cover-default",
+            action="store_true",
+            help="Move activities from the default partition to monthly ones",
+        )
+        parser.add_argument(
+            "--detach-before",
+            type=parse_month,
+            help="Detach partitions of months before this one (YYYY-MM)",
+        )
+        parser.add_argument(
+            "--drop",
+            action="store_true",
+            help="Drop detached partitions instead of moving them to the archive",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Activities are partitioned only on PostgreSQL")
+        if options["ahead"] < 0:
+            raise CommandError("--ahead cannot be negative")
+        if options["detach_before"] is not None:
+            if options["detach_before"] > activity_partitioner.month(timezone.now()):
+                raise CommandError("Only partitions of past months can be detached")
+
+        for alias in activity_shards.shards:
+            with activity_shards.using(alias=alias):
+                self._maintain(alias=alias, options=options)
+        self.stdout.write(self.style.SUCCESS("Activity partitions are up to date"))
+
+    def _maintain(self, alias: str, options: dict) -> None:
+        created = activity_partitioner.create_ahead(months=options["ahead"])
+        if options["cover_default"]:
+            created += activity_partitioner.cover_default()
+        for name in created:
+            self.stdout.write(f"Created {name} on {alias}")
+
+        if options["detach_before"] is not None:
+            detached = activity_partitioner.detach(
+                before=options["detach_before"], drop=options["drop"]
+            )
+            action = "Dropped" if options["drop"] else "Archived"
+            for name in detached:
+                self.stdout.write(f"{action} {name} on {alias}")
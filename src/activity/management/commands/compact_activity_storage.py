@@ -0,0 +1,97 @@
+from typing import Dict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import CharField, DecimalField, Field
+
+from activity.models import STATUS_CODES, STATUSES, Activity
+from activity.operations import alter_field_using
+from activity.tools.shards import activity_shards
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert activities of databases migrated without "
+        "ACTIVITY_COMPACT_STORAGE to status codes and amounts in cents, "
+        "run it in a maintenance window with workers stopped"
+    )
+
+    def handle(self, *args, **options):
+        if not settings.ACTIVITY_COMPACT_STORAGE:
+            raise CommandError(
+                "Set ACTIVITY_COMPACT_STORAGE=True for this command and for the "
+                "workers started after it"
+            )
+        for alias in activity_shards.shards:
+            try:
+                converted = self._compact(alias=alias)
+            except ValueError as error:
+                raise CommandError(f"{error} (on {alias})")
+            if converted:
+                self.stdout.write(f"Converted {', '.join(converted)} on {alias}")
+            else:
+                self.stdout.write(f"Activities on {alias} are already compact")
+        self.stdout.write(self.style.SUCCESS("Activities are stored compactly"))
+
+    def _compact(self, alias: str) -> list:
+        # Both columns change in one transaction. On PostgreSQL the table and
+        # its partitions stay locked until the rewrite is done.
+        connection = connections[alias]
+        stored_types = self._stored_types(alias=alias)
+        statuses = ", ".join(f"'{status}'" for status in STATUS_CODES)
+        conversions = [
+            (
+                self._old_field(
+                    CharField(max_length=1, choices=STATUSES, blank=True), "status"
+                ),
+                "CASE status "
+                + " ".join(
+                    f"WHEN '{status}' THEN {code}"
+                    for status, code in STATUS_CODES.items()
+                )
+                + " END",
+                f"status NOT IN ({statuses})",
+            ),
+            (
+                self._old_field(
+                    DecimalField(max_digits=8, decimal_places=2), "billig_amount"
+                ),
+                "round(billig_amount * 100)",
+                None,
+            ),
+        ]
+        converted = []
+        with connection.schema_editor() as schema_editor:
+            for old_field, using, invalid in conversions:
+                new_field = Activity._meta.get_field(old_field.name)
+                if stored_types[old_field.column] == new_field.get_internal_type():
+                    continue
+                alter_field_using(
+                    schema_editor,
+                    model=Activity,
+                    old_field=old_field,
+                    new_field=new_field,
+                    using=using,
+                    invalid=invalid,
+                )
+                converted.append(old_field.name)
+        return converted
+
+    @staticmethod
+    def _old_field(field: Field, name: str) -> Field:
+        field.set_attributes_from_name(name)
+        field.model = Activity
+        return field
+
+    @staticmethod
+    def _stored_types(alias: str) -> Dict[str, str]:
+        connection = connections[alias]
+        introspection = connection.introspection
+        with connection.cursor() as cursor:
+            return {
+                column.name: introspection.get_field_type(column.type_code, column)
+                for column in introspection.get_table_description(
+                    cursor, Activity._meta.db_table
+                )
+            }
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from activity.exceptions.activity_exceptions import ActivitiesArchived
+from activity.tools.checkpoints import activity_checkpointer
+from activity.tools.partitions import activity_partitioner
+from activity.tools.shards import activity_shards
+
+
+class Command(BaseCommand):
+    help = (
+        "Create daily track balance checkpoints up to the given day, run it once "
+        "a day after midnight"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--until",
+            type=datetime.fromisoformat,
+            help="Last checkpoint day (YYYY-MM-DD), today by default",
+        )
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="Drop all checkpoints and recreate them from stored activities",
+        )
+
+    def handle(self, *args, **options):
+        until = options["until"]
+        if until is not None and until > activity_checkpointer.latest_boundary():
+            raise CommandError("Checkpoints can be created only for past days")
+
+        if options["backfill"]:
+            try:
+                activity_partitioner.check_shards_complete()
+            except ActivitiesArchived as error:
+                raise CommandError(str(error))
+
+        created = 0
+        for alias in activity_shards.shards:
+            with activity_shards.using(alias=alias):
+                try:
+                    if options["backfill"]:
+                        created += activity_checkpointer.backfill(until=until)
+                    else:
+                        created += activity_checkpointer.create(until=until)
+                except ActivitiesArchived as error:
+                    # The first run on a shard backfills.
+                    raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f"Created {created} track checkpoints"))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from activity.tools.queues import activity_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Store activities accepted in queue ingest mode, coalescing queued "
+        "requests into batched inserts. Runs until stopped unless --once is given"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=activity_queue.batch_size,
+            help="Maximum number of activities stored in one transaction",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait for new entries when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit as soon as the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size has to be positive")
+
+        while True:
+            report = activity_queue.drain(batch_size=options["batch_size"])
+            if report.entries:
+                self.stdout.write(
+                    f"Stored {report.created} of {report.activities} activities "
+                    f"from {report.entries} requests"
+                )
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS("Activity queue is empty"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from activity.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete stored responses of Idempotency-Key requests which expired"
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.filter(
+            expires_at__lte=timezone.now()
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} idempotency keys"))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from activity.exceptions.activity_exceptions import ActivityIDConflict
+from activity.tools.rebalancers import activity_rebalancer
+
+
+class Command(BaseCommand):
+    help = (
+        "Move tracks to the shards they belong to after shards were added, run "
+        "it once all workers use the new DB_SHARD_HOSTS"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report tracks that would be moved",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = activity_rebalancer.rebalance(dry_run=options["dry_run"])
+        except ActivityIDConflict as error:
+            raise CommandError(str(error))
+
+        action = "Would move" if options["dry_run"] else "Moved"
+        for (source, target), tracks in sorted(report.moves.items()):
+            self.stdout.write(f"{action} {tracks} tracks from {source} to {target}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} {report.tracks} tracks, {report.activities} activities"
+            )
+        )
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from activity.exceptions.activity_exceptions import ActivitiesArchived
+from activity.tools.balances import activity_balancer
+from activity.tools.partitions import activity_partitioner
+from activity.tools.shards import activity_shards
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify track balances from stored activities"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--track-id",
+            action="append",
+            dest="track_ids",
+            help="Limit to given track ID, can be used multiple times",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only compare stored balances with activities, do not write",
+        )
+
+    def handle(self, *args, **options):
+        track_ids = options["track_ids"]
+        try:
+            activity_partitioner.check_shards_complete()
+        except ActivitiesArchived as error:
+            raise CommandError(str(error))
+        if options["verify"]:
+            mismatched = []
+            for alias in activity_shards.shards:
+                with activity_shards.using(alias=alias):
+                    mismatched += activity_balancer.verify(track_ids=track_ids)
+            if mismatched:
+                raise CommandError(
+                    f"{len(mismatched)} track balances out of sync: "
+                    f"{', '.join(sorted(mismatched))}"
+                )
+            self.stdout.write(self.style.SUCCESS("All track balances are in sync"))
+        else:
+            rebuilt = 0
+            for alias in activity_shards.shards:
+                with activity_shards.using(alias=alias):
+                    rebuilt += activity_balancer.rebuild(track_ids=track_ids)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} track balances"))
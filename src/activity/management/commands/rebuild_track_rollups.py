@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from activity.exceptions.activity_exceptions import ActivitiesArchived
+from activity.tools.partitions import activity_partitioner
+from activity.tools.rollups import activity_rollups
+from activity.tools.shards import activity_shards
+
+
+class Command(BaseCommand):
+    help = "Rebuild hourly and daily track rollups from stored activities"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--track-id",
+            action="append",
+            dest="track_ids",
+            help="Limit to given track ID, can be used multiple times",
+        )
+        parser.add_argument(
+            "--since",
+            type=datetime.fromisoformat,
+            help="First day (YYYY-MM-DD) to rebuild, older rollups are kept",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            activity_partitioner.check_shards_complete(since=options["since"])
+        except ActivitiesArchived as error:
+            raise CommandError(str(error))
+
+        created = 0
+        for alias in activity_shards.shards:
+            with activity_shards.using(alias=alias):
+                created += activity_rollups.rebuild(
+                    track_ids=options["track_ids"], since=options["since"]
+                )
+        self.stdout.write(self.style.SUCCESS(f"Created {created} track rollups"))
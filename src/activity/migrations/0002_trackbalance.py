@@ -0,0 +1,58 @@
+# Generated by Django 3.2 on 2026-10-18 07:43
+
+from django.db import migrations, models
+
+
+BACKFILL_TRACK_BALANCES = """
+INSERT INTO activity_trackbalance (track_id, amount, last_status, last_activity_date)
+SELECT DISTINCT ON (track_id)
+    track_id,
+    SUM(
+        CASE status
+            WHEN 'S' THEN billig_amount
+            WHEN 'R' THEN -billig_amount
+            ELSE 0
+        END
+    ) OVER (PARTITION BY track_id),
+    status,
+    activity_date
+FROM activity_activity
+ORDER BY track_id, activity_date DESC
+"""
+
+
+def backfill_track_balances(apps, schema_editor):
+    # Fresh databases have nothing to backfill, so other backends (SQLite
+    # used as a benchmark stand-in) can skip the PostgreSQL-only query.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(BACKFILL_TRACK_BALANCES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activity", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackBalance",
+            fields=[
+                (
+                    "track_id",
+                    models.CharField(max_length=10, primary_key=True, serialize=False),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=12)),
+                (
+                    "last_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[("A", "A"), ("S", "S"), ("R", "R")],
+                        max_length=1,
+                    ),
+                ),
+                ("last_activity_date", models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(backfill_track_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-18 07:45
+
+from django.db import migrations, models
+
+from activity.operations import AddIndexConcurrentlyOnPostgres
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("activity", "0002_trackbalance"),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name="activity",
+            index=models.Index(
+                fields=["track_id", "activity_date"],
+                include=("status", "billig_amount", "id"),
+                name="activity_track_date_idx",
+            ),
+        ),
+    ]
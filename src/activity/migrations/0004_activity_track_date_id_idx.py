@@ -0,0 +1,32 @@
+# Generated by Django 3.2 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+from activity.operations import (
+    AddIndexConcurrentlyOnPostgres,
+    RemoveIndexConcurrentlyOnPostgres,
+)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("activity", "0003_activity_track_date_idx"),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name="activity",
+            index=models.Index(
+                fields=["track_id", "activity_date", "id"],
+                include=("status", "billig_amount"),
+                name="activity_track_date_id_idx",
+            ),
+        ),
+        RemoveIndexConcurrentlyOnPostgres(
+            model_name="activity",
+            name="activity_track_date_idx",
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2 on 2026-10-18 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activity", "0004_activity_track_date_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("track_id", models.CharField(max_length=10)),
+                ("checkpoint_date", models.DateTimeField()),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=12)),
+                (
+                    "last_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[("A", "A"), ("S", "S"), ("R", "R")],
+                        max_length=1,
+                    ),
+                ),
+                ("last_activity_date", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="trackcheckpoint",
+            constraint=models.UniqueConstraint(
+                fields=("track_id", "checkpoint_date"),
+                name="activity_checkpoint_track_date_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 3.2 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+
+PARTITION_ACTIVITIES = """
+ALTER TABLE activity_activity RENAME TO activity_activity_unpartitioned;
+
+CREATE TABLE activity_activity (
+    LIKE activity_activity_unpartitioned INCLUDING DEFAULTS
+) PARTITION BY RANGE (activity_date);
+
+CREATE TABLE activity_activity_default PARTITION OF activity_activity DEFAULT;
+
+DO $$
+DECLARE
+    month timestamp;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', min(activity_date) AT TIME ZONE 'UTC'),
+            date_trunc('month', max(activity_date) AT TIME ZONE 'UTC'),
+            interval '1 month'
+        )
+        FROM activity_activity_unpartitioned
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF activity_activity '
+            'FOR VALUES FROM (%L) TO (%L)',
+            'activity_activity_' || to_char(month, 'YYYY_MM'),
+            month::text || '+00',
+            (month + interval '1 month')::text || '+00'
+        );
+    END LOOP;
+END
+$$;
+
+INSERT INTO activity_activity SELECT * FROM activity_activity_unpartitioned;
+INSERT INTO activity_activitykey (id) SELECT id FROM activity_activity_unpartitioned;
+DROP TABLE activity_activity_unpartitioned;
+
+ALTER TABLE activity_activity ADD PRIMARY KEY (id, activity_date);
+CREATE INDEX {like_index} ON activity_activity (id varchar_pattern_ops);
+CREATE INDEX activity_track_date_id_idx ON activity_activity (track_id, activity_date, id)
+    INCLUDE (status, billig_amount);
+
+CREATE FUNCTION activity_register_ids() RETURNS trigger AS $$
+BEGIN
+    -- Writers which registered the IDs of a statement themselves (to skip
+    -- existing ones with ON CONFLICT) flag it, the flag holds for one insert.
+    IF coalesce(current_setting('activity.ids_registered', true), '') = 'on' THEN
+        PERFORM set_config('activity.ids_registered', 'off', true);
+    ELSE
+        INSERT INTO activity_activitykey (id) SELECT id FROM new_activities;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER activity_register_ids
+    AFTER INSERT ON activity_activity
+    REFERENCING NEW TABLE AS new_activities
+    FOR EACH STATEMENT EXECUTE PROCEDURE activity_register_ids();
+"""
+
+
+UNPARTITION_ACTIVITIES = """
+DROP TRIGGER activity_register_ids ON activity_activity;
+DROP FUNCTION activity_register_ids();
+
+ALTER TABLE activity_activity RENAME TO activity_activity_partitioned;
+
+CREATE TABLE activity_activity (
+    LIKE activity_activity_partitioned INCLUDING DEFAULTS
+);
+
+INSERT INTO activity_activity SELECT * FROM activity_activity_partitioned;
+DROP TABLE activity_activity_partitioned;
+
+ALTER TABLE activity_activity ADD PRIMARY KEY (id);
+CREATE INDEX {like_index} ON activity_activity (id varchar_pattern_ops);
+CREATE INDEX activity_track_date_id_idx ON activity_activity (track_id, activity_date, id)
+    INCLUDE (status, billig_amount);
+"""
+
+
+def like_index_name(cursor) -> str:
+    cursor.execute(
+        "SELECT indexname FROM pg_indexes "
+        "WHERE tablename = 'activity_activity' AND indexname LIKE '%_like'"
+    )
+    (like_index,) = cursor.fetchone()
+    return like_index
+
+
+def partition_activities(apps, schema_editor):
+    # Only PostgreSQL can partition, other backends (SQLite used as a
+    # benchmark stand-in) keep the plain table.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            PARTITION_ACTIVITIES.format(like_index=like_index_name(cursor=cursor))
+        )
+
+
+def unpartition_activities(apps, schema_editor):
+    # Moves attached partitions back into a plain table before the ID
+    # registry and its trigger go away. Partitions already detached to the
+    # archive schema are left there.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            UNPARTITION_ACTIVITIES.format(like_index=like_index_name(cursor=cursor))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activity", "0005_trackcheckpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ActivityKey",
+            fields=[
+                (
+                    "id",
+                    models.CharField(max_length=20, primary_key=True, serialize=False),
+                ),
+            ],
+        ),
+        migrations.RunPython(partition_activities, unpartition_activities),
+    ]
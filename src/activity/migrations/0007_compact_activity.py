@@ -0,0 +1,40 @@
+# Generated by Django 3.2 on 2026-10-18 08:16
+
+from django.db import migrations
+
+import activity.fields
+import activity.operations
+
+
+# Columns are converted only with ACTIVITY_COMPACT_STORAGE, otherwise they
+# keep their types. On PostgreSQL both of them are rewritten with every
+# partition under an ACCESS EXCLUSIVE lock, reads and writes of activities
+# wait until it is done.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activity", "0006_partition_activity"),
+    ]
+
+    operations = [
+        activity.operations.AlterFieldUsing(
+            model_name="activity",
+            name="billig_amount",
+            field=activity.fields.CentsField(decimal_places=2, max_digits=8),
+            using="round(billig_amount * 100)",
+            reverse_using="billig_amount / 100.0",
+        ),
+        activity.operations.AlterFieldUsing(
+            model_name="activity",
+            name="status",
+            field=activity.fields.StatusField(
+                choices=[("A", "A"), ("S", "S"), ("R", "R")],
+                codes={"A": 1, "S": 2, "R": 3},
+            ),
+            using=("CASE status WHEN 'A' THEN 1 WHEN 'S' THEN 2 WHEN 'R' THEN 3 END"),
+            invalid="status NOT IN ('A', 'S', 'R')",
+            reverse_using=(
+                "CASE status WHEN 1 THEN 'A' WHEN 2 THEN 'S' WHEN 3 THEN 'R' END"
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activity", "0007_compact_activity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ActivityQueueEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("activities", models.JSONField()),
+                ("size", models.PositiveIntegerField()),
+                ("enqueued_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
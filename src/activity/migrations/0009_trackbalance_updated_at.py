@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-18 08:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activity", "0008_activityqueueentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trackbalance",
+            name="updated_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 3.2 on 2026-10-18 08:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activity", "0009_trackbalance_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("track_id", models.CharField(max_length=10)),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("hour", "hour"), ("day", "day")], max_length=4
+                    ),
+                ),
+                ("bucket_start", models.DateTimeField()),
+                (
+                    "amount_s",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "amount_r",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("count_a", models.PositiveIntegerField(default=0)),
+                ("count_s", models.PositiveIntegerField(default=0)),
+                ("count_r", models.PositiveIntegerField(default=0)),
+                (
+                    "last_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[("A", "A"), ("S", "S"), ("R", "R")],
+                        max_length=1,
+                    ),
+                ),
+                ("last_activity_date", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="trackrollup",
+            index=models.Index(
+                fields=["granularity", "bucket_start"],
+                include=("amount_s", "amount_r", "count_a", "count_s", "count_r"),
+                name="activity_rollup_bucket_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="trackrollup",
+            constraint=models.UniqueConstraint(
+                fields=("track_id", "granularity", "bucket_start"),
+                name="activity_rollup_track_bucket_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activity", "0010_trackrollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ActivityArchive",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateTimeField(unique=True)),
+                ("dropped", models.BooleanField(default=False)),
+                ("detached_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
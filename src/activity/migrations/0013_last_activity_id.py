@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-18 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("activity", "0012_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trackbalance",
+            name="last_activity_id",
+            field=models.CharField(blank=True, default="", max_length=20),
+        ),
+        migrations.AddField(
+            model_name="trackcheckpoint",
+            name="last_activity_id",
+            field=models.CharField(blank=True, default="", max_length=20),
+        ),
+        migrations.AddField(
+            model_name="trackrollup",
+            name="last_activity_id",
+            field=models.CharField(blank=True, default="", max_length=20),
+        ),
+    ]
@@ -1,4 +1,19 @@
-from django.db.models import CharField, DateTimeField, DecimalField, Model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import (
+    BooleanField,
+    CharField,
+    DateTimeField,
+    DecimalField,
+    Index,
+    JSONField,
+    Model,
+    PositiveIntegerField,
+    PositiveSmallIntegerField,
+    UniqueConstraint,
+)
+from django.utils import timezone
+
+from activity.fields import CentsField, StatusField
 
 
 STATUSES = [
@@ -7,6 +22,18 @@ STATUSES = [
     ("R", "R"),
 ]
 
+GRANULARITIES = [
+    ("hour", "hour"),
+    ("day", "day"),
+]
+
+# Stored codes of the statuses, they must never change once assigned.
+STATUS_CODES = {
+    "A": 1,
+    "S": 2,
+    "R": 3,
+}
+
 
 class Activity(Model):
     id = CharField(
@@ -14,8 +41,139 @@ class Activity(Model):
     )
     activity_date = DateTimeField()
     track_id = CharField(max_length=10)
-    status = CharField(max_length=1, choices=STATUSES, blank=True)
-    billig_amount = DecimalField(max_digits=8, decimal_places=2)
+    status = StatusField(choices=STATUSES, codes=STATUS_CODES)
+    billig_amount = CentsField(max_digits=8, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            Index(
+                fields=["track_id", "activity_date", "id"],
+                include=["status", "billig_amount"],
+                name="activity_track_date_id_idx",
+            )
+        ]
 
     def __str__(self) -> str:
         return f"{self.id} {self.track_id} {self.status}"
+
+
+class ActivityKey(Model):
+    # On PostgreSQL activities are partitioned by activity_date, so their
+    # primary key has to include it. A trigger registers every stored ID
+    # here to keep IDs unique across all partitions (migration 0006).
+    id = CharField(max_length=20, primary_key=True)
+
+    def __str__(self) -> str:
+        return self.id
+
+
+class ActivityArchive(Model):
+    # Month of activities detached from the partitioned table, archived or
+    # dropped. Rebuilds from stored activities would miss them.
+    month = DateTimeField(unique=True)
+    dropped = BooleanField(default=False)
+    detached_at = DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.month:%Y-%m}"
+
+
+class TrackBalance(Model):
+    track_id = CharField(max_length=10, primary_key=True)
+    amount = DecimalField(max_digits=12, decimal_places=2)
+    last_status = CharField(max_length=1, choices=STATUSES, blank=True)
+    last_activity_date = DateTimeField()
+    # Breaks ties on last_activity_date the same way as ordering by
+    # (activity_date, id) does.
+    last_activity_id = CharField(max_length=20, blank=True, default="")
+    # Time of the last change, it only grows and tells versions of the
+    # balance apart (ETag of the aggregate).
+    updated_at = DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"{self.track_id} {self.amount} {self.last_status}"
+
+
+class TrackCheckpoint(Model):
+    # Balance of a track from all its activities dated before checkpoint_date.
+    track_id = CharField(max_length=10)
+    checkpoint_date = DateTimeField()
+    amount = DecimalField(max_digits=12, decimal_places=2)
+    last_status = CharField(max_length=1, choices=STATUSES, blank=True)
+    last_activity_date = DateTimeField()
+    last_activity_id = CharField(max_length=20, blank=True, default="")
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["track_id", "checkpoint_date"],
+                name="activity_checkpoint_track_date_uniq",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.track_id} {self.checkpoint_date} {self.amount}"
+
+
+class TrackRollup(Model):
+    # Billing of a track's activities dated within one hour or day starting
+    # at bucket_start, kept up to date on ingest.
+    track_id = CharField(max_length=10)
+    granularity = CharField(max_length=4, choices=GRANULARITIES)
+    bucket_start = DateTimeField()
+    amount_s = DecimalField(max_digits=12, decimal_places=2, default=0)
+    amount_r = DecimalField(max_digits=12, decimal_places=2, default=0)
+    count_a = PositiveIntegerField(default=0)
+    count_s = PositiveIntegerField(default=0)
+    count_r = PositiveIntegerField(default=0)
+    last_status = CharField(max_length=1, choices=STATUSES, blank=True)
+    last_activity_date = DateTimeField()
+    last_activity_id = CharField(max_length=20, blank=True, default="")
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["track_id", "granularity", "bucket_start"],
+                name="activity_rollup_track_bucket_uniq",
+            )
+        ]
+        indexes = [
+            Index(
+                fields=["granularity", "bucket_start"],
+                include=["amount_s", "amount_r", "count_a", "count_s", "count_r"],
+                name="activity_rollup_bucket_idx",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.track_id} {self.granularity} {self.bucket_start}"
+
+
+class ActivityQueueEntry(Model):
+    # Activities of one accepted request waiting for the queue worker.
+    activities = JSONField()
+    size = PositiveIntegerField()
+    enqueued_at = DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.id} {self.size} {self.enqueued_at}"
+
+
+class IdempotencyKey(Model):
+    # Response to the first request sent to path with an Idempotency-Key,
+    # replayed for its retries until expires_at. status is null while the
+    # request is in progress.
+    path = CharField(max_length=255)
+    key = CharField(max_length=255)
+    fingerprint = CharField(max_length=64)
+    status = PositiveSmallIntegerField(null=True)
+    data = JSONField(null=True, encoder=DjangoJSONEncoder)
+    expires_at = DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=["path", "key"], name="activity_idempotency_uniq")
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.path} {self.key} {self.status}"
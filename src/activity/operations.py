@@ -0,0 +1,145 @@
+from typing import Optional
+
+from django.contrib.postgres.operations import (
+    AddIndexConcurrently,
+    RemoveIndexConcurrently,
+)
+from django.db.migrations import AddIndex, AlterField, RemoveIndex
+from django.db.models import Field
+
+
+class AddIndexConcurrentlyOnPostgres(AddIndexConcurrently):
+    # Other backends (SQLite used as a benchmark stand-in) get a plain index.
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+
+class RemoveIndexConcurrentlyOnPostgres(RemoveIndexConcurrently):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            RemoveIndex.database_forwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            RemoveIndex.database_backwards(
+                self, app_label, schema_editor, from_state, to_state
+            )
+
+
+class AlterFieldUsing(AlterField):
+    # Changes the column type converting stored values with an SQL expression
+    # of the old column, see alter_field_using.
+    def __init__(
+        self,
+        *args,
+        using: str,
+        reverse_using: str,
+        invalid: Optional[str] = None,
+        **kwargs,
+    ):
+        self.using = using
+        self.reverse_using = reverse_using
+        self.invalid = invalid
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        kwargs["using"] = self.using
+        kwargs["reverse_using"] = self.reverse_using
+        if self.invalid is not None:
+            kwargs["invalid"] = self.invalid
+        return name, args, kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._alter(
+            app_label,
+            schema_editor,
+            from_state,
+            to_state,
+            using=self.using,
+            invalid=self.invalid,
+        )
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._alter(
+            app_label, schema_editor, from_state, to_state, using=self.reverse_using
+        )
+
+    def _alter(
+        self,
+        app_label,
+        schema_editor,
+        from_state,
+        to_state,
+        using: str,
+        invalid: Optional[str] = None,
+    ):
+        from_model = from_state.apps.get_model(app_label, self.model_name)
+        to_model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, to_model):
+            return
+        alter_field_using(
+            schema_editor,
+            model=from_model,
+            old_field=from_model._meta.get_field(self.name),
+            new_field=to_model._meta.get_field(self.name),
+            using=using,
+            invalid=invalid,
+        )
+
+
+def alter_field_using(
+    schema_editor,
+    model,
+    old_field: Field,
+    new_field: Field,
+    using: str,
+    invalid: Optional[str] = None,
+) -> bool:
+    # PostgreSQL converts values in place, SQLite stores any value in any
+    # column, so they are converted before the table is remade. Nothing is
+    # done when the column keeps its type. Rows matching the invalid
+    # condition could not be converted, they stop it before any change.
+    connection = schema_editor.connection
+    if old_field.db_type(connection) == new_field.db_type(connection):
+        return False
+    quote_name = schema_editor.quote_name
+    table = quote_name(model._meta.db_table)
+    column = quote_name(old_field.column)
+    if invalid is not None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {invalid}")
+            count = cursor.fetchone()[0]
+        if count:
+            raise ValueError(
+                f"Cannot convert {model._meta.db_table}.{old_field.column}: "
+                f"{count} rows match {invalid}, fix or delete them first"
+            )
+    if connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} "
+            f"TYPE {new_field.db_type(connection)} USING {using}"
+        )
+    else:
+        schema_editor.execute(f"UPDATE {table} SET {column} = {using}")
+        schema_editor.alter_field(model, old_field, new_field)
+    return True
@@ -0,0 +1,104 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.db import connection
+from django.db.models import BooleanField, QuerySet
+from django.db.models.expressions import RawSQL
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from activity.models import Activity
+
+
+Position = Tuple[datetime, str]
+
+
+class ActivityHistoryPagination(BasePagination):
+    # Keyset pagination, newest first. The cursor is the (activity_date, id)
+    # of the last activity on the page, so every page is a single range scan
+    # of activity_track_date_id_idx no matter how deep it is.
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self):
+        self.page_size = api_settings.PAGE_SIZE
+        self.next_position: Optional[Position] = None
+        self.request: Optional[Request] = None
+
+    def paginate_queryset(
+        self, queryset: QuerySet, request: Request, view=None
+    ) -> List[Activity]:
+        self.request = request
+        page_size = self.get_page_size(request=request)
+        position = self.decode_cursor(request=request)
+        if position is not None:
+            queryset = queryset.filter(self._before(position=position))
+
+        activities = list(queryset.order_by("-activity_date", "-id")[: page_size + 1])
+        self.next_position = None
+        if len(activities) > page_size:
+            activities = activities[:page_size]
+            self.next_position = (activities[-1].activity_date, activities[-1].id)
+        return activities
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(position=self.next_position),
+        )
+
+    @staticmethod
+    def encode_cursor(position: Position) -> str:
+        activity_date, activity_id = position
+        return urlsafe_b64encode(
+            f"{activity_date.isoformat()}|{activity_id}".encode()
+        ).decode()
+
+    def decode_cursor(self, request: Request) -> Optional[Position]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            activity_date, _, activity_id = (
+                urlsafe_b64decode(encoded.encode()).decode().partition("|")
+            )
+            return datetime.fromisoformat(activity_date), activity_id
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _before(position: Position) -> RawSQL:
+        # Row comparison lets the database seek straight to the position,
+        # an equivalent OR of two conditions would not use the index bound.
+        activity_date, activity_id = position
+        date_field = Activity._meta.get_field("activity_date")
+        quote_name = connection.ops.quote_name
+        return RawSQL(
+            f"({quote_name(date_field.column)}, {quote_name('id')}) < (%s, %s)",
+            (date_field.get_db_prep_value(activity_date, connection), activity_id),
+            output_field=BooleanField(),
+        )
@@ -1,23 +1,61 @@
 from rest_framework.serializers import (
+    BooleanField,
     CharField,
     ChoiceField,
+    DateTimeField,
     DecimalField,
+    DictField,
+    FloatField,
+    IntegerField,
+    ListField,
     ModelSerializer,
+    MultipleChoiceField,
     Serializer,
+    ValidationError,
 )
 
-from activity.models import STATUSES, Activity
+from activity.models import GRANULARITIES, STATUSES, Activity
+from activity.tools.rollups import activity_rollups
 
 
 class ActivityAggregateSerializer(Serializer):
     track_id = CharField(max_length=10)
     amount = DecimalField(max_digits=8, decimal_places=2)
-    last_status = ChoiceField(choices=STATUSES)
+    last_status = ChoiceField(choices=STATUSES, allow_null=True)
+
+
+class ActivityAggregateBatchSerializer(Serializer):
+    track_ids = ListField(
+        child=CharField(max_length=10), allow_empty=False, max_length=1000
+    )
+
+
+class ActivityAggregateBatchResultSerializer(Serializer):
+    results = ActivityAggregateSerializer(many=True)
+    not_found = ListField(child=CharField(max_length=10))
+
+
+class ActivityQueuedSerializer(Serializer):
+    id = IntegerField(source="pk")
+    activities = IntegerField(source="size")
+
+
+class ActivityQueueStatsSerializer(Serializer):
+    entries = IntegerField()
+    activities = IntegerField()
+    oldest_enqueued_at = DateTimeField(allow_null=True)
+    lag = FloatField(allow_null=True)
+
+
+class ActivityCacheStatsSerializer(Serializer):
+    hits = IntegerField()
+    misses = IntegerField()
 
 
 class ActivitySerializer(ModelSerializer):
     status = ChoiceField(choices=STATUSES)
     id = CharField(max_length=20)
+    billig_amount = DecimalField(max_digits=8, decimal_places=2)
 
     class Meta:
         model = Activity
@@ -28,3 +66,97 @@ class ActivitySerializer(ModelSerializer):
             "status",
             "billig_amount",
         )
+
+
+class DateRangeQuerySerializer(Serializer):
+    def get_fields(self):
+        # "from" is a keyword, so the date range fields cannot be declared
+        # as class attributes.
+        fields = super().get_fields()
+        fields["from"] = DateTimeField(required=False)
+        fields["to"] = DateTimeField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        if "from" in attrs and "to" in attrs and attrs["from"] >= attrs["to"]:
+            raise ValidationError({"to": "Has to be later than from"})
+        return attrs
+
+
+class ActivityAggregateQuerySerializer(DateRangeQuerySerializer):
+    as_of = DateTimeField(required=False)
+
+    def validate(self, attrs):
+        if "as_of" in attrs and ("from" in attrs or "to" in attrs):
+            raise ValidationError({"as_of": "Cannot be combined with from and to"})
+        return super().validate(attrs)
+
+
+class ActivityHistoryQuerySerializer(DateRangeQuerySerializer):
+    status = MultipleChoiceField(choices=STATUSES, required=False)
+    cursor = CharField(required=False)
+    page_size = IntegerField(min_value=1, max_value=1000, required=False)
+
+
+class ActivityHistorySerializer(Serializer):
+    next = CharField(allow_null=True)
+    results = ActivitySerializer(many=True)
+
+
+class ActivityRollupQuerySerializer(DateRangeQuerySerializer):
+    max_buckets = 1000
+
+    granularity = ChoiceField(choices=GRANULARITIES, default="day")
+    track_id = CharField(max_length=10, required=False)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fields["from"].required = True
+        fields["to"].required = True
+        return fields
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        buckets = activity_rollups.buckets(
+            granularity=attrs["granularity"],
+            date_from=attrs["from"],
+            date_to=attrs["to"],
+        )
+        if buckets > self.max_buckets:
+            raise ValidationError(
+                {"to": f"Range cannot span more than {self.max_buckets} buckets"}
+            )
+        return attrs
+
+
+class ActivityRollupBucketSerializer(Serializer):
+    bucket = DateTimeField()
+    amount = DecimalField(max_digits=14, decimal_places=2)
+    activities = IntegerField()
+
+
+class ActivityRollupSeriesSerializer(Serializer):
+    track_id = CharField(allow_null=True)
+    granularity = ChoiceField(choices=GRANULARITIES)
+    results = ActivityRollupBucketSerializer(many=True)
+
+
+class ActivityItemResultSerializer(Serializer):
+    id = CharField(allow_null=True)
+    result = ChoiceField(choices=["created", "duplicate", "invalid"])
+    reason = CharField(required=False)
+
+
+class ActivityItemsReportSerializer(Serializer):
+    created = IntegerField()
+    duplicate = IntegerField()
+    invalid = IntegerField()
+    results = ActivityItemResultSerializer(many=True)
+
+
+class ActivityImportReportSerializer(Serializer):
+    accepted = IntegerField()
+    rejected = IntegerField()
+    errors = ListField(child=DictField())
+    last_line = IntegerField()
+    complete = BooleanField()
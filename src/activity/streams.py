@@ -0,0 +1,125 @@
+import asyncio
+from typing import Iterable, List
+from urllib.parse import parse_qs
+
+from django.conf import settings
+
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST,
+    HTTP_405_METHOD_NOT_ALLOWED,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
+from rest_framework.utils.encoders import JSONEncoder
+
+from activity.async_views import database_sync_to_async
+from activity.models import TrackBalance
+from activity.tools.notifications import Subscription, activity_notifier
+from activity.tools.readers import activity_reader
+
+
+STREAM_PATH = "/v1/async/activity/stream/"
+MAX_TRACK_IDS = 100
+
+encoder = JSONEncoder(separators=(",", ":"))
+
+
+def balance_events(aggregates: Iterable[dict]) -> bytes:
+    return "".join(
+        f"event: balance\ndata: {encoder.encode(aggregated_data)}\n\n"
+        for aggregated_data in aggregates
+    ).encode()
+
+
+def parse_track_ids(query_string: bytes) -> List[str]:
+    # track_id can be repeated or hold a comma separated list.
+    values = parse_qs(query_string.decode("latin1")).get("track_id", [])
+    return list(
+        dict.fromkeys(
+            track_id.strip()
+            for value in values
+            for track_id in value.split(",")
+            if track_id.strip()
+        )
+    )
+
+
+async def _start(send, status: int, content_type: bytes) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type),
+                (b"cache-control", b"no-cache"),
+                # Tells nginx not to buffer the stream.
+                (b"x-accel-buffering", b"no"),
+            ],
+        }
+    )
+
+
+async def _body(send, body: bytes, more_body: bool = False) -> None:
+    await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+
+async def _watch_disconnect(receive, subscription: Subscription) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            subscription.close()
+            return
+
+
+async def balance_stream(scope, receive, send) -> None:
+    # Server-sent events of balance changes of the tracks in the query. It
+    # is a bare ASGI application, Django 3.2 cannot stream from async views,
+    # so an idle subscriber is one waiting coroutine and no thread.
+    if scope["method"] != "GET":
+        await _start(send, HTTP_405_METHOD_NOT_ALLOWED, b"text/plain")
+        await _body(send, b"")
+        return
+    if not activity_notifier.enabled:
+        body = encoder.encode({"message": "Balance streams are disabled"}).encode()
+        await _start(send, HTTP_503_SERVICE_UNAVAILABLE, b"application/json")
+        await _body(send, body)
+        return
+    track_ids = parse_track_ids(scope["query_string"])
+    max_length = TrackBalance._meta.get_field("track_id").max_length
+    if (
+        not track_ids
+        or len(track_ids) > MAX_TRACK_IDS
+        or any(len(track_id) > max_length for track_id in track_ids)
+    ):
+        body = encoder.encode(
+            {"message": f"Give 1 to {MAX_TRACK_IDS} track_id values"}
+        ).encode()
+        await _start(send, HTTP_400_BAD_REQUEST, b"application/json")
+        await _body(send, body)
+        return
+
+    # Subscribed before the current balances are read, so no change falls
+    # in between.
+    subscription = activity_notifier.subscribe(track_ids=track_ids)
+    watcher = asyncio.ensure_future(_watch_disconnect(receive, subscription))
+    try:
+        current = await database_sync_to_async(activity_reader.retrieve_many)(
+            track_ids=track_ids
+        )
+        await _start(send, HTTP_200_OK, b"text/event-stream")
+        await _body(
+            send,
+            b"retry: 3000\n\n" + balance_events(current["results"]),
+            more_body=True,
+        )
+        while True:
+            changes = await subscription.wait(
+                timeout=settings.ACTIVITY_STREAM_HEARTBEAT
+            )
+            if subscription.closed:
+                break
+            body = balance_events(changes) if changes else b": keep-alive\n\n"
+            await _body(send, body, more_body=True)
+    finally:
+        watcher.cancel()
+        activity_notifier.unsubscribe(subscription)
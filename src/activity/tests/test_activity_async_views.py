@@ -0,0 +1,126 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import AsyncClient, TransactionTestCase
+from django.urls import reverse
+
+from asgiref.sync import async_to_sync
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
+)
+from rest_framework.test import APIClient
+
+from activity.models import Activity
+from activity.tools.balances import activity_balancer
+from activity.tools.caches import activity_cache
+
+
+class ActivityAsyncViewsTest(TransactionTestCase):
+    def setUp(self) -> None:
+        # Connections of the pool threads are not kept, so the test
+        # database can be dropped at the end.
+        patcher = mock.patch.dict(connection.settings_dict, {"CONN_MAX_AGE": 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.detail_view = "activity_aggregate"
+        self.detail_async_view = "activity_aggregate_async"
+        self.aggregate_batch_async_view = "activity_aggregate_batch_async"
+
+        self.client = APIClient()
+        self.async_client = AsyncClient()
+        activity_cache.clear()
+
+        Activity.objects.create(
+            id="1",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T123456",
+            status="S",
+            billig_amount=Decimal(10.54),
+        )
+        Activity.objects.create(
+            id="2",
+            activity_date="2021-04-16T08:05:36.941465",
+            track_id="T123456",
+            status="R",
+            billig_amount=Decimal(0.54),
+        )
+        activity_balancer.rebuild()
+
+    async def test_aggregate_activity_async(self):
+        response = await self.async_client.get(
+            reverse(self.detail_async_view, kwargs={"track_id": "T123456"})
+        )
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            response.json(), {"track_id": "T123456", "last_status": "R", "amount": 10.0}
+        )
+
+    def test_aggregate_activity_async_same_as_sync(self):
+        sync_response = self.client.get(
+            reverse(self.detail_view, kwargs={"track_id": "T123456"})
+        )
+        async_response = async_to_sync(self.async_client.get)(
+            reverse(self.detail_async_view, kwargs={"track_id": "T123456"})
+        )
+        self.assertEqual(async_response.content, sync_response.content)
+
+    async def test_aggregate_not_modified_async(self):
+        url = reverse(self.detail_async_view, kwargs={"track_id": "T123456"})
+        etag = (await self.async_client.get(url))["ETag"]
+
+        # The async test client of Django 3.2 takes raw header names.
+        response = await self.async_client.get(url, **{"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    async def test_aggregate_async_counts_cache_lookups_once(self):
+        url = reverse(self.detail_async_view, kwargs={"track_id": "T123456"})
+        stats = activity_cache.stats()
+
+        miss = await self.async_client.get(url)
+        hit = await self.async_client.get(url)
+
+        self.assertEqual(miss["X-Cache"], "MISS")
+        self.assertEqual(hit["X-Cache"], "HIT")
+        self.assertEqual(
+            activity_cache.stats(),
+            {"hits": stats["hits"] + 1, "misses": stats["misses"] + 1},
+        )
+
+    async def test_cannot_get_track_id_async(self):
+        response = await self.async_client.get(
+            reverse(self.detail_async_view, kwargs={"track_id": "11"})
+        )
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), {"message": "Track ID 11 does not exists"})
+
+    async def test_aggregate_batch_async(self):
+        response = await self.async_client.post(
+            reverse(self.aggregate_batch_async_view),
+            data={"track_ids": ["11", "T123456"]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            response.json(),
+            {
+                "results": [
+                    {"track_id": "T123456", "last_status": "R", "amount": 10.0}
+                ],
+                "not_found": ["11"],
+            },
+        )
+
+    async def test_aggregate_batch_async_wrong_payload(self):
+        response = await self.async_client.post(
+            reverse(self.aggregate_batch_async_view),
+            data="[",
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
@@ -0,0 +1,137 @@
+import json
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
+from rest_framework.test import APIClient
+
+from activity.models import Activity, TrackBalance
+from activity.tools.balances import activity_balancer
+from activity.tools.caches import activity_cache
+
+
+class ActivityBalancesTest(TestCase):
+    def setUp(self) -> None:
+        self.detail_view = "activity_aggregate"
+        self.create_view = "activity_create"
+
+        self.client = APIClient()
+        activity_cache.clear()
+
+        self.payload = [
+            {
+                "id": "B1",
+                "activity_date": "2021-04-16T08:05:35.941465",
+                "track_id": "T1",
+                "status": "S",
+                "billig_amount": 10.54,
+            },
+            {
+                "id": "B2",
+                "activity_date": "2021-04-16T08:05:36.941465",
+                "track_id": "T1",
+                "status": "R",
+                "billig_amount": 0.54,
+            },
+            {
+                "id": "B3",
+                "activity_date": "2021-04-16T08:05:37.941465",
+                "track_id": "T2",
+                "status": "A",
+                "billig_amount": 5,
+            },
+        ]
+
+    def _post(self, payload):
+        return self.client.post(
+            reverse(self.create_view),
+            data=json.dumps(payload),
+            content_type="application/json",
+        )
+
+    def test_bulk_create_updates_balances(self):
+        response = self._post(self.payload)
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+
+        balance = TrackBalance.objects.get(track_id="T1")
+        self.assertEqual(balance.amount, Decimal("10.00"))
+        self.assertEqual(balance.last_status, "R")
+        balance = TrackBalance.objects.get(track_id="T2")
+        self.assertEqual(balance.amount, Decimal("0.00"))
+        self.assertEqual(balance.last_status, "A")
+
+    def test_single_create_updates_balance(self):
+        response = self.client.post(reverse(self.create_view), data=self.payload[0])
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+
+        response = self.client.get(reverse(self.detail_view, kwargs={"track_id": "T1"}))
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {"track_id": "T1", "last_status": "S", "amount": Decimal("10.54")},
+        )
+
+    def test_late_activity_keeps_last_status(self):
+        self._post(self.payload)
+        self._post(
+            [
+                {
+                    "id": "B4",
+                    "activity_date": "2021-04-15T08:05:35.941465",
+                    "track_id": "T1",
+                    "status": "S",
+                    "billig_amount": 1,
+                }
+            ]
+        )
+
+        balance = TrackBalance.objects.get(track_id="T1")
+        self.assertEqual(balance.amount, Decimal("11.00"))
+        self.assertEqual(balance.last_status, "R")
+        self.assertEqual(activity_balancer.verify(), [])
+
+    def test_same_date_activities_ordered_by_id(self):
+        # B9 and B10 share the date of B2. IDs compare as strings, so B9 is
+        # the last one whatever the order they arrive in, as when rebuilt.
+        self._post(self.payload)
+        for activity_id, status in (("B9", "S"), ("B10", "A")):
+            self._post(
+                [dict(self.payload[1], id=activity_id, status=status, billig_amount=1)]
+            )
+
+        balance = TrackBalance.objects.get(track_id="T1")
+        self.assertEqual(balance.last_status, "S")
+        self.assertEqual(balance.last_activity_id, "B9")
+        self.assertEqual(activity_balancer.verify(), [])
+
+    def test_retrieve_does_not_read_activities(self):
+        self._post(self.payload)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse(self.detail_view, kwargs={"track_id": "T1"})
+            )
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_rebuild_command(self):
+        self._post(self.payload)
+        Activity.objects.create(
+            id="B5",
+            activity_date="2021-04-17T08:05:35.941465",
+            track_id="T2",
+            status="S",
+            billig_amount=Decimal(3),
+        )
+        with self.assertRaises(CommandError):
+            call_command("rebuild_track_balances", "--verify", stdout=StringIO())
+
+        call_command("rebuild_track_balances", "--track-id", "T2", stdout=StringIO())
+
+        balance = TrackBalance.objects.get(track_id="T2")
+        self.assertEqual(balance.amount, Decimal("3.00"))
+        self.assertEqual(balance.last_status, "S")
+        call_command("rebuild_track_balances", "--verify", stdout=StringIO())
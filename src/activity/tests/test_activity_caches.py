@@ -0,0 +1,107 @@
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+from rest_framework.test import APIClient
+
+from activity.models import Activity
+from activity.tools.balances import activity_balancer
+from activity.tools.caches import activity_cache
+
+
+class ActivityCachesTest(TestCase):
+    def setUp(self) -> None:
+        self.detail_view = "activity_aggregate"
+        self.create_view = "activity_create"
+        self.stats_view = "activity_cache_stats"
+
+        self.client = APIClient()
+        activity_cache.clear()
+
+        Activity.objects.create(
+            id="1",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T123456",
+            status="S",
+            billig_amount=Decimal(10.54),
+        )
+        activity_balancer.rebuild()
+
+    def _get(self, track_id: str = "T123456"):
+        return self.client.get(reverse(self.detail_view, kwargs={"track_id": track_id}))
+
+    def test_aggregate_served_from_cache(self):
+        response = self._get()
+        self.assertEqual(response["X-Cache"], "MISS")
+
+        stats_before = activity_cache.stats()
+        with self.assertNumQueries(0):
+            response = self._get()
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.data["amount"], Decimal("10.54"))
+        self.assertEqual(activity_cache.stats()["hits"], stats_before["hits"] + 1)
+
+    def test_hit_is_one_cache_lookup(self):
+        etag = self._get()["ETag"]
+
+        with mock.patch.object(
+            activity_cache.cache, "get", wraps=activity_cache.cache.get
+        ) as get:
+            response = self._get()
+            self.assertEqual(response["ETag"], etag)
+            response = self.client.get(
+                reverse(self.detail_view, kwargs={"track_id": "T123456"}),
+                HTTP_IF_NONE_MATCH=etag,
+            )
+            self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+        self.assertEqual(get.call_count, 2)
+
+    def test_create_drops_cached_aggregate(self):
+        self._get()
+        payload = [
+            {
+                "id": "2",
+                "activity_date": "2021-04-16T09:05:35.941465",
+                "track_id": "T123456",
+                "status": "R",
+                "billig_amount": 0.54,
+            }
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse(self.create_view),
+                data=json.dumps(payload),
+                content_type="application/json",
+            )
+
+        response = self._get()
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(
+            response.data,
+            {"track_id": "T123456", "last_status": "R", "amount": Decimal("10.00")},
+        )
+
+    def test_rebuild_drops_rebuilt_tracks(self):
+        self._get()
+        activity_cache.cache.set("other:1", 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            activity_balancer.rebuild()
+
+        self.assertEqual(self._get()["X-Cache"], "MISS")
+        self.assertEqual(activity_cache.cache.get("other:1"), 1)
+
+    def test_not_found_is_not_cached(self):
+        self._get(track_id="11")
+        self.assertIsNone(activity_cache.cache.get("balance:11"))
+
+    def test_cache_stats(self):
+        self._get()
+        self._get()
+        response = self.client.get(reverse(self.stats_view))
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data, activity_cache.stats())
@@ -0,0 +1,268 @@
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+from rest_framework.test import APIClient
+
+from activity.models import Activity, TrackCheckpoint
+from activity.tools.aggregators import signed_amount
+from activity.tools.caches import activity_cache
+from activity.tools.checkpoints import activity_checkpointer
+
+
+class ActivityCheckpointsTest(TestCase):
+    def setUp(self) -> None:
+        self.detail_view = "activity_aggregate"
+        self.create_view = "activity_create"
+
+        self.client = APIClient()
+        activity_cache.clear()
+
+        self.started = datetime(2021, 4, 10, 8, 0, 0)
+        # Three activities a day on T1, T2 is active only every other day.
+        payload = [
+            {
+                "id": f"C{index:03d}",
+                "activity_date": self._format(
+                    self.started + timedelta(hours=8 * index)
+                ),
+                "track_id": "T1",
+                "status": "SRA"[index % 3] if index % 4 else "S",
+                "billig_amount": index + 1,
+            }
+            for index in range(18)
+        ] + [
+            {
+                "id": f"D{index:03d}",
+                "activity_date": self._format(
+                    self.started + timedelta(days=2 * index, hours=1)
+                ),
+                "track_id": "T2",
+                "status": "S",
+                "billig_amount": 10,
+            }
+            for index in range(3)
+        ]
+        self._post(payload)
+
+    @staticmethod
+    def _format(activity_date: datetime) -> str:
+        return activity_date.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+    def _post(self, payload):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse(self.create_view),
+                data=json.dumps(payload),
+                content_type="application/json",
+            )
+
+    def _get(self, track_id: str = "T1", **params):
+        return self.client.get(
+            reverse(self.detail_view, kwargs={"track_id": track_id}), data=params
+        )
+
+    @staticmethod
+    def _expected(track_id: str, until: datetime, inclusive: bool = False) -> Decimal:
+        activities = Activity.objects.filter(track_id=track_id)
+        if inclusive:
+            activities = activities.filter(activity_date__lte=until)
+        else:
+            activities = activities.filter(activity_date__lt=until)
+        return sum(
+            (
+                signed_amount(status=activity.status, amount=activity.billig_amount)
+                for activity in activities
+            ),
+            Decimal(0),
+        )
+
+    @staticmethod
+    def _checkpoints() -> list:
+        return list(
+            TrackCheckpoint.objects.order_by("track_id", "checkpoint_date").values_list(
+                "track_id",
+                "checkpoint_date",
+                "amount",
+                "last_status",
+                "last_activity_date",
+            )
+        )
+
+    def test_backfill(self):
+        created = activity_checkpointer.backfill(until=datetime(2021, 4, 15))
+
+        self.assertEqual(created, 5 + 3)
+        for track_id, checkpoint_date, amount, *_ in self._checkpoints():
+            self.assertEqual(amount, self._expected(track_id, checkpoint_date))
+
+    def test_incremental_matches_backfill(self):
+        activity_checkpointer.backfill(until=datetime(2021, 4, 12))
+        created = activity_checkpointer.create(until=datetime(2021, 4, 17))
+        incremental = self._checkpoints()
+
+        activity_checkpointer.backfill(until=datetime(2021, 4, 17))
+        self.assertEqual(incremental, self._checkpoints())
+        self.assertEqual(created, len(incremental) - 2 - 1)
+
+    def test_late_activity_adjusts_checkpoints(self):
+        activity_checkpointer.backfill(until=datetime(2021, 4, 17))
+        self._post(
+            [
+                {
+                    "id": "LATE",
+                    "activity_date": "2021-04-11T23:00:00.000000",
+                    "track_id": "T1",
+                    "status": "R",
+                    "billig_amount": 100,
+                }
+            ]
+        )
+        adjusted = self._checkpoints()
+
+        activity_checkpointer.backfill(until=datetime(2021, 4, 17))
+        self.assertEqual(adjusted, self._checkpoints())
+
+    def test_late_activities_adjust_checkpoints_in_bulk(self):
+        activity_checkpointer.backfill(until=datetime(2021, 4, 17))
+        late_activities = [
+            Activity(
+                id=f"L{index:03d}",
+                activity_date=self.started + timedelta(hours=5 * index, minutes=1),
+                track_id=f"T{index % 2 + 1}",
+                status="SRA"[index % 3],
+                billig_amount=Decimal(index + 1),
+            )
+            for index in range(30)
+        ]
+        Activity.objects.bulk_create(late_activities)
+
+        with self.assertNumQueries(3):
+            activity_checkpointer.adjust(activities=late_activities)
+        adjusted = self._checkpoints()
+
+        # Backfill adds checkpoints after days that had only late activities.
+        activity_checkpointer.backfill(until=datetime(2021, 4, 17))
+        dates = {checkpoint[:2] for checkpoint in adjusted}
+        self.assertEqual(
+            adjusted,
+            [
+                checkpoint
+                for checkpoint in self._checkpoints()
+                if checkpoint[:2] in dates
+            ],
+        )
+
+    def test_balance_as_of(self):
+        activity_checkpointer.backfill(until=datetime(2021, 4, 14))
+        until = self.started
+        while until < self.started + timedelta(days=7):
+            for inclusive in (True, False):
+                balance = activity_checkpointer.balance(
+                    track_id="T1", until=until, inclusive=inclusive
+                )
+                expected = self._expected("T1", until, inclusive=inclusive)
+                self.assertEqual(balance.amount if balance else Decimal(0), expected)
+            until += timedelta(hours=4)
+
+    def test_balance_reads_since_checkpoint(self):
+        activity_checkpointer.backfill(until=datetime(2021, 4, 15))
+        with self.assertNumQueries(2):
+            balance = activity_checkpointer.balance(
+                track_id="T1", until=datetime(2021, 4, 15, 12)
+            )
+        self.assertEqual(
+            balance.amount, self._expected("T1", datetime(2021, 4, 15, 12))
+        )
+
+    def test_aggregate_as_of(self):
+        activity_checkpointer.backfill(until=datetime(2021, 4, 14))
+        response = self._get(as_of="2021-04-12T08:00:00")
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                "track_id": "T1",
+                "last_status": "S",
+                "amount": self._expected(
+                    "T1", datetime(2021, 4, 12, 8), inclusive=True
+                ),
+            },
+        )
+        self.assertNotIn("X-Cache", response)
+
+    def test_aggregate_window(self):
+        activity_checkpointer.backfill(until=datetime(2021, 4, 14))
+        date_from, date_to = datetime(2021, 4, 11, 12), datetime(2021, 4, 14, 12)
+
+        response = self._get(**{"from": date_from, "to": date_to})
+        self.assertEqual(
+            response.data["amount"],
+            self._expected("T1", date_to) - self._expected("T1", date_from),
+        )
+
+        response = self._get(**{"from": date_from})
+        self.assertEqual(
+            response.data["amount"],
+            self._expected("T1", datetime.max) - self._expected("T1", date_from),
+        )
+
+        response = self._get(track_id="T2", to="2021-04-12T00:00:00")
+        self.assertEqual(response.data["amount"], Decimal(10))
+
+    def test_aggregate_before_first_activity(self):
+        empty = {"track_id": "T1", "last_status": None, "amount": Decimal(0)}
+
+        response = self._get(as_of="2021-04-01T00:00:00")
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data, empty)
+
+        response = self._get(
+            **{"from": "2021-04-01T00:00:00", "to": "2021-04-02T00:00:00"}
+        )
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data, empty)
+
+    def test_aggregate_after_last_activity(self):
+        response = self._get(**{"from": "2021-05-01T00:00:00"})
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data["amount"], Decimal(0))
+        self.assertEqual(response.data["last_status"], self._get().data["last_status"])
+
+    def test_aggregate_window_of_unknown_track(self):
+        response = self._get(track_id="T404", as_of="2021-04-12T00:00:00")
+
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+    def test_aggregate_invalid_parameters(self):
+        self.assertEqual(
+            self._get(as_of="2021-04-12", to="2021-04-13").status_code,
+            HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self._get(**{"from": "2021-04-13", "to": "2021-04-12"}).status_code,
+            HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(self._get(as_of="yesterday").status_code, HTTP_400_BAD_REQUEST)
+
+    def test_create_command(self):
+        stdout = StringIO()
+        call_command("create_track_checkpoints", "--until", "2021-04-13", stdout=stdout)
+        self.assertIn("Created 5 track checkpoints", stdout.getvalue())
+
+        call_command("create_track_checkpoints", "--until", "2021-04-20", stdout=stdout)
+        self.assertEqual(TrackCheckpoint.objects.count(), 7 + 3)
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "create_track_checkpoints", "--until", "2999-01-01", stdout=stdout
+            )
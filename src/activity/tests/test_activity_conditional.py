@@ -0,0 +1,143 @@
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_304_NOT_MODIFIED,
+    HTTP_404_NOT_FOUND,
+)
+from rest_framework.test import APIClient
+
+from activity.models import TrackBalance
+from activity.tools.balances import activity_balancer
+from activity.tools.caches import activity_cache
+
+
+class ActivityConditionalTest(TestCase):
+    def setUp(self) -> None:
+        self.detail_view = "activity_aggregate"
+        self.create_view = "activity_create"
+
+        self.client = APIClient()
+        activity_cache.clear()
+        self._post(activity_id="1", activity_date="2021-04-16T08:05:35.941465")
+
+    def _post(self, activity_id: str, activity_date: str) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse(self.create_view),
+                data=json.dumps(
+                    {
+                        "id": activity_id,
+                        "activity_date": activity_date,
+                        "track_id": "T123456",
+                        "status": "S",
+                        "billig_amount": 10,
+                    }
+                ),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+
+    def _get(self, track_id: str = "T123456", **headers):
+        return self.client.get(
+            reverse(self.detail_view, kwargs={"track_id": track_id}), **headers
+        )
+
+    def test_aggregate_has_validators(self):
+        response = self._get()
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        updated_at = TrackBalance.objects.get().updated_at
+        self.assertEqual(response["ETag"], f'"{updated_at:%Y%m%d%H%M%S%f}"')
+        self.assertTrue(response["Last-Modified"].endswith(" GMT"))
+
+    def test_not_modified_without_db(self):
+        etag = self._get()["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_not_modified_when_version_is_not_cached(self):
+        etag = self._get()["ETag"]
+        activity_cache.clear()
+
+        with self.assertNumQueries(1):
+            response = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+
+    def test_modified_after_write(self):
+        etag = self._get()["ETag"]
+        # A late activity leaves the last activity date as it was.
+        self._post(activity_id="2", activity_date="2021-04-15T08:05:35.941465")
+
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["amount"], Decimal(20))
+        self.assertEqual(
+            self._get(HTTP_IF_NONE_MATCH=response["ETag"]).status_code,
+            HTTP_304_NOT_MODIFIED,
+        )
+
+    def test_if_modified_since(self):
+        last_modified = self._get()["Last-Modified"]
+
+        response = self._get(HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+        self.assertEqual(
+            self._get(
+                HTTP_IF_MODIFIED_SINCE="Thu, 01 Jan 2015 00:00:00 GMT"
+            ).status_code,
+            HTTP_200_OK,
+        )
+
+    def test_checkpoint_aggregate(self):
+        etag = self._get()["ETag"]
+        url = reverse(self.detail_view, kwargs={"track_id": "T123456"})
+
+        response = self.client.get(url, data={"as_of": "2021-05-01T00:00:00"})
+        self.assertEqual(response["ETag"], etag)
+        response = self.client.get(
+            url, data={"as_of": "2021-05-01T00:00:00"}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTP_304_NOT_MODIFIED)
+
+    def test_unknown_track(self):
+        response = self._get(track_id="T000000", HTTP_IF_NONE_MATCH="*")
+
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_rebuild_changes_version(self):
+        etag = self._get()["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_track_balances", stdout=StringIO())
+
+        self.assertNotEqual(self._get(HTTP_IF_NONE_MATCH=etag)["ETag"], etag)
+
+    def test_versions_only_grow(self):
+        balance = TrackBalance.objects.get()
+        updated_at = balance.updated_at
+
+        activity_balancer.touch(balance=balance, now=updated_at - timedelta(hours=1))
+        self.assertEqual(balance.updated_at, updated_at + timedelta(microseconds=1))
+
+        now = datetime(2999, 1, 1)
+        activity_balancer.touch(balance=balance, now=now)
+        self.assertEqual(balance.updated_at, now)
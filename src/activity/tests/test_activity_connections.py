@@ -0,0 +1,93 @@
+import time
+from unittest import mock, skipUnless
+
+from django.db import DatabaseError, connection, connections
+from django.test import TestCase
+
+from activity.tools.notifications import PostgresListener
+from core.backends.postgresql.base import DatabaseWrapper
+
+
+@skipUnless(connection.vendor == "postgresql", "The backend is for PostgreSQL")
+class ActivityConnectionsTest(TestCase):
+    def _wrapper(self, health_checks: bool) -> DatabaseWrapper:
+        wrapper = DatabaseWrapper(
+            {
+                **connections.databases["default"],
+                "CONN_MAX_AGE": 60,
+                "CONN_HEALTH_CHECKS": health_checks,
+            },
+            "health_checked",
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    @staticmethod
+    def _request(wrapper: DatabaseWrapper, queries: int = 1) -> int:
+        # The same as Django does when a request starts and finishes.
+        wrapper.close_if_unusable_or_obsolete()
+        try:
+            for _ in range(queries):
+                with wrapper.cursor() as cursor:
+                    cursor.execute("SELECT pg_backend_pid()")
+                    pid = cursor.fetchone()[0]
+            return pid
+        finally:
+            wrapper.close_if_unusable_or_obsolete()
+
+    @staticmethod
+    def _terminate(pid: int) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_terminate_backend(%s)", [pid])
+            for _ in range(100):
+                cursor.execute("SELECT pg_stat_clear_snapshot()")
+                cursor.execute("SELECT 1 FROM pg_stat_activity WHERE pid = %s", [pid])
+                if cursor.fetchone() is None:
+                    return
+                time.sleep(0.01)
+
+    def test_reconnects_after_dropped_connection(self):
+        wrapper = self._wrapper(health_checks=True)
+        pid = self._request(wrapper)
+        self.assertEqual(self._request(wrapper), pid)
+
+        self._terminate(pid)
+
+        self.assertNotEqual(self._request(wrapper), pid)
+
+    def test_dropped_connection_fails_without_health_checks(self):
+        wrapper = self._wrapper(health_checks=False)
+        self._terminate(self._request(wrapper))
+
+        with self.assertRaises(DatabaseError):
+            self._request(wrapper)
+        self._request(wrapper)
+
+    def test_checked_once_per_request(self):
+        wrapper = self._wrapper(health_checks=True)
+        with mock.patch.object(
+            wrapper, "is_usable", wraps=wrapper.is_usable
+        ) as is_usable:
+            self._request(wrapper, queries=3)
+            self.assertEqual(is_usable.call_count, 0)
+
+            wrapper.close_if_unusable_or_obsolete()
+            wrapper.close_if_unusable_or_obsolete()
+            self.assertEqual(is_usable.call_count, 0)
+
+            self._request(wrapper, queries=3)
+            self._request(wrapper, queries=3)
+            self.assertEqual(is_usable.call_count, 2)
+
+    def test_listener_connects_directly(self):
+        listener = PostgresListener(alias="default", loop=None, on_notify=None)
+        params = connection.get_connection_params()
+
+        with self.settings(
+            DATABASE_LISTEN_ADDRESSES={"default": {"host": "db-direct", "port": "5433"}}
+        ):
+            direct = listener._connection_params()
+
+        self.assertEqual((direct["host"], direct["port"]), ("db-direct", "5433"))
+        self.assertEqual(direct["database"], params["database"])
+        self.assertEqual(listener._connection_params(), params)
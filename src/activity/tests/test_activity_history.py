@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+from rest_framework.test import APIClient
+
+from activity.models import Activity
+
+
+class ActivityHistoryTest(TestCase):
+    def setUp(self) -> None:
+        self.history_view = "activity_history"
+
+        self.client = APIClient()
+
+        started = datetime(2021, 4, 16, 8, 5, 35)
+        # Every second pair of activities shares a date to check the tie-break.
+        Activity.objects.bulk_create(
+            [
+                Activity(
+                    id=f"H{index:03d}",
+                    activity_date=started + timedelta(minutes=index // 2),
+                    track_id="T123456",
+                    status="SRA"[index % 3],
+                    billig_amount=Decimal(index),
+                )
+                for index in range(25)
+            ]
+            + [
+                Activity(
+                    id="OTHER",
+                    activity_date=started,
+                    track_id="T654321",
+                    status="S",
+                    billig_amount=Decimal(1),
+                )
+            ]
+        )
+
+    def _get(self, track_id: str = "T123456", **params):
+        return self.client.get(
+            reverse(self.history_view, kwargs={"track_id": track_id}), data=params
+        )
+
+    def test_history_pages(self):
+        ids = []
+        response = self._get(page_size=10)
+        while True:
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            ids.extend(activity["id"] for activity in response.data["results"])
+            if response.data["next"] is None:
+                break
+            response = self.client.get(response.data["next"])
+
+        self.assertEqual(ids, [f"H{index:03d}" for index in reversed(range(25))])
+
+    def test_history_output(self):
+        response = self._get(page_size=1)
+
+        self.assertEqual(
+            response.data["results"],
+            [
+                {
+                    "id": "H024",
+                    "activity_date": "2021-04-16T08:17:35",
+                    "track_id": "T123456",
+                    "status": "S",
+                    "billig_amount": "24.00",
+                }
+            ],
+        )
+        self.assertIn("cursor=", response.data["next"])
+
+    def test_history_default_page_size(self):
+        response = self._get()
+
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_history_filters(self):
+        response = self._get(
+            status=["S", "R"],
+            page_size=100,
+            **{"from": "2021-04-16T08:06:35", "to": "2021-04-16T08:10:35"},
+        )
+
+        self.assertEqual(
+            [activity["id"] for activity in response.data["results"]],
+            ["H009", "H007", "H006", "H004", "H003"],
+        )
+        self.assertIsNone(response.data["next"])
+
+    def test_history_unknown_track(self):
+        response = self._get(track_id="NOPE")
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data, {"next": None, "results": []})
+
+    def test_history_deep_page_single_query(self):
+        response = self._get(page_size=20)
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data["next"])
+
+        self.assertEqual(len(response.data["results"]), 5)
+
+    def test_history_invalid_parameters(self):
+        self.assertEqual(self._get(cursor="?!").status_code, HTTP_404_NOT_FOUND)
+        self.assertEqual(self._get(cursor="bm9wZQ==").status_code, HTTP_404_NOT_FOUND)
+        self.assertEqual(self._get(page_size=0).status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._get(status="X").status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self._get(
+                **{"from": "2021-04-16T08:06:35", "to": "2021-04-16T08:06:35"}
+            ).status_code,
+            HTTP_400_BAD_REQUEST,
+        )
@@ -0,0 +1,209 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_202_ACCEPTED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_409_CONFLICT,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
+from rest_framework.test import APIClient
+
+from activity.models import Activity, ActivityQueueEntry, IdempotencyKey, TrackBalance
+from activity.tools.caches import activity_cache
+
+
+class ActivityIdempotencyTest(TestCase):
+    def setUp(self) -> None:
+        self.create_view = "activity_create"
+
+        self.client = APIClient()
+        activity_cache.clear()
+
+        Activity.objects.create(
+            id="STORED",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T123456",
+            status="S",
+            billig_amount=Decimal(1),
+        )
+
+    @staticmethod
+    def _activity(activity_id: str, amount: int = 10) -> dict:
+        return {
+            "id": activity_id,
+            "activity_date": "2021-04-16T08:05:35.941465",
+            "track_id": "T123456",
+            "status": "S",
+            "billig_amount": amount,
+        }
+
+    def _post(self, payload, key: str = None, results: bool = True):
+        url = reverse(self.create_view)
+        if results:
+            url = f"{url}?results=items"
+        headers = {} if key is None else {"HTTP_IDEMPOTENCY_KEY": key}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                url,
+                data=json.dumps(payload),
+                content_type="application/json",
+                **headers,
+            )
+
+    def test_results_per_item(self):
+        response = self._post(
+            [
+                self._activity("NEW"),
+                self._activity("STORED"),
+                {"id": "BROKEN", "track_id": "T123456"},
+                self._activity("NEW", amount=20),
+                "nonsense",
+            ]
+        )
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(
+            response.json(),
+            {
+                "created": 1,
+                "duplicate": 2,
+                "invalid": 2,
+                "results": [
+                    {"id": "NEW", "result": "created"},
+                    {"id": "STORED", "result": "duplicate"},
+                    {
+                        "id": "BROKEN",
+                        "result": "invalid",
+                        "reason": "Missing activity_date",
+                    },
+                    {"id": "NEW", "result": "duplicate"},
+                    {
+                        "id": None,
+                        "result": "invalid",
+                        "reason": "Activity has to be an object",
+                    },
+                ],
+            },
+        )
+        self.assertEqual(Activity.objects.get(id="NEW").billig_amount, Decimal(10))
+        self.assertEqual(TrackBalance.objects.get().amount, Decimal(10))
+
+    def test_results_single_statement(self):
+        payload = [self._activity(f"NEW{index}") for index in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self._post(payload + [self._activity("STORED")])
+
+        self.assertEqual(response.json()["created"], 5)
+        inserts = [
+            query["sql"]
+            for query in queries.captured_queries
+            if 'INSERT INTO "activity_activity"' in query["sql"]
+        ]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn("ON CONFLICT", inserts[0])
+
+    def test_results_only_duplicates(self):
+        response = self._post(self._activity("STORED"))
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            response.json()["results"], [{"id": "STORED", "result": "duplicate"}]
+        )
+
+    def test_results_only_invalid(self):
+        response = self._post([{"id": "BROKEN"}])
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()["invalid"], 1)
+
+    @override_settings(ACTIVITY_INGEST_MODE="queue")
+    def test_results_bypass_queue(self):
+        response = self._post([self._activity("NEW")])
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertFalse(ActivityQueueEntry.objects.exists())
+
+    def test_idempotency_key_replays_response(self):
+        payload = [self._activity("NEW"), self._activity("STORED")]
+        first = self._post(payload, key="batch-1")
+        Activity.objects.filter(id="NEW").delete()
+        retried = self._post(payload, key="batch-1")
+
+        self.assertEqual(retried.status_code, first.status_code)
+        self.assertEqual(retried.json(), first.json())
+        self.assertEqual(retried["Idempotent-Replayed"], "true")
+        self.assertFalse(Activity.objects.filter(id="NEW").exists())
+
+        self.assertEqual(
+            self._post([self._activity("FRESH")], key="batch-2").json()["created"], 1
+        )
+
+    def test_idempotency_key_without_results(self):
+        first = self._post([self._activity("NEW")], key="batch-1", results=False)
+        retried = self._post([self._activity("NEW")], key="batch-1", results=False)
+
+        self.assertEqual(first.status_code, HTTP_201_CREATED)
+        self.assertEqual(retried.status_code, HTTP_201_CREATED)
+
+    @override_settings(ACTIVITY_INGEST_MODE="queue")
+    def test_idempotency_key_enqueues_once(self):
+        for _ in range(2):
+            response = self._post([self._activity("NEW")], key="batch-1", results=False)
+            self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+
+        self.assertEqual(ActivityQueueEntry.objects.count(), 1)
+
+    def test_idempotency_key_reused(self):
+        self._post([self._activity("NEW")], key="batch-1")
+        response = self._post([self._activity("OTHER")], key="batch-1")
+
+        self.assertEqual(response.status_code, HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(Activity.objects.filter(id="OTHER").exists())
+
+    def test_idempotency_key_in_progress(self):
+        self._post([self._activity("NEW")], key="batch-1")
+        IdempotencyKey.objects.update(status=None, data=None)
+        response = self._post([self._activity("NEW")], key="batch-1")
+
+        self.assertEqual(response.status_code, HTTP_409_CONFLICT)
+
+    def test_idempotency_key_outlives_cache(self):
+        self._post([self._activity("NEW")], key="batch-1")
+        activity_cache.clear()
+        Activity.objects.filter(id="NEW").delete()
+
+        retried = self._post([self._activity("NEW")], key="batch-1")
+
+        self.assertEqual(retried["Idempotent-Replayed"], "true")
+        self.assertFalse(Activity.objects.filter(id="NEW").exists())
+
+    def test_expired_idempotency_key(self):
+        self._post([self._activity("NEW")], key="batch-1")
+        self._post([self._activity("NEW2")], key="batch-2")
+        IdempotencyKey.objects.filter(key="batch-1").update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        stdout = StringIO()
+        call_command("purge_idempotency_keys", stdout=stdout)
+
+        self.assertIn("Deleted 1 idempotency keys", stdout.getvalue())
+        response = self._post([self._activity("OTHER")], key="batch-1")
+        self.assertEqual(response.json()["created"], 1)
+
+    def test_idempotency_key_invalid(self):
+        response = self._post([self._activity("NEW")], key="x" * 256)
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
@@ -0,0 +1,131 @@
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST
+from rest_framework.test import APIClient
+
+from activity.models import Activity, TrackBalance
+from activity.tools.importers import activity_importer
+
+
+class ActivityImportsTest(TestCase):
+    def setUp(self) -> None:
+        self.bulk_create_view = "activity_bulk_create"
+
+        self.client = APIClient()
+
+        Activity.objects.create(
+            id="1",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T123456",
+            status="S",
+            billig_amount=Decimal(10.54),
+        )
+
+    def _post(self, lines: list):
+        return self.client.post(
+            reverse(self.bulk_create_view),
+            data="\n".join(lines).encode(),
+            content_type="application/x-ndjson",
+        )
+
+    def _activity(self, activity_id: str, track_id: str = "TRACK_ID_1", **kwargs):
+        activity = {
+            "id": activity_id,
+            "activity_date": "2021-04-16T09:14:16.435742",
+            "track_id": track_id,
+            "status": "S",
+            "billig_amount": 10,
+        }
+        activity.update(kwargs)
+        return json.dumps(activity)
+
+    def test_import_activities(self):
+        lines = [self._activity(activity_id=str(index)) for index in range(10, 20)]
+        with patch.object(activity_importer, "chunk_size", 3):
+            response = self._post(lines=lines)
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(response.data["accepted"], 10)
+        self.assertEqual(response.data["rejected"], 0)
+        self.assertEqual(response.data["last_line"], 10)
+        self.assertTrue(response.data["complete"])
+        self.assertEqual(Activity.objects.filter(track_id="TRACK_ID_1").count(), 10)
+        self.assertEqual(
+            TrackBalance.objects.get(track_id="TRACK_ID_1").amount, Decimal(100)
+        )
+
+    def test_import_reports_rejected_lines(self):
+        lines = [
+            self._activity(activity_id="10"),
+            "{not a json",
+            "",
+            self._activity(activity_id="11", status="X"),
+            self._activity(activity_id="1"),
+            self._activity(activity_id="10", track_id="TRACK_ID_2"),
+            self._activity(activity_id="12", billig_amount="q"),
+        ]
+        response = self._post(lines=lines)
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(response.data["accepted"], 1)
+        self.assertEqual(response.data["rejected"], 5)
+        self.assertEqual(
+            sorted(error["line"] for error in response.data["errors"]),
+            [2, 4, 5, 6, 7],
+        )
+        self.assertEqual(Activity.objects.get(id="10").track_id, "TRACK_ID_1")
+        self.assertEqual(Activity.objects.get(id="1").track_id, "T123456")
+
+    def test_import_nothing_to_store(self):
+        response = self._post(lines=[self._activity(activity_id="1")])
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["accepted"], 0)
+        self.assertEqual(response.data["rejected"], 1)
+
+    def test_import_empty_body(self):
+        response = self._post(lines=[])
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data,
+            {
+                "accepted": 0,
+                "rejected": 0,
+                "errors": [],
+                "last_line": 0,
+                "complete": True,
+            },
+        )
+
+    @override_settings(ACTIVITY_BULK_MAX_LINES=2000)
+    def test_import_resumes_after_last_line(self):
+        # More lines than a request stores, in chunks of the default size.
+        lines = [
+            self._activity(activity_id=f"A{index}", track_id=f"TRACK_{index % 50}")
+            for index in range(2500)
+        ]
+        response = self._post(lines=lines)
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(response.data["accepted"], 2000)
+        self.assertEqual(response.data["last_line"], 2000)
+        self.assertFalse(response.data["complete"])
+        self.assertEqual(Activity.objects.filter(id__startswith="A").count(), 2000)
+
+        last_line = response.data["last_line"]
+        response = self._post(lines=lines[last_line:])
+
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(response.data["accepted"], 500)
+        self.assertEqual(response.data["rejected"], 0)
+        self.assertTrue(response.data["complete"])
+        self.assertEqual(Activity.objects.filter(id__startswith="A").count(), 2500)
+        self.assertEqual(
+            TrackBalance.objects.get(track_id="TRACK_0").amount, Decimal(500)
+        )
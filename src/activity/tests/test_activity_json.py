@@ -0,0 +1,139 @@
+import io
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.status import HTTP_200_OK
+from rest_framework.test import APIClient
+
+from activity.models import Activity
+from activity.serializers import ActivitySerializer
+from activity.tools.balances import activity_balancer
+from activity.tools.caches import activity_cache
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTest(SimpleTestCase):
+    data = {
+        "amount": Decimal("10.54"),
+        "negative": Decimal("-0.10"),
+        "naive": datetime(2021, 4, 16, 8, 5, 35, 941465),
+        "aware": datetime(2021, 4, 16, 8, 5, 35, tzinfo=timezone.utc),
+        "date": date(2021, 4, 16),
+        "time": time(8, 5, 35, 941465),
+        "text": "Zażółć \u2028\u2029 \U0001f600",
+        "lazy": gettext_lazy("Not found."),
+        "items": [1, 2.5, None, True, {"nested": []}],
+    }
+
+    def test_same_as_json_renderer(self):
+        self.assertEqual(
+            FastJSONRenderer().render(self.data), JSONRenderer().render(self.data)
+        )
+
+    def test_serialized_activities(self):
+        data = ActivitySerializer(
+            [
+                Activity(
+                    id="1",
+                    activity_date=datetime(2021, 4, 16, 8, 5, 35, 941465),
+                    track_id="T123456",
+                    status="S",
+                    billig_amount=Decimal("10.54"),
+                )
+            ],
+            many=True,
+        ).data
+
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_fallbacks(self):
+        renderer = FastJSONRenderer()
+        data = {"big": 2**70, **self.data}
+
+        self.assertEqual(renderer.render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            renderer.render(self.data, "application/json; indent=4"),
+            JSONRenderer().render(self.data, "application/json; indent=4"),
+        )
+        self.assertEqual(renderer.render(None), b"")
+        with mock.patch("core.renderers.orjson", None):
+            self.assertEqual(
+                renderer.render(self.data), JSONRenderer().render(self.data)
+            )
+
+
+class FastJSONParserTest(SimpleTestCase):
+    def _parse(self, parser, body: bytes, encoding: str = "utf-8"):
+        return parser.parse(
+            io.BytesIO(body), "application/json", {"encoding": encoding}
+        )
+
+    def test_same_as_json_parser(self):
+        for body, encoding in (
+            (b'{"id": "1", "billig_amount": 10.54, "items": [1, null, true]}', "utf-8"),
+            ('{"text": "Zażółć \\u2028"}'.encode(), "utf-8"),
+            ('["Zażółć"]'.encode("iso-8859-2"), "iso-8859-2"),
+            (
+                b'{"big": 123456789012345678901234567890, "id": "12345678901234567890"}',
+                "utf-8",
+            ),
+            (b"-123456789012345678901234567890", "utf-8"),
+            (b'{"huge": 1e400}', "utf-8"),
+        ):
+            with self.subTest(body=body):
+                self.assertEqual(
+                    self._parse(FastJSONParser(), body, encoding),
+                    self._parse(JSONParser(), body, encoding),
+                )
+
+        self.assertIsInstance(
+            self._parse(FastJSONParser(), b"[123456789012345678901234567890]")[0], int
+        )
+
+    def test_invalid(self):
+        for body in (b'{"id": ', b'{"amount": NaN}', b"\xff"):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    self._parse(JSONParser(), body)
+                with self.assertRaises(ParseError) as raised:
+                    self._parse(FastJSONParser(), body)
+                self.assertEqual(str(raised.exception), str(expected.exception))
+
+    def test_without_orjson(self):
+        with mock.patch("core.parsers.orjson", None):
+            self.assertEqual(self._parse(FastJSONParser(), b'{"id": "1"}'), {"id": "1"})
+
+
+class ActivityJSONViewTest(TestCase):
+    def setUp(self) -> None:
+        self.detail_view = "activity_aggregate"
+
+        self.client = APIClient()
+        activity_cache.clear()
+
+        Activity.objects.create(
+            id="1",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T123456",
+            status="S",
+            billig_amount=Decimal("10.54"),
+        )
+        activity_balancer.rebuild()
+
+    def test_default_renderer(self):
+        response = self.client.get(
+            reverse(self.detail_view, kwargs={"track_id": "T123456"})
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertIsInstance(response.accepted_renderer, FastJSONRenderer)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
@@ -0,0 +1,97 @@
+import json
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework.status import HTTP_200_OK
+from rest_framework.test import APIClient
+
+from activity.models import Activity
+from activity.tools.balances import activity_balancer
+from activity.tools.caches import activity_cache
+from core.metrics import Histogram, request_metrics
+
+
+class ActivityMetricsTest(TestCase):
+    def setUp(self) -> None:
+        self.detail_view = "activity_aggregate"
+        self.metrics_view = "metrics"
+
+        self.client = APIClient()
+        activity_cache.clear()
+        request_metrics.reset()
+
+        Activity.objects.create(
+            id="1",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T123456",
+            status="S",
+            billig_amount=Decimal(10.54),
+        )
+        activity_balancer.rebuild()
+
+    def test_server_timing_header(self):
+        response = self.client.get(
+            reverse(self.detail_view, kwargs={"track_id": "T123456"})
+        )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="1 queries", serialize;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+
+    def test_structured_log(self):
+        with self.assertLogs("core.middleware", "INFO") as logs:
+            self.client.get(reverse(self.detail_view, kwargs={"track_id": "T123456"}))
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], self.detail_view)
+        self.assertEqual(record["status"], HTTP_200_OK)
+        self.assertEqual(record["db_queries"], 1)
+        self.assertGreater(record["serialize_ms"], 0)
+
+    def test_metrics_endpoint(self):
+        for _ in range(3):
+            self.client.get(reverse(self.detail_view, kwargs={"track_id": "T123456"}))
+        response = self.client.get(reverse(self.metrics_view))
+        metrics = response.content.decode()
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            'http_requests_total{view="activity_aggregate",method="GET",status="200"} 3',
+            metrics,
+        )
+        self.assertIn(
+            'http_request_db_queries_bucket{view="activity_aggregate",method="GET",'
+            'le="0"} 2',
+            metrics,
+        )
+        self.assertIn(
+            'http_request_db_queries_sum{view="activity_aggregate",method="GET"} 1',
+            metrics,
+        )
+        self.assertRegex(metrics, r'activity_cache_lookups_total\{result="hit"\} \d+')
+
+
+class HistogramTest(SimpleTestCase):
+    def test_expose(self):
+        histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+        labels = (("view", 'a"b'),)
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(labels, value)
+
+        self.assertEqual(
+            histogram.expose(),
+            [
+                "# HELP latency_seconds Latency",
+                "# TYPE latency_seconds histogram",
+                'latency_seconds_bucket{view="a\\"b",le="0.1"} 2',
+                'latency_seconds_bucket{view="a\\"b",le="1"} 3',
+                'latency_seconds_bucket{view="a\\"b",le="+Inf"} 4',
+                'latency_seconds_sum{view="a\\"b"} 3.65',
+                'latency_seconds_count{view="a\\"b"} 4',
+            ],
+        )
@@ -1,9 +1,20 @@
 from decimal import Decimal
+from io import StringIO
+from unittest import skipIf, skipUnless
 
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
 from django.db.utils import IntegrityError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
 
 from activity.models import Activity
+from activity.pagination import ActivityHistoryPagination
+from activity.tools.aggregators import DatabaseActivityAggregator
 
 
 class ActivityModelTest(TestCase):
@@ -74,3 +85,138 @@ class ActivityModelTest(TestCase):
             )
         except IntegrityError:
             self.assertTrue(True)
+
+
+class ActivityStorageTest(TestCase):
+    def setUp(self) -> None:
+        Activity.objects.create(
+            id="X13200000Z",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T123456",
+            status="R",
+            billig_amount=Decimal("10.54"),
+        )
+
+    def _stored(self) -> list:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT status, billig_amount FROM activity_activity")
+            # SQLite returns numeric columns as floats.
+            return [
+                (status, Decimal(str(amount))) for status, amount in cursor.fetchall()
+            ]
+
+    def _check_lookups(self):
+        activity = Activity.objects.get(status="R", billig_amount__gt=Decimal("10.5"))
+        self.assertEqual(activity.status, "R")
+        self.assertEqual(activity.billig_amount, Decimal("10.54"))
+        self.assertFalse(Activity.objects.filter(status__in=["S", "T"]).exists())
+
+    @skipIf(settings.ACTIVITY_COMPACT_STORAGE, "Activities are stored compactly")
+    def test_stored_as_letters_and_numeric(self):
+        self.assertEqual(self._stored(), [("R", Decimal("10.54"))])
+        self._check_lookups()
+
+    @skipIf(settings.ACTIVITY_COMPACT_STORAGE, "Activities are stored compactly")
+    @skipUnless(connection.vendor == "postgresql", "DDL is rolled back on PostgreSQL")
+    def test_compact_command(self):
+        with override_settings(ACTIVITY_COMPACT_STORAGE=True):
+            output = StringIO()
+            call_command("compact_activity_storage", stdout=output)
+            self.assertIn(
+                "Converted status, billig_amount on default", output.getvalue()
+            )
+            self.assertEqual(self._stored(), [(3, 1054)])
+            self._check_lookups()
+
+            output = StringIO()
+            call_command("compact_activity_storage", stdout=output)
+            self.assertIn(
+                "Activities on default are already compact", output.getvalue()
+            )
+
+    @skipIf(settings.ACTIVITY_COMPACT_STORAGE, "Activities are stored compactly")
+    @skipUnless(connection.vendor == "postgresql", "DDL is rolled back on PostgreSQL")
+    def test_compact_command_stops_on_unknown_status(self):
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE activity_activity SET status = ''")
+
+        with override_settings(ACTIVITY_COMPACT_STORAGE=True):
+            with self.assertRaisesMessage(
+                CommandError, "1 rows match status NOT IN ('A', 'S', 'R')"
+            ):
+                call_command("compact_activity_storage", stdout=StringIO())
+        self.assertEqual(self._stored(), [("", Decimal("10.54"))])
+
+    def test_compact_command_needs_setting(self):
+        with override_settings(ACTIVITY_COMPACT_STORAGE=False):
+            with self.assertRaises(CommandError):
+                call_command("compact_activity_storage", stdout=StringIO())
+
+    @skipUnless(settings.ACTIVITY_COMPACT_STORAGE, "Activities keep the old layout")
+    def test_stored_as_codes_and_cents(self):
+        self.assertEqual(self._stored(), [(3, 1054)])
+        self._check_lookups()
+
+    def test_unknown_status_is_not_stored(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Activity.objects.create(
+                id="X13200001Z",
+                activity_date="2021-04-16T08:05:35.941465",
+                track_id="T123456",
+                status="T",
+                billig_amount=Decimal("10.54"),
+            )
+
+
+# Partitions get their own copy of the index, named after the partition.
+TRACK_DATE_ID_INDEX = (
+    r"activity_track_date_id_idx|_track_id_activity_date_id_status_\w*idx"
+)
+
+
+class ActivityIndexesTest(TestCase):
+    def setUp(self) -> None:
+        Activity.objects.create(
+            id="X13200000Z",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T123456",
+            status="S",
+            billig_amount=Decimal(10.54),
+        )
+        # Planner prefers sequential and bitmap scans on tiny tables, so disable
+        # them to check that the queries can be answered from the index at all.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+
+    def test_track_history_uses_index(self):
+        plan = (
+            Activity.objects.filter(track_id="T123456")
+            .order_by("-activity_date")
+            .explain()
+        )
+        self.assertRegex(plan, TRACK_DATE_ID_INDEX)
+
+    def test_track_history_page_uses_index(self):
+        request = APIRequestFactory().get(
+            "/", {"cursor": "MjAyMS0wNC0xNlQwODowNTozNS45NDE0NjV8WDEzMjAwMDAwWg=="}
+        )
+        paginator = ActivityHistoryPagination()
+        position = paginator.decode_cursor(request=Request(request))
+        plan = (
+            Activity.objects.filter(track_id="T123456")
+            .filter(paginator._before(position=position))
+            .order_by("-activity_date", "-id")[:11]
+            .explain()
+        )
+        self.assertRegex(plan, f"Scan Backward using \\w*({TRACK_DATE_ID_INDEX})")
+        self.assertIn("ROW(activity_date, id) < ROW(", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_track_aggregate_uses_index(self):
+        activities = Activity.objects.filter(track_id="T123456")
+        plan = DatabaseActivityAggregator._annotate_tracks(
+            activities=activities
+        ).explain()
+        self.assertRegex(plan, TRACK_DATE_ID_INDEX)
+        self.assertNotIn("Seq Scan", plan)
@@ -0,0 +1,220 @@
+import re
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from activity.models import Activity, ActivityArchive, ActivityKey, TrackRollup
+from activity.tools.aggregators import DatabaseActivityAggregator
+from activity.tools.checkers import activity_checker
+from activity.tools.checkpoints import activity_checkpointer
+from activity.tools.partitions import activity_partitioner
+from activity.tools.readers import activity_reader
+from activity.tools.writers import activity_writer
+
+
+@skipUnless(connection.vendor == "postgresql", "Partitioning needs PostgreSQL")
+class ActivityPartitionsTest(TestCase):
+    def setUp(self) -> None:
+        for month in range(3, 7):
+            activity_partitioner.create(month=datetime(2021, month, 1))
+
+        started = datetime(2021, 3, 20, 8, 0, 0)
+        Activity.objects.bulk_create(
+            [
+                Activity(
+                    id=f"P{index:03d}",
+                    activity_date=started + timedelta(hours=12 * index),
+                    track_id="T1",
+                    status="SR"[index % 2],
+                    billig_amount=Decimal(index + 1),
+                )
+                for index in range(60)
+            ]
+        )
+
+    @staticmethod
+    def _partition_of(activity_id: str) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM activity_activity WHERE id = %s",
+                [activity_id],
+            )
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def _scanned(sql: str, params=()) -> set:
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            plan = "\n".join(line for line, in cursor.fetchall())
+        return set(re.findall(r"activity_activity_(?:\d{4}_\d{2}|default)", plan))
+
+    def test_partitions(self):
+        self.assertEqual(
+            activity_partitioner.partitions(),
+            [datetime(2021, month, 1) for month in range(3, 7)],
+        )
+        self.assertEqual(self._partition_of("P000"), "activity_activity_2021_03")
+        self.assertEqual(self._partition_of("P059"), "activity_activity_2021_04")
+        self.assertFalse(activity_partitioner.create(month=datetime(2021, 4, 10)))
+
+    def test_create_moves_default_rows(self):
+        Activity.objects.create(
+            id="LATER",
+            activity_date=datetime(2021, 8, 31, 23, 59),
+            track_id="T1",
+            status="S",
+            billig_amount=Decimal(1),
+        )
+        self.assertEqual(self._partition_of("LATER"), "activity_activity_default")
+
+        self.assertEqual(
+            activity_partitioner.cover_default(), ["activity_activity_2021_08"]
+        )
+        self.assertEqual(self._partition_of("LATER"), "activity_activity_2021_08")
+
+    def test_duplicate_id_in_other_partition(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Activity.objects.create(
+                id="P000",
+                activity_date=datetime(2021, 6, 1),
+                track_id="T1",
+                status="S",
+                billig_amount=Decimal(1),
+            )
+
+    def test_save_new_skips_stored_ids(self):
+        activities = [
+            Activity(
+                id=activity_id,
+                activity_date=datetime(2021, 6, 1),
+                track_id="T2",
+                status="S",
+                billig_amount=Decimal(1),
+            )
+            for activity_id in ("P000", "NEW")
+        ]
+        created = activity_writer.save_new(activities=activities)
+
+        self.assertEqual([activity.id for activity in created], ["NEW"])
+        self.assertEqual(self._partition_of("P000"), "activity_activity_2021_03")
+        self.assertTrue(ActivityKey.objects.filter(id="NEW").exists())
+
+        # The registering trigger is back on for the next insert.
+        Activity.objects.create(
+            id="NEXT",
+            activity_date=datetime(2021, 6, 2),
+            track_id="T2",
+            status="S",
+            billig_amount=Decimal(1),
+        )
+        self.assertTrue(ActivityKey.objects.filter(id="NEXT").exists())
+
+    def test_history_prunes_partitions(self):
+        activities = activity_reader.history(
+            track_id="T1",
+            date_from=datetime(2021, 4, 2),
+            date_to=datetime(2021, 4, 10),
+        ).order_by("-activity_date", "-id")[:11]
+
+        self.assertEqual(
+            self._scanned(*activities.query.sql_with_params()),
+            {"activity_activity_2021_04"},
+        )
+
+    def test_aggregate_prunes_partitions(self):
+        activities = DatabaseActivityAggregator._annotate_tracks(
+            activities=Activity.objects.filter(
+                track_id="T1",
+                activity_date__gte=datetime(2021, 4, 1),
+                activity_date__lt=datetime(2021, 6, 1),
+            )
+        )
+        self.assertEqual(
+            self._scanned(*activities.query.sql_with_params()),
+            {"activity_activity_2021_04", "activity_activity_2021_05"},
+        )
+
+        activity_checkpointer.backfill(until=datetime(2021, 4, 15))
+        with CaptureQueriesContext(connection) as queries:
+            activity_checkpointer.balance(track_id="T1", until=datetime(2021, 4, 20))
+        self.assertEqual(
+            self._scanned(queries.captured_queries[-1]["sql"]),
+            {"activity_activity_2021_04"},
+        )
+
+    def test_detach(self):
+        detached = activity_partitioner.detach(before=datetime(2021, 4, 1))
+
+        self.assertEqual(detached, ["activity_activity_2021_03"])
+        self.assertEqual(activity_partitioner.partitions()[0], datetime(2021, 4, 1))
+        self.assertFalse(Activity.objects.filter(id="P000").exists())
+        self.assertFalse(
+            activity_checker.check_possibility_to_save(
+                data={
+                    "id": "P000",
+                    "activity_date": "2021-04-01T00:00:00.000000",
+                    "track_id": "T1",
+                    "status": "S",
+                    "billig_amount": 1,
+                }
+            )
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM activity_archive.activity_activity_2021_03"
+            )
+            self.assertEqual(cursor.fetchone()[0], 24)
+
+        self.assertEqual(
+            activity_partitioner.detach(before=datetime(2021, 6, 1), drop=True),
+            ["activity_activity_2021_04", "activity_activity_2021_05"],
+        )
+        self.assertEqual(Activity.objects.count(), 0)
+
+    def test_rebuilds_refuse_archived_months(self):
+        activity_partitioner.detach(before=datetime(2021, 4, 1))
+
+        self.assertEqual(
+            list(ActivityArchive.objects.values_list("month", "dropped")),
+            [(datetime(2021, 3, 1), False)],
+        )
+        for args in (
+            ["rebuild_track_balances"],
+            ["rebuild_track_balances", "--verify"],
+            ["create_track_checkpoints", "--backfill"],
+            ["rebuild_track_rollups"],
+            ["rebuild_track_rollups", "--since", "2021-03-31"],
+        ):
+            with self.assertRaisesMessage(CommandError, "before 2021-04 are archived"):
+                call_command(*args, stdout=StringIO())
+
+        call_command(
+            "rebuild_track_rollups", "--since", "2021-04-01", stdout=StringIO()
+        )
+        # Activities of April 1st to 18th.
+        self.assertEqual(TrackRollup.objects.filter(granularity="day").count(), 18)
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command("activity_partitions", "--ahead", "1", stdout=stdout)
+        month = activity_partitioner.month(datetime.utcnow())
+
+        self.assertIn(
+            f"Created {activity_partitioner.partition_name(month)}", stdout.getvalue()
+        )
+        self.assertIn(month, activity_partitioner.partitions())
+
+        call_command("activity_partitions", "--detach-before", "2021-04", stdout=stdout)
+        self.assertIn("Archived activity_activity_2021_03", stdout.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command(
+                "activity_partitions", "--detach-before", "2999-01", stdout=stdout
+            )
@@ -0,0 +1,148 @@
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.status import HTTP_200_OK, HTTP_202_ACCEPTED, HTTP_400_BAD_REQUEST
+from rest_framework.test import APIClient
+
+from activity.models import Activity, ActivityQueueEntry, TrackBalance
+from activity.tools.caches import activity_cache
+from activity.tools.queues import activity_queue
+
+
+@override_settings(ACTIVITY_INGEST_MODE="queue")
+class ActivityQueueTest(TestCase):
+    def setUp(self) -> None:
+        self.create_view = "activity_create"
+        self.stats_view = "activity_queue_stats"
+
+        self.client = APIClient()
+        activity_cache.clear()
+
+    @staticmethod
+    def _activity(activity_id: str, status: str = "S", amount: int = 10) -> dict:
+        return {
+            "id": activity_id,
+            "activity_date": "2021-04-16T08:05:35.941465",
+            "track_id": "T123456",
+            "status": status,
+            "billig_amount": amount,
+        }
+
+    def _post(self, payload):
+        return self.client.post(
+            reverse(self.create_view),
+            data=json.dumps(payload),
+            content_type="application/json",
+        )
+
+    def _drain(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return activity_queue.drain(**kwargs)
+
+    def test_enqueue_accepts_without_storing(self):
+        response = self._post([self._activity("Q1"), {"id": "broken"}])
+
+        self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+        entry = ActivityQueueEntry.objects.get()
+        self.assertEqual(response.data, {"id": entry.id, "activities": 1})
+        self.assertEqual(
+            entry.activities,
+            [
+                {
+                    "id": "Q1",
+                    "activity_date": "2021-04-16T08:05:35.941465",
+                    "track_id": "T123456",
+                    "status": "S",
+                    "billig_amount": "10.00",
+                }
+            ],
+        )
+        self.assertFalse(Activity.objects.exists())
+
+    def test_enqueue_single_activity(self):
+        response = self._post(self._activity("Q1"))
+
+        self.assertEqual(response.status_code, HTTP_202_ACCEPTED)
+        self.assertEqual(ActivityQueueEntry.objects.get().size, 1)
+
+    def test_enqueue_invalid(self):
+        response = self._post([{"id": "broken"}])
+
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertFalse(ActivityQueueEntry.objects.exists())
+
+    def test_drain_coalesces_requests(self):
+        Activity.objects.create(
+            id="STORED",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T123456",
+            status="S",
+            billig_amount=Decimal(1),
+        )
+        TrackBalance.objects.create(
+            track_id="T123456",
+            amount=Decimal(1),
+            last_status="S",
+            last_activity_date="2021-04-16T08:05:35.941465",
+        )
+        # Within a request the last occurrence of an ID wins, across requests
+        # the first one, the same as when requests are stored one by one.
+        self._post([self._activity("Q1", amount=5), self._activity("Q1", amount=7)])
+        self._post([self._activity("Q1", amount=100), self._activity("Q2", "R", 2)])
+        self._post([self._activity("STORED", amount=100)])
+
+        report = self._drain()
+
+        self.assertEqual((report.entries, report.activities, report.created), (3, 4, 2))
+        self.assertEqual(
+            dict(Activity.objects.values_list("id", "billig_amount")),
+            {"STORED": Decimal(1), "Q1": Decimal(7), "Q2": Decimal(2)},
+        )
+        self.assertEqual(
+            TrackBalance.objects.get(track_id="T123456").amount, Decimal(1 + 7 - 2)
+        )
+        self.assertFalse(ActivityQueueEntry.objects.exists())
+        self.assertEqual(self._drain().entries, 0)
+
+    def test_drain_batch_size(self):
+        for index in range(3):
+            self._post([self._activity(f"Q{index}{item}") for item in range(2)])
+
+        self.assertEqual(self._drain(batch_size=3).entries, 1)
+        self.assertEqual(self._drain(batch_size=4).entries, 2)
+        self.assertEqual(Activity.objects.count(), 6)
+
+    def test_stats(self):
+        response = self.client.get(reverse(self.stats_view))
+        self.assertEqual(
+            response.data,
+            {"entries": 0, "activities": 0, "oldest_enqueued_at": None, "lag": None},
+        )
+
+        self._post([self._activity("Q1"), self._activity("Q2")])
+        self._post([self._activity("Q3")])
+        ActivityQueueEntry.objects.update(
+            enqueued_at=timezone.now() - timedelta(seconds=30)
+        )
+        response = self.client.get(reverse(self.stats_view))
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data["entries"], 2)
+        self.assertEqual(response.data["activities"], 3)
+        self.assertGreaterEqual(response.data["lag"], 30)
+
+    def test_drain_command(self):
+        self._post([self._activity("Q1")])
+        stdout = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("drain_activity_queue", "--once", stdout=stdout)
+
+        self.assertIn("Stored 1 of 1 activities from 1 requests", stdout.getvalue())
+        self.assertTrue(Activity.objects.filter(id="Q1").exists())
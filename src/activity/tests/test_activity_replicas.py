@@ -0,0 +1,146 @@
+import json
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection, connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
+from rest_framework.test import APIClient
+
+from activity.models import Activity, TrackBalance
+from activity.tools.caches import activity_cache
+from activity.tools.readers import activity_reader
+from activity.tools.replicas import activity_replicas
+from core.routers import DatabaseRouter, replica_reads
+
+
+REPLICA = "replica"
+
+if connection.vendor == "postgresql":
+    # A second local database the test runner creates next to the default one.
+    # Nothing is replicated to it, so every read shows which database served it.
+    connections.databases.setdefault(
+        REPLICA,
+        {
+            **connections.databases["default"],
+            "TEST": {
+                "NAME": f"test_{connections.databases['default']['NAME']}_replica"
+            },
+        },
+    )
+
+
+@skipUnless(connection.vendor == "postgresql", "The replica is a PostgreSQL database")
+@override_settings(DATABASE_REPLICAS=[REPLICA], DATABASE_REPLICA_STICKY_SECONDS=5)
+class ActivityReplicasTest(TestCase):
+    databases = "__all__"
+
+    def setUp(self) -> None:
+        self.create_view = "activity_create"
+        self.detail_view = "activity_aggregate"
+        self.history_view = "activity_history"
+
+        self.client = APIClient()
+        activity_cache.clear()
+
+        for database, amount in (("default", 10), (REPLICA, 7)):
+            Activity.objects.using(database).create(
+                id=f"{database.upper()}1",
+                activity_date="2021-04-16T08:05:35.941465",
+                track_id="T123456",
+                status="S",
+                billig_amount=Decimal(amount),
+            )
+            TrackBalance.objects.using(database).create(
+                track_id="T123456",
+                amount=Decimal(amount),
+                last_status="S",
+                last_activity_date="2021-04-16T08:05:35.941465",
+            )
+
+    def _history_ids(self, track_id: str = "T123456") -> list:
+        response = self.client.get(
+            reverse(self.history_view, kwargs={"track_id": track_id})
+        )
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        return [activity["id"] for activity in response.data["results"]]
+
+    def _post(self, activity_id: str) -> None:
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse(self.create_view),
+                data=json.dumps(
+                    {
+                        "id": activity_id,
+                        "activity_date": "2021-04-17T08:05:35.941465",
+                        "track_id": "T123456",
+                        "status": "S",
+                        "billig_amount": 1,
+                    }
+                ),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+
+    def test_reads_from_replica(self):
+        response = self.client.get(
+            reverse(self.detail_view, kwargs={"track_id": "T123456"})
+        )
+
+        self.assertEqual(response.data["amount"], Decimal(7))
+        self.assertEqual(self._history_ids(), ["REPLICA1"])
+        self.assertEqual(
+            activity_reader.retrieve_many(track_ids=["T123456"])["results"][0][
+                "amount"
+            ],
+            Decimal(7),
+        )
+
+    def test_reads_own_writes(self):
+        self._post(activity_id="NEW")
+
+        self.assertEqual(self._history_ids(), ["NEW", "DEFAULT1"])
+        self.assertTrue(Activity.objects.using("default").filter(id="NEW").exists())
+        self.assertFalse(Activity.objects.using(REPLICA).filter(id="NEW").exists())
+        response = self.client.get(
+            reverse(self.detail_view, kwargs={"track_id": "T123456"}),
+            data={"as_of": "2021-05-01T00:00:00"},
+        )
+        self.assertEqual(response.data["amount"], Decimal(11))
+        # Other tracks are still read from replicas.
+        self.assertEqual(self._history_ids(track_id="T654321"), [])
+
+        # The sticky window is over.
+        activity_cache.clear()
+        self.assertEqual(self._history_ids(), ["REPLICA1"])
+
+    def test_sticky_window_disabled(self):
+        with self.settings(DATABASE_REPLICA_STICKY_SECONDS=0):
+            self._post(activity_id="NEW")
+
+        self.assertEqual(self._history_ids(), ["REPLICA1"])
+
+    def test_router(self):
+        router = DatabaseRouter()
+
+        self.assertEqual(router.db_for_read(Activity), "default")
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Activity), REPLICA)
+            balance = TrackBalance.objects.get(track_id="T123456")
+            with replica_reads(enabled=False):
+                self.assertEqual(router.db_for_read(Activity), "default")
+        self.assertEqual(router.db_for_write(TrackBalance, instance=balance), "default")
+        self.assertFalse(router.allow_migrate(REPLICA, "activity"))
+        self.assertIsNone(router.allow_migrate("default", "activity"))
+
+        with self.settings(DATABASE_REPLICAS=[]), replica_reads():
+            self.assertEqual(router.db_for_read(Activity), "default")
+
+    def test_replica_reads_only_when_enabled(self):
+        with activity_replicas.reads(track_ids=["T123456"]):
+            self.assertEqual(Activity.objects.get().id, "REPLICA1")
+        activity_replicas.stick(track_ids=["T123456"])
+        with activity_replicas.reads(track_ids=["T654321", "T123456"]):
+            self.assertEqual(Activity.objects.get().id, "DEFAULT1")
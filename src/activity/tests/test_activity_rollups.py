@@ -0,0 +1,232 @@
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST
+from rest_framework.test import APIClient
+
+from activity.models import Activity, TrackRollup
+from activity.tools.caches import activity_cache
+from activity.tools.rollups import activity_rollups
+
+
+class ActivityRollupsTest(TestCase):
+    def setUp(self) -> None:
+        self.create_view = "activity_create"
+        self.rollup_view = "activity_rollups"
+
+        self.client = APIClient()
+        activity_cache.clear()
+
+    def _post(self, activities: list) -> None:
+        response = self.client.post(
+            reverse(self.create_view),
+            data=json.dumps(
+                [
+                    {
+                        "id": activity_id,
+                        "activity_date": activity_date,
+                        "track_id": track_id,
+                        "status": status,
+                        "billig_amount": amount,
+                    }
+                    for activity_id, activity_date, track_id, status, amount in activities
+                ]
+            ),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+
+    def _store_sample(self) -> None:
+        self._post(
+            [
+                ("1", "2021-04-16T08:05:00.000000", "T1", "S", 10),
+                ("2", "2021-04-16T08:55:00.000000", "T1", "R", 3),
+                ("3", "2021-04-16T10:00:00.000000", "T1", "A", 0),
+                ("4", "2021-04-17T01:00:00.000000", "T1", "S", 5),
+                ("5", "2021-04-16T09:30:00.000000", "T2", "S", 7),
+            ]
+        )
+
+    def _rollups(self) -> list:
+        return list(
+            TrackRollup.objects.order_by(
+                "track_id", "granularity", "bucket_start"
+            ).values(
+                "track_id",
+                "granularity",
+                "bucket_start",
+                "amount_s",
+                "amount_r",
+                "count_a",
+                "count_s",
+                "count_r",
+                "last_status",
+                "last_activity_date",
+            )
+        )
+
+    def _get(self, **params):
+        return self.client.get(reverse(self.rollup_view), data=params)
+
+    def test_rollups_are_updated_on_ingest(self):
+        self._store_sample()
+
+        day = TrackRollup.objects.get(
+            track_id="T1", granularity="day", bucket_start=datetime(2021, 4, 16)
+        )
+        self.assertEqual((day.amount_s, day.amount_r), (Decimal(10), Decimal(3)))
+        self.assertEqual((day.count_a, day.count_s, day.count_r), (1, 1, 1))
+        self.assertEqual(day.last_status, "A")
+        hour = TrackRollup.objects.get(
+            track_id="T1", granularity="hour", bucket_start=datetime(2021, 4, 16, 8)
+        )
+        self.assertEqual((hour.amount_s, hour.amount_r), (Decimal(10), Decimal(3)))
+        self.assertEqual(hour.last_status, "R")
+        self.assertEqual(TrackRollup.objects.filter(granularity="hour").count(), 4)
+
+    def test_late_activity_is_added_to_its_bucket(self):
+        self._store_sample()
+
+        self._post([("6", "2021-04-16T08:30:00.000000", "T1", "S", 4)])
+
+        hour = TrackRollup.objects.get(
+            track_id="T1", granularity="hour", bucket_start=datetime(2021, 4, 16, 8)
+        )
+        self.assertEqual((hour.amount_s, hour.count_s), (Decimal(14), 2))
+        # The activity at 08:55 stays the last one of the hour.
+        self.assertEqual(hour.last_status, "R")
+
+    def test_ingest_upserts_buckets_in_one_statement(self):
+        self._store_sample()
+        activities = [
+            Activity(
+                id=f"U{index}",
+                activity_date=datetime(2021, 4, 16, 6) + timedelta(minutes=25 * index),
+                track_id=f"T{index % 3 + 1}",
+                status="SRA"[index % 3],
+                billig_amount=Decimal(index + 1),
+            )
+            for index in range(60)
+        ]
+        Activity.objects.bulk_create(activities)
+        expected_rollups = len(self._rollups())
+
+        with self.assertNumQueries(1):
+            activity_rollups.apply(activities=activities)
+        applied = self._rollups()
+        self.assertGreater(len(applied), expected_rollups)
+
+        TrackRollup.objects.all().delete()
+        activity_rollups.rebuild()
+        self.assertEqual(applied, self._rollups())
+
+    def test_rebuild_matches_ingest(self):
+        self._store_sample()
+        self._post([("6", "2021-04-16T08:30:00.000000", "T1", "S", 4)])
+        expected = self._rollups()
+        TrackRollup.objects.all().delete()
+
+        stdout = StringIO()
+        call_command("rebuild_track_rollups", stdout=stdout)
+
+        self.assertIn(f"Created {len(expected)} track rollups", stdout.getvalue())
+        self.assertEqual(self._rollups(), expected)
+
+    def test_rebuild_since_keeps_older_rollups(self):
+        self._store_sample()
+        TrackRollup.objects.filter(bucket_start__lt=datetime(2021, 4, 17)).update(
+            amount_s=Decimal(99)
+        )
+        TrackRollup.objects.filter(bucket_start__gte=datetime(2021, 4, 17)).delete()
+
+        created = activity_rollups.rebuild(since=datetime(2021, 4, 17, 12))
+
+        self.assertEqual(created, 2)
+        self.assertEqual(
+            TrackRollup.objects.get(
+                granularity="day", track_id="T1", bucket_start=datetime(2021, 4, 17)
+            ).amount_s,
+            Decimal(5),
+        )
+        self.assertEqual(TrackRollup.objects.filter(amount_s=Decimal(99)).count(), 5)
+
+    def test_daily_series_of_all_tracks(self):
+        self._store_sample()
+
+        with self.assertNumQueries(1):
+            response = self._get(
+                **{"from": "2021-04-15T12:00:00", "to": "2021-04-18T00:00:00"}
+            )
+
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data["track_id"], None)
+        self.assertEqual(response.data["granularity"], "day")
+        self.assertEqual(
+            [
+                (bucket["bucket"], bucket["amount"], bucket["activities"])
+                for bucket in response.data["results"]
+            ],
+            [
+                ("2021-04-15T00:00:00", "0.00", 0),
+                ("2021-04-16T00:00:00", "14.00", 4),
+                ("2021-04-17T00:00:00", "5.00", 1),
+            ],
+        )
+
+    def test_hourly_series_of_track(self):
+        self._store_sample()
+
+        response = self._get(
+            **{
+                "track_id": "T1",
+                "granularity": "hour",
+                "from": "2021-04-16T08:00:00",
+                "to": "2021-04-16T11:00:00",
+            }
+        )
+
+        self.assertEqual(response.data["track_id"], "T1")
+        self.assertEqual(
+            [
+                (bucket["bucket"], bucket["amount"])
+                for bucket in response.data["results"]
+            ],
+            [
+                ("2021-04-16T08:00:00", "7.00"),
+                ("2021-04-16T09:00:00", "0.00"),
+                ("2021-04-16T10:00:00", "0.00"),
+            ],
+        )
+
+    def test_invalid_series_queries(self):
+        for params in (
+            {"to": "2021-04-18T00:00:00"},
+            {"from": "2021-04-18T00:00:00", "to": "2021-04-16T00:00:00"},
+            {
+                "from": "2021-04-16T00:00:00",
+                "to": "2021-04-18T00:00:00",
+                "granularity": "week",
+            },
+            {
+                "from": "2021-01-01T00:00:00",
+                "to": "2021-03-01T00:00:00",
+                "granularity": "hour",
+            },
+        ):
+            self.assertEqual(self._get(**params).status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self._get(
+                **{
+                    "from": "2021-01-01T00:00:00",
+                    "to": "2021-02-11T16:00:00",
+                    "granularity": "hour",
+                }
+            ).status_code,
+            HTTP_200_OK,
+        )
@@ -0,0 +1,430 @@
+import json
+from collections import Counter
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection, connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST
+from rest_framework.test import APIClient
+
+from activity.models import (
+    Activity,
+    ActivityKey,
+    TrackBalance,
+    TrackCheckpoint,
+    TrackRollup,
+)
+from activity.tools.caches import activity_cache
+from activity.tools.importers import activity_importer
+from activity.tools.notifications import activity_notifier
+from activity.tools.shards import ActivityShards, HashRing, activity_shards
+from activity.tools.writers import activity_writer
+from core.routers import database
+
+
+SHARDS = ["default", "shard_a", "shard_b"]
+
+if connection.vendor == "postgresql":
+    # Local databases the test runner creates next to the default one.
+    for shard in SHARDS[1:]:
+        connections.databases.setdefault(
+            shard,
+            {
+                **connections.databases["default"],
+                "TEST": {
+                    "NAME": f"test_{connections.databases['default']['NAME']}_{shard}"
+                },
+            },
+        )
+
+
+class HashRingTest(SimpleTestCase):
+    def setUp(self) -> None:
+        self.keys = [f"T{index}" for index in range(3000)]
+
+    def test_keys_are_spread_over_nodes(self):
+        ring = HashRing(nodes=["a", "b", "c"])
+
+        counts = Counter(ring.node(key) for key in self.keys)
+
+        self.assertEqual(set(counts), {"a", "b", "c"})
+        for count in counts.values():
+            self.assertGreater(count, 700)
+
+    def test_added_node_takes_keys_only_from_others(self):
+        before = HashRing(nodes=["a", "b", "c"])
+        after = HashRing(nodes=["a", "b", "c", "d"])
+
+        moved = [key for key in self.keys if before.node(key) != after.node(key)]
+
+        self.assertEqual({after.node(key) for key in moved}, {"d"})
+        self.assertLess(len(moved), len(self.keys) / 3)
+        self.assertGreater(len(moved), len(self.keys) / 6)
+
+    def test_empty_ring(self):
+        with self.assertRaises(ValueError):
+            HashRing(nodes=[])
+
+
+@skipUnless(connection.vendor == "postgresql", "Shards are PostgreSQL databases")
+@override_settings(ACTIVITY_SHARDS=SHARDS)
+class ActivityShardsTest(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self) -> None:
+        self.create_view = "activity_create"
+        self.detail_view = "activity_aggregate"
+        self.history_view = "activity_history"
+        self.batch_view = "activity_aggregate_batch"
+        self.rollup_view = "activity_rollups"
+
+        self.client = APIClient()
+        activity_cache.clear()
+        # Worker threads open their own connections, they are closed after
+        # every batch so the test databases can be dropped.
+        for shard in SHARDS:
+            patcher = mock.patch.dict(connections[shard].settings_dict, CONN_MAX_AGE=0)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.track_ids = {
+            shard: self._track_id(shard=shard, shards=SHARDS) for shard in SHARDS
+        }
+
+    @staticmethod
+    def _track_id(shard: str, shards: list) -> str:
+        ring = HashRing(nodes=shards)
+        return next(
+            f"T{index}" for index in range(1000) if ring.node(f"T{index}") == shard
+        )
+
+    @staticmethod
+    def _payload(track_ids: list) -> list:
+        return [
+            {
+                "id": f"A{index}{track_id}",
+                "activity_date": f"2021-04-1{index}T08:05:35.941465",
+                "track_id": track_id,
+                "status": "S",
+                "billig_amount": 10 * (index + 1),
+            }
+            for track_id in track_ids
+            for index in range(2)
+        ]
+
+    def _post(self, payload) -> int:
+        return self.client.post(
+            reverse(self.create_view),
+            data=json.dumps(payload),
+            content_type="application/json",
+        ).status_code
+
+    def _stored(self, shard: str) -> set:
+        return set(Activity.objects.using(shard).values_list("track_id", flat=True))
+
+    def test_mixed_tracks_are_written_per_shard(self):
+        with mock.patch.object(
+            ActivityShards, "_run", wraps=ActivityShards._run
+        ) as run:
+            status = self._post(self._payload(list(self.track_ids.values())))
+
+        self.assertEqual(status, HTTP_201_CREATED)
+        self.assertEqual(run.call_count, 3)
+        for shard, track_id in self.track_ids.items():
+            self.assertEqual(self._stored(shard), {track_id})
+            balance = TrackBalance.objects.using(shard).get()
+            self.assertEqual(
+                (balance.track_id, balance.amount), (track_id, Decimal(30))
+            )
+            self.assertEqual(ActivityKey.objects.using(shard).count(), 2)
+
+    def test_single_track_is_written_inline(self):
+        with mock.patch.object(ActivityShards, "_run") as run:
+            status = self._post(self._payload([self.track_ids["shard_a"]]))
+
+        self.assertEqual(status, HTTP_201_CREATED)
+        run.assert_not_called()
+        self.assertEqual(self._stored("shard_a"), {self.track_ids["shard_a"]})
+        self.assertEqual(self._stored("default"), set())
+
+    def test_stored_ids_are_skipped_per_shard(self):
+        payload = self._payload(list(self.track_ids.values()))
+        self._post(payload)
+
+        self.assertEqual(self._post(payload), HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._post(payload[0]), HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            sum(Activity.objects.using(shard).count() for shard in SHARDS), 6
+        )
+
+    def test_activity_ids_are_unique_per_shard_only(self):
+        # The same ID under tracks of different shards is stored twice,
+        # under another track of the same shard it is a duplicate.
+        ring = HashRing(nodes=SHARDS)
+        other_track_id = next(
+            f"T{index}"
+            for index in range(1000)
+            if ring.node(f"T{index}") == "shard_a"
+            and f"T{index}" != self.track_ids["shard_a"]
+        )
+
+        def activity(track_id: str) -> dict:
+            return {
+                "id": "SAME_ID",
+                "activity_date": "2021-04-16T08:05:35.941465",
+                "track_id": track_id,
+                "status": "S",
+                "billig_amount": 10,
+            }
+
+        self.assertEqual(
+            self._post([activity(self.track_ids["shard_a"])]), HTTP_201_CREATED
+        )
+        self.assertEqual(
+            self._post([activity(self.track_ids["shard_b"])]), HTTP_201_CREATED
+        )
+        self.assertEqual(self._post([activity(other_track_id)]), HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(
+            {
+                shard: list(
+                    Activity.objects.using(shard)
+                    .filter(id="SAME_ID")
+                    .values_list("track_id", flat=True)
+                )
+                for shard in SHARDS
+            },
+            {
+                "default": [],
+                "shard_a": [self.track_ids["shard_a"]],
+                "shard_b": [self.track_ids["shard_b"]],
+            },
+        )
+
+    def test_failed_shard_is_reported_per_item(self):
+        payload = self._payload(list(self.track_ids.values()))
+        save_new = activity_writer._save_new
+
+        def fail_on_shard_b(activities):
+            if database() == "shard_b":
+                raise DatabaseError("shard_b is down")
+            return save_new(activities)
+
+        with mock.patch.object(activity_writer, "_save_new", fail_on_shard_b):
+            report = activity_importer.import_items(items=payload)
+
+        failed = {f"A{index}{self.track_ids['shard_b']}" for index in range(2)}
+        self.assertEqual((report.created, report.invalid), (4, 2))
+        for item in report.results:
+            if item["id"] in failed:
+                self.assertEqual(item["reason"], "Cannot store activity")
+            else:
+                self.assertEqual(item["result"], "created")
+        self.assertEqual(self._stored("shard_b"), set())
+        self.assertEqual(self._stored("shard_a"), {self.track_ids["shard_a"]})
+
+        with mock.patch.object(activity_writer, "_save_new", fail_on_shard_b):
+            report = activity_importer.import_lines(
+                lines=[json.dumps(item).encode() for item in payload]
+            )
+
+        self.assertEqual((report.accepted, report.rejected), (0, 6))
+        self.assertEqual(
+            sorted(error["reason"] for error in report.errors),
+            ["Cannot store activity"] * 2 + ["Duplicated activity"] * 4,
+        )
+
+    def test_reads_go_to_owning_shard(self):
+        self._post(self._payload(list(self.track_ids.values())))
+        activity_cache.clear()
+
+        for track_id in self.track_ids.values():
+            response = self.client.get(
+                reverse(self.detail_view, kwargs={"track_id": track_id})
+            )
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            self.assertEqual(response.data["amount"], Decimal(30))
+
+            response = self.client.get(
+                reverse(self.detail_view, kwargs={"track_id": track_id}),
+                data={"as_of": "2021-04-10T12:00:00"},
+            )
+            self.assertEqual(response.data["amount"], Decimal(10))
+
+            response = self.client.get(
+                reverse(self.history_view, kwargs={"track_id": track_id})
+            )
+            self.assertEqual(
+                [activity["id"] for activity in response.data["results"]],
+                [f"A1{track_id}", f"A0{track_id}"],
+            )
+
+        activity_cache.clear()
+        response = self.client.post(
+            reverse(self.batch_view),
+            data={"track_ids": [*self.track_ids.values(), "T-missing"]},
+            format="json",
+        )
+        self.assertEqual(
+            [result["track_id"] for result in response.data["results"]],
+            list(self.track_ids.values()),
+        )
+        self.assertEqual(response.data["not_found"], ["T-missing"])
+
+        response = self.client.get(
+            reverse(self.rollup_view),
+            data={"from": "2021-04-10T00:00:00", "to": "2021-04-12T00:00:00"},
+        )
+        self.assertEqual(
+            [bucket["amount"] for bucket in response.data["results"]],
+            ["30.00", "60.00"],
+        )
+
+    def test_commands_run_on_every_shard(self):
+        self._post(self._payload(list(self.track_ids.values())))
+        TrackBalance.objects.using("shard_b").update(amount=Decimal(0))
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_track_balances", "--verify", stdout=StringIO())
+        stdout = StringIO()
+        call_command("rebuild_track_balances", stdout=stdout)
+        self.assertIn("Rebuilt 3 track balances", stdout.getvalue())
+
+        stdout = StringIO()
+        call_command("create_track_checkpoints", "--backfill", stdout=stdout)
+        self.assertIn("Created 6 track checkpoints", stdout.getvalue())
+        for shard in SHARDS:
+            self.assertEqual(TrackCheckpoint.objects.using(shard).count(), 2)
+
+        stdout = StringIO()
+        call_command("rebuild_track_rollups", stdout=stdout)
+        self.assertIn("Created 12 track rollups", stdout.getvalue())
+
+    def test_rebalance_after_adding_shard(self):
+        old_shards = SHARDS[:2]
+        track_ids = [f"T{index}" for index in range(30)]
+        with self.settings(ACTIVITY_SHARDS=old_shards):
+            self._post(self._payload(track_ids))
+            call_command("create_track_checkpoints", "--backfill", stdout=StringIO())
+        self.assertEqual(self._stored("shard_b"), set())
+        moving = [
+            track_id
+            for track_id in track_ids
+            if activity_shards.shard_for(track_id) == "shard_b"
+        ]
+        self.assertTrue(moving)
+
+        stdout = StringIO()
+        call_command("rebalance_activity_shards", "--dry-run", stdout=stdout)
+        self.assertIn(
+            f"Would move {len(moving)} tracks, {2 * len(moving)} activities",
+            stdout.getvalue(),
+        )
+        self.assertEqual(self._stored("shard_b"), set())
+
+        stdout = StringIO()
+        with mock.patch.object(
+            activity_notifier, "publish"
+        ) as publish, mock.patch.object(activity_cache, "delete") as delete:
+            call_command("rebalance_activity_shards", stdout=stdout)
+        self.assertEqual(publish.call_count, len(moving))
+        self.assertEqual(delete.call_count, len(moving))
+        self.assertIn(
+            f"Moved {len(moving)} tracks, {2 * len(moving)} activities",
+            stdout.getvalue(),
+        )
+        self.assertEqual(self._stored("shard_b"), set(moving))
+        for shard in old_shards:
+            self.assertFalse(self._stored(shard) & set(moving))
+            self.assertFalse(
+                TrackBalance.objects.using(shard).filter(track_id__in=moving).exists()
+            )
+            self.assertFalse(
+                ActivityKey.objects.using(shard)
+                .filter(id__in=[f"A0{track_id}" for track_id in moving])
+                .exists()
+            )
+        self.assertEqual(
+            TrackCheckpoint.objects.using("shard_b").count(), 2 * len(moving)
+        )
+        self.assertEqual(TrackRollup.objects.using("shard_b").count(), 4 * len(moving))
+        for shard in old_shards:
+            self.assertFalse(
+                TrackRollup.objects.using(shard).filter(track_id__in=moving).exists()
+            )
+
+        activity_cache.clear()
+        response = self.client.get(
+            reverse(self.detail_view, kwargs={"track_id": moving[0]})
+        )
+        self.assertEqual(response.data["amount"], Decimal(30))
+
+        stdout = StringIO()
+        call_command("rebalance_activity_shards", stdout=stdout)
+        self.assertIn("Moved 0 tracks, 0 activities", stdout.getvalue())
+
+    def test_rebalance_keeps_stored_state(self):
+        track_id = self._track_id(shard="shard_b", shards=SHARDS)
+        with self.settings(ACTIVITY_SHARDS=SHARDS[:1]):
+            self._post(self._payload([track_id]))
+            call_command("create_track_checkpoints", "--backfill", stdout=StringIO())
+        # The older activity went with a detached partition, its amount
+        # stays in the balance.
+        Activity.objects.filter(id=f"A0{track_id}").delete()
+        # The new shard got an activity of the track before the move.
+        self._post(
+            [
+                {
+                    "id": f"B{track_id}",
+                    "activity_date": "2021-04-12T08:05:35.941465",
+                    "track_id": track_id,
+                    "status": "R",
+                    "billig_amount": 5,
+                }
+            ]
+        )
+
+        stdout = StringIO()
+        call_command("rebalance_activity_shards", stdout=stdout)
+
+        self.assertIn("Moved 1 tracks, 1 activities", stdout.getvalue())
+        balance = TrackBalance.objects.using("shard_b").get(track_id=track_id)
+        self.assertEqual((balance.amount, balance.last_status), (Decimal(25), "R"))
+        self.assertTrue(ActivityKey.objects.using("shard_b").filter(id=f"A1{track_id}"))
+        self.assertEqual(
+            list(
+                TrackCheckpoint.objects.using("shard_b")
+                .filter(track_id=track_id)
+                .order_by("checkpoint_date")
+                .values_list("amount", flat=True)
+            ),
+            [Decimal(10), Decimal(30)],
+        )
+        self.assertEqual(
+            TrackRollup.objects.using("shard_b")
+            .filter(track_id=track_id, granularity="day")
+            .count(),
+            3,
+        )
+
+    def test_rebalance_stops_on_id_conflict(self):
+        track_id = self._track_id(shard="shard_b", shards=SHARDS)
+        with self.settings(ACTIVITY_SHARDS=SHARDS[:1]):
+            self._post(self._payload([track_id]))
+        Activity.objects.using("shard_b").create(
+            id=f"A0{track_id}",
+            activity_date="2021-04-10T08:05:35.941465",
+            track_id="T-other",
+            status="S",
+            billig_amount=Decimal(1),
+        )
+
+        with self.assertRaises(CommandError):
+            call_command("rebalance_activity_shards", stdout=StringIO())
+        self.assertEqual(self._stored("default"), {track_id})
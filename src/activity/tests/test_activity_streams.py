@@ -0,0 +1,233 @@
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from asgiref.sync import sync_to_async
+
+from activity.models import Activity
+from activity.streams import MAX_TRACK_IDS, STREAM_PATH, parse_track_ids
+from activity.tools.balances import activity_balancer
+from activity.tools.caches import activity_cache
+from activity.tools.notifications import MAX_PAYLOAD, activity_notifier
+from activity.tools.writers import activity_writer
+from core.asgi import application
+
+
+class StreamClient:
+    # Talks to the ASGI application the way a server does.
+    def __init__(self, query_string: bytes, method: str = "GET"):
+        self.scope = {
+            "type": "http",
+            "method": method,
+            "path": STREAM_PATH,
+            "query_string": query_string,
+            "headers": [],
+        }
+        self.messages: asyncio.Queue = asyncio.Queue()
+        self.requests: asyncio.Queue = asyncio.Queue()
+        self.requests.put_nowait({"type": "http.request", "body": b""})
+        self.task = asyncio.ensure_future(
+            application(self.scope, self.requests.get, self.messages.put)
+        )
+
+    async def start(self) -> dict:
+        return await asyncio.wait_for(self.messages.get(), timeout=5)
+
+    async def body(self) -> bytes:
+        message = await asyncio.wait_for(self.messages.get(), timeout=5)
+        return message["body"]
+
+    async def disconnect(self) -> None:
+        self.requests.put_nowait({"type": "http.disconnect"})
+        await asyncio.wait_for(self.task, timeout=5)
+
+
+def events(body: bytes) -> list:
+    return [
+        json.loads(line.split("data: ", 1)[1])
+        for line in body.decode().splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+class ActivityStreamParsingTest(SimpleTestCase):
+    def test_parse_track_ids(self):
+        self.assertEqual(
+            parse_track_ids(b"track_id=T1,T2&track_id=T3&track_id=T1&track_id=,"),
+            ["T1", "T2", "T3"],
+        )
+        self.assertEqual(parse_track_ids(b""), [])
+
+    def test_payloads_fit_notify_limit(self):
+        aggregates = [
+            {"track_id": f"T{index}", "last_status": "S", "amount": Decimal("10.50")}
+            for index in range(500)
+        ]
+
+        payloads = list(activity_notifier._payloads(aggregates=aggregates))
+
+        self.assertGreater(len(payloads), 1)
+        self.assertTrue(all(len(payload) <= MAX_PAYLOAD for payload in payloads))
+        decoded = [item for payload in payloads for item in json.loads(payload)]
+        self.assertEqual(
+            [item["track_id"] for item in decoded], [f"T{i}" for i in range(500)]
+        )
+        self.assertEqual(decoded[0]["amount"], 10.5)
+
+
+@override_settings(ACTIVITY_EVENTS_BACKEND="memory", ACTIVITY_STREAM_HEARTBEAT=5)
+class ActivityStreamsTest(TransactionTestCase):
+    def setUp(self) -> None:
+        # Connections of the pool threads are not kept, so the test
+        # database can be dropped at the end.
+        patcher = mock.patch.dict(connection.settings_dict, {"CONN_MAX_AGE": 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        activity_cache.clear()
+
+        Activity.objects.create(
+            id="1",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T1",
+            status="S",
+            billig_amount=Decimal(10),
+        )
+        activity_balancer.rebuild()
+
+    @staticmethod
+    def _activity(activity_id: str, track_id: str) -> Activity:
+        return Activity(
+            id=activity_id,
+            activity_date=datetime(2021, 4, 17, 8, 5, 35),
+            track_id=track_id,
+            status="S",
+            billig_amount=Decimal(5),
+        )
+
+    async def test_current_balances_then_changes(self):
+        client = StreamClient(query_string=b"track_id=T1,T2")
+
+        start = await client.start()
+        self.assertEqual(start["status"], 200)
+        self.assertIn((b"content-type", b"text/event-stream"), start["headers"])
+        body = await client.body()
+        self.assertTrue(body.startswith(b"retry: 3000\n\n"))
+        self.assertEqual(
+            events(body), [{"track_id": "T1", "last_status": "S", "amount": 10.0}]
+        )
+
+        await sync_to_async(activity_writer.save)(
+            activities=[self._activity("2", "T3"), self._activity("3", "T2")]
+        )
+        self.assertEqual(
+            events(await client.body()),
+            [{"track_id": "T2", "last_status": "S", "amount": 5.0}],
+        )
+        await sync_to_async(activity_writer.save)(
+            activities=[self._activity("4", "T1")]
+        )
+        self.assertEqual(
+            events(await client.body()),
+            [{"track_id": "T1", "last_status": "S", "amount": 15.0}],
+        )
+
+        await client.disconnect()
+        self.assertEqual(activity_notifier.subscribers(), 0)
+
+    async def test_keep_alive(self):
+        with self.settings(ACTIVITY_STREAM_HEARTBEAT=0.01):
+            client = StreamClient(query_string=b"track_id=T1")
+            await client.start()
+            await client.body()
+
+            self.assertEqual(await client.body(), b": keep-alive\n\n")
+            await client.disconnect()
+
+    async def test_invalid_requests(self):
+        for query_string in (
+            b"",
+            b"track_id=T12345678901",
+            "&".join(
+                f"track_id=T{index}" for index in range(MAX_TRACK_IDS + 1)
+            ).encode(),
+        ):
+            client = StreamClient(query_string=query_string)
+            self.assertEqual((await client.start())["status"], 400)
+            await asyncio.wait_for(client.task, timeout=5)
+
+        client = StreamClient(query_string=b"track_id=T1", method="POST")
+        self.assertEqual((await client.start())["status"], 405)
+        self.assertEqual(activity_notifier.subscribers(), 0)
+
+    async def test_disabled_events(self):
+        with self.settings(ACTIVITY_EVENTS_BACKEND="none"):
+            with mock.patch.object(activity_notifier, "dispatch") as dispatch:
+                await sync_to_async(activity_writer.save)(
+                    activities=[self._activity("2", "T1")]
+                )
+            client = StreamClient(query_string=b"track_id=T1")
+            self.assertEqual((await client.start())["status"], 503)
+            await asyncio.wait_for(client.task, timeout=5)
+
+        dispatch.assert_not_called()
+        self.assertEqual(activity_notifier.subscribers(), 0)
+
+    async def test_many_idle_subscribers(self):
+        subscriptions = [
+            activity_notifier.subscribe(track_ids=["T1", f"X{index}"])
+            for index in range(5000)
+        ]
+        self.assertEqual(activity_notifier.subscribers(), 5000)
+
+        activity_notifier.dispatch(
+            aggregates=[{"track_id": "T1", "last_status": "R", "amount": 1}]
+        )
+        changes = await asyncio.gather(
+            *(subscription.wait(timeout=5) for subscription in subscriptions)
+        )
+
+        self.assertEqual(
+            {change["last_status"] for batch in changes for change in batch}, {"R"}
+        )
+        for subscription in subscriptions:
+            activity_notifier.unsubscribe(subscription)
+        self.assertEqual(activity_notifier.subscribers(), 0)
+
+
+@skipUnless(connection.vendor == "postgresql", "LISTEN/NOTIFY needs PostgreSQL")
+@override_settings(ACTIVITY_EVENTS_BACKEND="postgresql", ACTIVITY_STREAM_HEARTBEAT=5)
+class ActivityStreamsNotifyTest(TransactionTestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch.dict(connection.settings_dict, {"CONN_MAX_AGE": 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        activity_cache.clear()
+
+    async def test_changes_are_notified_on_commit(self):
+        client = StreamClient(query_string=b"track_id=T1")
+        await client.start()
+        self.assertEqual(events(await client.body()), [])
+
+        await sync_to_async(activity_writer.save)(
+            activities=[
+                Activity(
+                    id="1",
+                    activity_date=datetime(2021, 4, 16, 8, 5, 35),
+                    track_id="T1",
+                    status="S",
+                    billig_amount=Decimal("10.25"),
+                )
+            ]
+        )
+
+        self.assertEqual(
+            events(await client.body()),
+            [{"track_id": "T1", "last_status": "S", "amount": 10.25}],
+        )
+        await client.disconnect()
+        self.assertEqual(activity_notifier.subscribers(), 0)
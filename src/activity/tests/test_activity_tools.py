@@ -1,12 +1,20 @@
+import json
+import time
 from decimal import Decimal
+from unittest import skipUnless
 
-from django.test import TestCase
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
 
 from rest_framework.test import APIClient
 
 from activity.exceptions.activity_exceptions import TrackIDDoesNotExists
 from activity.models import Activity
-from activity.tools.aggregators import activity_aggregator
+from activity.tools.aggregators import (
+    DatabaseActivityAggregator,
+    PythonActivityAggregator,
+    activity_aggregator,
+)
 from activity.tools.checkers import activity_checker
 
 
@@ -107,6 +115,24 @@ class ActivityToolsTest(TestCase):
         status = activity_checker.check_possibility_to_save(data=payload)
         self.assertFalse(status)
 
+    def test_checker_bulk_constant_queries(self):
+        payload = [
+            {
+                "id": f"X{index}Z",
+                "activity_date": "2021-04-16T09:14:16.435742",
+                "track_id": "TRACK_ID_3",
+                "status": "A",
+                "billig_amount": 11,
+            }
+            for index in range(13209000, 13211500)
+        ]
+        with self.assertNumQueries(3):
+            activities = activity_checker.prepare_unique_activities_possible_to_save(
+                activities=payload
+            )
+        self.assertEqual(len(activities), len(payload) - 5)
+        self.assertNotIn(self.activity.id, {activity.id for activity in activities})
+
     def test_checker_invalid_payload(self):
         payload = {
             "id": "X13210400Z",
@@ -116,3 +142,93 @@ class ActivityToolsTest(TestCase):
         }
         status = activity_checker.check_possibility_to_save(data=payload)
         self.assertFalse(status)
+
+
+class ActivityCheckerBenchmarkTest(SimpleTestCase):
+    def _payload(self, size: int) -> list:
+        # Every tenth activity repeats an earlier ID to exercise deduplication.
+        return [
+            {"id": str(index - 1 if index % 10 == 0 else index), "track_id": str(index)}
+            for index in range(1, size + 1)
+        ]
+
+    def test_unique_activities_last_occurrence_wins(self):
+        payload = self._payload(size=20)
+        unique_activities = list(
+            activity_checker._check_unique_activities(activities=payload)
+        )
+        track_ids = {
+            activity["id"]: activity["track_id"] for activity in unique_activities
+        }
+        self.assertEqual(len(unique_activities), 18)
+        self.assertEqual(track_ids["9"], "10")
+        self.assertEqual(track_ids["19"], "20")
+
+    def test_unique_activities_scales_linearly(self):
+        for size in (1_000, 10_000, 100_000):
+            payload = self._payload(size=size)
+            started = time.perf_counter()
+            unique_activities = list(
+                activity_checker._check_unique_activities(activities=payload)
+            )
+            elapsed = time.perf_counter() - started
+
+            self.assertEqual(len(unique_activities), size - size // 10)
+            self.assertLess(elapsed, size * 20e-6, f"{size} activities")
+
+
+class ActivityAggregatorsTest(TestCase):
+    def setUp(self) -> None:
+        with open(
+            "/src/activity/tests/json_files/activities_1000.json"
+        ) as payload_file:
+            payload = json.loads(payload_file.read())
+        Activity.objects.bulk_create(
+            activity_checker.prepare_unique_activities_possible_to_save(
+                activities=payload
+            )
+        )
+        self.track_ids = sorted(
+            Activity.objects.values_list("track_id", flat=True).distinct()
+        )
+
+    def test_database_aggregator_single_query(self):
+        activities = Activity.objects.filter(track_id=self.track_ids[0]).order_by(
+            "-activity_date"
+        )
+        with self.assertNumQueries(1):
+            DatabaseActivityAggregator().aggregate(activities=activities)
+
+    def test_database_aggregator_id_does_not_exists(self):
+        activities = Activity.objects.filter(track_id="11").order_by("-activity_date")
+        with self.assertRaises(TrackIDDoesNotExists):
+            DatabaseActivityAggregator().aggregate(activities=activities)
+
+    def test_aggregators_equivalence(self):
+        for track_id in self.track_ids:
+            activities = Activity.objects.filter(track_id=track_id).order_by(
+                "-activity_date", "-id"
+            )
+            self.assertEqual(
+                DatabaseActivityAggregator().aggregate(activities=activities),
+                PythonActivityAggregator().aggregate(activities=activities),
+            )
+
+    @skipUnless(connection.vendor == "postgresql", "DISTINCT ON needs PostgreSQL")
+    def test_grouped_tracks_same_as_distinct(self):
+        # The fallback for databases without DISTINCT ON.
+        activities = Activity.objects.all()
+        self.assertEqual(
+            list(DatabaseActivityAggregator._grouped_tracks(activities=activities)),
+            list(DatabaseActivityAggregator._distinct_tracks(activities=activities)),
+        )
+
+    def test_aggregators_tracks_equivalence(self):
+        activities = Activity.objects.all()
+        self.assertEqual(
+            DatabaseActivityAggregator().aggregate_tracks(activities=activities),
+            sorted(
+                PythonActivityAggregator().aggregate_tracks(activities=activities),
+                key=lambda result: result["track_id"],
+            ),
+        )
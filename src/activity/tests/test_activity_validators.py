@@ -0,0 +1,57 @@
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from activity.exceptions.activity_exceptions import InvalidActivity
+from activity.tools.validators import activity_validator
+
+
+class ActivityValidatorTest(SimpleTestCase):
+    def setUp(self) -> None:
+        self.payload = {
+            "id": "X13210400Z",
+            "activity_date": "2021-04-16T09:14:16.435742",
+            "track_id": "TRACK_ID_3",
+            "status": "S",
+            "billig_amount": 10.54,
+        }
+
+    def test_validator_builds_activity(self):
+        activity = activity_validator.validate(data=self.payload)
+        self.assertEqual(activity.id, self.payload["id"])
+        self.assertEqual(
+            activity.activity_date, datetime(2021, 4, 16, 9, 14, 16, 435742)
+        )
+        self.assertEqual(activity.billig_amount, Decimal("10.54"))
+
+    def test_validator_invalid_activities(self):
+        for field_name, value in (
+            ("id", 1),
+            ("id", "X" * 21),
+            ("activity_date", "2021-04-16T09:14:16"),
+            ("activity_date", "2021-02-30T09:14:16.435742"),
+            ("track_id", None),
+            ("status", "B"),
+            ("billig_amount", "q"),
+            ("billig_amount", "1e10"),
+            ("billig_amount", True),
+        ):
+            payload = dict(self.payload, **{field_name: value})
+            with self.assertRaisesMessage(InvalidActivity, f"Invalid {field_name}"):
+                activity_validator.validate(data=payload)
+
+    def test_validator_missing_field(self):
+        del self.payload["status"]
+        with self.assertRaisesMessage(InvalidActivity, "Missing status"):
+            activity_validator.validate(data=self.payload)
+
+    def test_validator_per_item_cost(self):
+        payload = [dict(self.payload, id=str(index)) for index in range(10_000)]
+        started = time.perf_counter()
+        for data in payload:
+            activity_validator.validate(data=data)
+        per_item = (time.perf_counter() - started) / len(payload)
+
+        self.assertLess(per_item, 50e-6)
@@ -13,14 +13,18 @@ from rest_framework.status import (
 from rest_framework.test import APIClient
 
 from activity.models import Activity
+from activity.tools.balances import activity_balancer
+from activity.tools.caches import activity_cache
 
 
 class ActivityViewsTest(TestCase):
     def setUp(self) -> None:
         self.detail_view = "activity_aggregate"
         self.create_view = "activity_create"
+        self.aggregate_batch_view = "activity_aggregate_batch"
 
         self.client = APIClient()
+        activity_cache.clear()
 
         self.activity = Activity.objects.create(
             id="1",
@@ -57,6 +61,7 @@ class ActivityViewsTest(TestCase):
             status="A",
             billig_amount=Decimal(10.54),
         )
+        activity_balancer.rebuild()
 
     def test_cannot_get_track_id(self):
         response = self.client.get(reverse(self.detail_view, kwargs={"track_id": "11"}))
@@ -329,3 +334,37 @@ class ActivityViewsTest(TestCase):
 
         self.assertEqual(response.status_code, HTTP_201_CREATED)
         self.assertEqual(activities_count_before, activities_count_after - 1)
+
+    def test_aggregate_batch(self):
+        Activity.objects.create(
+            id="7",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T654321",
+            status="R",
+            billig_amount=Decimal(5),
+        )
+        activity_balancer.rebuild()
+
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse(self.aggregate_batch_view),
+                data={"track_ids": ["T654321", "11", "T123456", "T654321"]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {
+                "results": [
+                    {"track_id": "T654321", "last_status": "R", "amount": Decimal(-5)},
+                    {"track_id": "T123456", "last_status": "A", "amount": Decimal(20)},
+                ],
+                "not_found": ["11"],
+            },
+        )
+
+    def test_aggregate_batch_wrong_payload(self):
+        response = self.client.post(
+            reverse(self.aggregate_batch_view), data={"track_ids": []}, format="json"
+        )
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
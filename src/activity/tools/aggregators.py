@@ -1,12 +1,43 @@
 import logging
 from decimal import Decimal
+from typing import Dict, List
 
-from django.db.models import QuerySet
+from django.conf import settings
+from django.db import connections
+from django.db.models import (
+    Case,
+    F,
+    OuterRef,
+    QuerySet,
+    Subquery,
+    Sum,
+    Value,
+    When,
+    Window,
+)
 
 from activity.exceptions.activity_exceptions import TrackIDDoesNotExists
+from activity.fields import CentsField
 
 
-class ActivityAggregator:
+TRACK_FIELDS = (
+    "track_id",
+    "amount",
+    "last_status",
+    "last_activity_date",
+    "last_activity_id",
+)
+
+
+def signed_amount(status: str, amount: Decimal) -> Decimal:
+    if status == "S":
+        return amount
+    elif status == "R":
+        return -amount
+    return Decimal(0)
+
+
+class PythonActivityAggregator:
     @staticmethod
     def aggregate(activities: QuerySet) -> dict:
         try:
@@ -28,5 +59,96 @@ class ActivityAggregator:
             "amount": amount,
         }
 
+    @staticmethod
+    def aggregate_tracks(activities: QuerySet) -> List[dict]:
+        results: Dict[str, dict] = {}
+        for activity in activities.order_by("activity_date", "id").iterator():
+            result = results.setdefault(
+                activity.track_id,
+                {"track_id": activity.track_id, "amount": Decimal(0)},
+            )
+            result["amount"] += signed_amount(
+                status=activity.status, amount=Decimal(activity.billig_amount)
+            )
+            result["last_status"] = activity.status
+            result["last_activity_date"] = activity.activity_date
+            result["last_activity_id"] = activity.id
+        return list(results.values())
+
+
+class DatabaseActivityAggregator:
+    def aggregate(self, activities: QuerySet) -> dict:
+        results = self._annotate_tracks(activities=activities)[:1]
+        try:
+            result = results[0]
+        except IndexError:
+            logging.error("No such activities in db")
+            raise TrackIDDoesNotExists
+
+        del result["last_activity_date"]
+        del result["last_activity_id"]
+        return result
+
+    def aggregate_tracks(self, activities: QuerySet) -> List[dict]:
+        return list(self._annotate_tracks(activities=activities))
+
+    @classmethod
+    def _annotate_tracks(cls, activities: QuerySet) -> QuerySet:
+        if connections[activities.db].vendor == "postgresql":
+            return cls._distinct_tracks(activities=activities)
+        return cls._grouped_tracks(activities=activities)
+
+    @staticmethod
+    def _signed_amount() -> Case:
+        return Case(
+            When(status="S", then=F("billig_amount")),
+            When(status="R", then=-F("billig_amount")),
+            default=Value(0),
+            output_field=CentsField(decimal_places=2),
+        )
+
+    @classmethod
+    def _distinct_tracks(cls, activities: QuerySet) -> QuerySet:
+        # One pass over the activities, DISTINCT ON keeps the row of the
+        # last activity per track.
+        return (
+            activities.annotate(
+                amount=Window(
+                    Sum(cls._signed_amount()),
+                    partition_by=[F("track_id")],
+                ),
+                last_status=F("status"),
+                last_activity_date=F("activity_date"),
+                last_activity_id=F("id"),
+            )
+            .order_by("track_id", "-activity_date", "-id")
+            .distinct("track_id")
+            .values(*TRACK_FIELDS)
+        )
+
+    @classmethod
+    def _grouped_tracks(cls, activities: QuerySet) -> QuerySet:
+        # Databases without DISTINCT ON sum per track and read the last
+        # activity with a subquery ordered the same way.
+        latest = activities.filter(track_id=OuterRef("track_id")).order_by(
+            "-activity_date", "-id"
+        )
+        return (
+            activities.order_by("track_id")
+            .values("track_id")
+            .annotate(
+                amount=Sum(cls._signed_amount()),
+                last_status=Subquery(latest.values("status")[:1]),
+                last_activity_date=Subquery(latest.values("activity_date")[:1]),
+                last_activity_id=Subquery(latest.values("id")[:1]),
+            )
+            .values(*TRACK_FIELDS)
+        )
+
+
+AGGREGATORS = {
+    "database": DatabaseActivityAggregator,
+    "python": PythonActivityAggregator,
+}
 
-activity_aggregator = ActivityAggregator()
+activity_aggregator = AGGREGATORS[settings.ACTIVITY_AGGREGATOR_ENGINE]()
@@ -0,0 +1,249 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from activity.exceptions.activity_exceptions import TrackIDDoesNotExists
+from activity.models import Activity, TrackBalance
+from activity.tools.aggregators import activity_aggregator, signed_amount
+from activity.tools.caches import activity_cache
+from activity.tools.partitions import activity_partitioner
+from activity.tools.validators import CENT
+from core.routers import database
+
+
+ActivityRow = Tuple[str, str, datetime, str, Decimal]
+
+
+@dataclass
+class BalanceChange:
+    amount: Decimal
+    last_status: str
+    last_activity_date: datetime
+    last_activity_id: str
+
+    @classmethod
+    def of(cls, balance) -> "BalanceChange":
+        # Balances and checkpoints share the fields.
+        return cls(
+            amount=balance.amount,
+            last_status=balance.last_status,
+            last_activity_date=balance.last_activity_date,
+            last_activity_id=balance.last_activity_id,
+        )
+
+    def add(
+        self, activity_id: str, activity_date: datetime, status: str, amount: Decimal
+    ) -> None:
+        self.amount += signed_amount(status=status, amount=amount)
+        if (activity_date, activity_id) >= self.last_activity:
+            self.last_status = status
+            self.last_activity_date = activity_date
+            self.last_activity_id = activity_id
+
+    def apply_to(self, balance: TrackBalance) -> None:
+        # Late-arriving activities still count towards the amount, but only
+        # the newest activity of the track decides about its last status.
+        # Activities of the same date are ordered by ID, as in rebuilds.
+        balance.amount += self.amount
+        if self.last_activity >= (
+            balance.last_activity_date,
+            balance.last_activity_id,
+        ):
+            balance.last_status = self.last_status
+            balance.last_activity_date = self.last_activity_date
+            balance.last_activity_id = self.last_activity_id
+
+    @property
+    def last_activity(self) -> Tuple[datetime, str]:
+        return self.last_activity_date, self.last_activity_id
+
+
+class ActivityBalancer:
+    batch_size = 1000
+
+    def __init__(self):
+        self._date_field = Activity._meta.get_field("activity_date")
+        self._amount_field = Activity._meta.get_field("billig_amount")
+
+    def retrieve(self, track_id: str) -> dict:
+        return self.to_aggregate(balance=self.get(track_id=track_id))
+
+    @staticmethod
+    def get(track_id: str) -> TrackBalance:
+        try:
+            return TrackBalance.objects.get(track_id=track_id)
+        except TrackBalance.DoesNotExist:
+            logging.error("No such track balance in db")
+            raise TrackIDDoesNotExists
+
+    def retrieve_many(self, track_ids: List[str]) -> Dict[str, dict]:
+        return {
+            balance.track_id: self.to_aggregate(balance=balance)
+            for balance in TrackBalance.objects.filter(track_id__in=track_ids)
+        }
+
+    @staticmethod
+    def touch(balance: TrackBalance, now: datetime) -> None:
+        # Every change gets a later version, even when clocks of workers
+        # differ or two changes fall into the same microsecond.
+        balance.updated_at = max(now, balance.updated_at + timedelta(microseconds=1))
+
+    @staticmethod
+    def to_aggregate(balance: TrackBalance) -> dict:
+        return {
+            "track_id": balance.track_id,
+            "last_status": balance.last_status,
+            "amount": balance.amount,
+        }
+
+    def apply(self, activities: Iterable[Activity]) -> List[TrackBalance]:
+        changes = self._collect_changes(
+            (
+                activity.track_id,
+                activity.id,
+                activity.activity_date,
+                activity.status,
+                activity.billig_amount,
+            )
+            for activity in activities
+        )
+        if not changes:
+            return []
+
+        track_ids = sorted(changes)
+        with transaction.atomic(using=database()):
+            TrackBalance.objects.bulk_create(
+                [
+                    TrackBalance(
+                        track_id=track_id,
+                        amount=Decimal(0),
+                        last_status=changes[track_id].last_status,
+                        last_activity_date=changes[track_id].last_activity_date,
+                        last_activity_id=changes[track_id].last_activity_id,
+                    )
+                    for track_id in track_ids
+                ],
+                batch_size=self.batch_size,
+                ignore_conflicts=True,
+            )
+            balances = list(
+                TrackBalance.objects.select_for_update()
+                .filter(track_id__in=track_ids)
+                .order_by("track_id")
+            )
+            now = timezone.now()
+            for balance in balances:
+                changes[balance.track_id].apply_to(balance)
+                self.touch(balance=balance, now=now)
+            TrackBalance.objects.bulk_update(
+                balances,
+                fields=(
+                    "amount",
+                    "last_status",
+                    "last_activity_date",
+                    "last_activity_id",
+                    "updated_at",
+                ),
+                batch_size=self.batch_size,
+            )
+        return balances
+
+    def compute(self, track_ids: Optional[List[str]] = None) -> Dict[str, TrackBalance]:
+        activities = Activity.objects.order_by()
+        if track_ids is not None:
+            activities = activities.filter(track_id__in=track_ids)
+        return {
+            result["track_id"]: TrackBalance(**result)
+            for result in activity_aggregator.aggregate_tracks(activities=activities)
+        }
+
+    def rebuild(self, track_ids: Optional[List[str]] = None) -> int:
+        activity_partitioner.check_complete()
+        with transaction.atomic(using=database()):
+            self.lock()
+            balances = self.compute(track_ids=track_ids)
+            stale_balances = TrackBalance.objects.all()
+            if track_ids is not None:
+                stale_balances = stale_balances.filter(track_id__in=track_ids)
+            # Rebuilt balances keep growing versions.
+            previous = dict(stale_balances.values_list("track_id", "updated_at"))
+            now = timezone.now()
+            for balance in balances.values():
+                balance.updated_at = previous.get(balance.track_id, now)
+                self.touch(balance=balance, now=now)
+            stale_balances.delete()
+            TrackBalance.objects.bulk_create(
+                balances.values(), batch_size=self.batch_size
+            )
+            # Only entries of rebuilt tracks go, the cache may be shared.
+            track_ids = sorted(set(previous) | set(balances))
+            transaction.on_commit(
+                lambda: activity_cache.delete(track_ids=track_ids), using=database()
+            )
+        return len(balances)
+
+    def verify(self, track_ids: Optional[List[str]] = None) -> List[str]:
+        activity_partitioner.check_complete()
+        expected = self.compute(track_ids=track_ids)
+        stored_balances = TrackBalance.objects.all()
+        if track_ids is not None:
+            stored_balances = stored_balances.filter(track_id__in=track_ids)
+        stored = {balance.track_id: balance for balance in stored_balances}
+        return sorted(
+            track_id
+            for track_id in expected.keys() | stored.keys()
+            if not self._same_balance(expected.get(track_id), stored.get(track_id))
+        )
+
+    def _collect_changes(self, rows: Iterable[ActivityRow]) -> Dict[str, BalanceChange]:
+        changes: Dict[str, BalanceChange] = {}
+        for track_id, activity_id, activity_date, status, billig_amount in rows:
+            activity_date = self._date_field.to_python(activity_date)
+            amount = self._amount_field.to_python(billig_amount).quantize(CENT)
+            try:
+                changes[track_id].add(
+                    activity_id=activity_id,
+                    activity_date=activity_date,
+                    status=status,
+                    amount=amount,
+                )
+            except KeyError:
+                changes[track_id] = BalanceChange(
+                    amount=signed_amount(status=status, amount=amount),
+                    last_status=status,
+                    last_activity_date=activity_date,
+                    last_activity_id=activity_id,
+                )
+        return changes
+
+    @staticmethod
+    def lock() -> None:
+        # Ingest updates balances in the same transaction as it stores
+        # activities, so holding this lock gives a consistent snapshot.
+        connection = connections[database()]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOCK TABLE {TrackBalance._meta.db_table} "
+                    "IN SHARE ROW EXCLUSIVE MODE"
+                )
+
+    @staticmethod
+    def _same_balance(
+        expected: Optional[TrackBalance], stored: Optional[TrackBalance]
+    ) -> bool:
+        if expected is None or stored is None:
+            return False
+        return (
+            expected.amount == stored.amount
+            and expected.last_status == stored.last_status
+            and expected.last_activity_date == stored.last_activity_date
+        )
+
+
+activity_balancer = ActivityBalancer()
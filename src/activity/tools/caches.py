@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+
+from core.metrics import Counter
+
+
+class ActivityCache:
+    # An entry holds the aggregate of a track together with the version of
+    # the balance it was made of, so both are read with one lookup.
+    key_prefix = "balance"
+    batch_size = 1000
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[settings.ACTIVITY_CACHE_ALIAS]
+
+    def get(self, track_id: str) -> Optional[Tuple[dict, datetime]]:
+        entry = self.cache.get(self._key(track_id=track_id))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["aggregate"], entry["version"]
+
+    def get_many(self, track_ids: List[str]) -> Dict[str, dict]:
+        cached = self.cache.get_many(
+            [self._key(track_id=track_id) for track_id in track_ids]
+        )
+        self.hits += len(cached)
+        self.misses += len(track_ids) - len(cached)
+        return {
+            entry["aggregate"]["track_id"]: entry["aggregate"]
+            for entry in cached.values()
+        }
+
+    def add(self, aggregated_data: dict, version: datetime) -> None:
+        # Readers only fill missing entries so they never overwrite a newer
+        # aggregate stored by a concurrent write.
+        self.cache.add(
+            self._key(track_id=aggregated_data["track_id"]),
+            self._entry(aggregated_data=aggregated_data, version=version),
+        )
+
+    def delete(self, track_ids: List[str]) -> None:
+        for start in range(0, len(track_ids), self.batch_size):
+            end = start + self.batch_size
+            self.cache.delete_many(
+                [self._key(track_id=track_id) for track_id in track_ids[start:end]]
+            )
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def metrics(self) -> List[str]:
+        lookups = Counter("activity_cache_lookups_total", "Aggregate cache lookups")
+        lookups.inc((("result", "hit"),), self.hits)
+        lookups.inc((("result", "miss"),), self.misses)
+        return lookups.expose()
+
+    def _key(self, track_id: str) -> str:
+        return f"{self.key_prefix}:{track_id}"
+
+    @staticmethod
+    def _entry(aggregated_data: dict, version: datetime) -> dict:
+        return {"aggregate": aggregated_data, "version": version}
+
+
+activity_cache = ActivityCache()
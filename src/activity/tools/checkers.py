@@ -1,55 +1,88 @@
-from datetime import datetime
-from decimal import Decimal
+from typing import Iterator, List, Optional, Set
 
-from activity.models import Activity
+from django.db import connections
+from django.db.models import QuerySet
+
+from activity.exceptions.activity_exceptions import InvalidActivity
+from activity.models import Activity, ActivityKey
+from activity.tools.shards import activity_shards
+from activity.tools.validators import activity_validator
+from core.routers import database
 
 
 class ActivityChecker:
-    def prepare_unique_activities_possible_to_save(self, activities):
-        unique_activities = self._check_unique_activities(activities=activities)
+    chunk_size = 1000
+
+    def prepare_unique_activities_possible_to_save(self, activities) -> List[Activity]:
+        unique_activities = self.prepare_unique_valid_activities(activities=activities)
+        # Every shard knows only IDs of its own tracks.
+        existing_ids: Set[str] = set()
+        for alias, shard_activities in activity_shards.split(unique_activities).items():
+            with activity_shards.using(alias=alias):
+                existing_ids.update(
+                    self._find_existing_ids(
+                        ids=[activity.id for activity in shard_activities]
+                    )
+                )
         return [
-            Activity(**activity)
+            activity
             for activity in unique_activities
-            if self.check_possibility_to_save(data=activity)
+            if activity.id not in existing_ids
         ]
 
-    def check_possibility_to_save(self, data: dict) -> bool:
-        try:
-            if Activity.objects.filter(id=data["id"]).exists() or not self._check_types(
-                data=data
-            ):
-                return False
-            return True
-        except (KeyError, ValueError):
-            return False
-
-    @staticmethod
-    def _check_unique_activities(activities: list) -> list:
-        ids = []
+    def prepare_unique_valid_activities(self, activities) -> List[Activity]:
+        # Checks only the shape of activities, without looking into db.
         unique_activities = []
-        for activity in activities[::-1]:
-            if activity["id"] in ids:
+        for data in self._check_unique_activities(activities=activities):
+            try:
+                unique_activities.append(activity_validator.validate(data=data))
+            except InvalidActivity:
                 continue
-            else:
-                unique_activities.append(activity)
-                ids.append(activity["id"])
-
         return unique_activities
 
-    @staticmethod
-    def _check_types(data: dict) -> bool:
-        if (
-            isinstance(data["id"], str)
-            and isinstance(
-                datetime.strptime(data["activity_date"], "%Y-%m-%dT%H:%M:%S.%f"),
-                datetime,
+    def prepare_activity_possible_to_save(self, data: dict) -> Optional[Activity]:
+        try:
+            activity = activity_validator.validate(data=data)
+        except InvalidActivity:
+            return None
+        with activity_shards.track(track_id=activity.track_id):
+            if self._stored_ids().filter(id=activity.id).exists():
+                return None
+        return activity
+
+    def check_possibility_to_save(self, data: dict) -> bool:
+        return self.prepare_activity_possible_to_save(data=data) is not None
+
+    def _find_existing_ids(self, ids: List[str]) -> Set[str]:
+        existing_ids: Set[str] = set()
+        for start in range(0, len(ids), self.chunk_size):
+            end = start + self.chunk_size
+            chunk = ids[start:end]
+            existing_ids.update(
+                self._stored_ids().filter(id__in=chunk).values_list("id", flat=True)
             )
-            and isinstance(data["track_id"], str)
-            and isinstance(Decimal(data["billig_amount"]), Decimal)
-            and data["status"] in ["A", "S", "R"]
-        ):
-            return True
-        return False
+        return existing_ids
+
+    @staticmethod
+    def _stored_ids() -> QuerySet:
+        # Partitioned activities keep every stored ID, archived ones too, in
+        # the registry.
+        if connections[database()].vendor == "postgresql":
+            return ActivityKey.objects.all()
+        return Activity.objects.all()
+
+    @staticmethod
+    def _check_unique_activities(activities: list) -> Iterator[dict]:
+        # Walk from the end so the last occurrence of every ID wins.
+        ids: Set[str] = set()
+        for activity in reversed(activities):
+            try:
+                if activity["id"] in ids:
+                    continue
+                ids.add(activity["id"])
+            except (KeyError, TypeError):
+                pass
+            yield activity
 
 
 activity_checker = ActivityChecker()
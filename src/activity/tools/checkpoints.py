@@ -0,0 +1,345 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from activity.exceptions.activity_exceptions import TrackIDDoesNotExists
+from activity.models import Activity, TrackBalance, TrackCheckpoint
+from activity.tools.aggregators import signed_amount
+from activity.tools.balances import BalanceChange, activity_balancer
+from activity.tools.partitions import activity_partitioner
+from core.routers import database
+
+
+class ActivityCheckpointer:
+    # Checkpoints are sparse: a track gets one at a day boundary only when it
+    # had activities during that day. Each of them stays exact, late
+    # activities are added to every checkpoint after their date on ingest.
+    interval = timedelta(days=1)
+    batch_size = 1000
+
+    @staticmethod
+    def boundary(date: datetime) -> datetime:
+        return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def latest_boundary(self) -> datetime:
+        return self.boundary(timezone.now())
+
+    def balance(
+        self, track_id: str, until: datetime, inclusive: bool = False
+    ) -> Optional[BalanceChange]:
+        checkpoint = (
+            TrackCheckpoint.objects.filter(
+                track_id=track_id, checkpoint_date__lte=until
+            )
+            .order_by("-checkpoint_date")
+            .first()
+        )
+        activities = Activity.objects.filter(track_id=track_id)
+        if checkpoint is not None:
+            activities = activities.filter(
+                activity_date__gte=checkpoint.checkpoint_date
+            )
+        if inclusive:
+            activities = activities.filter(activity_date__lte=until)
+        else:
+            activities = activities.filter(activity_date__lt=until)
+
+        balance = None
+        if checkpoint is not None:
+            balance = BalanceChange.of(checkpoint)
+        for activity_id, activity_date, status, amount in activities.order_by(
+            "activity_date", "id"
+        ).values_list("id", "activity_date", "status", "billig_amount"):
+            if balance is None:
+                balance = BalanceChange(
+                    amount=Decimal(0),
+                    last_status=status,
+                    last_activity_date=activity_date,
+                    last_activity_id=activity_id,
+                )
+            balance.add(
+                activity_id=activity_id,
+                activity_date=activity_date,
+                status=status,
+                amount=amount,
+            )
+        return balance
+
+    def aggregate(
+        self,
+        track_id: str,
+        as_of: Optional[datetime] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> dict:
+        # A known track has no activities before its first one: the amount
+        # is 0 and there is no last status.
+        balance = self._current_balance(track_id=track_id)
+        if balance is None:
+            raise TrackIDDoesNotExists
+        if as_of is not None:
+            balance = self.balance(track_id=track_id, until=as_of, inclusive=True)
+        elif date_to is not None:
+            balance = self.balance(track_id=track_id, until=date_to)
+        if balance is None:
+            return {"track_id": track_id, "last_status": None, "amount": Decimal(0)}
+
+        amount = balance.amount
+        if as_of is None and date_from is not None:
+            opening = self.balance(track_id=track_id, until=date_from)
+            if opening is not None:
+                amount -= opening.amount
+        return {
+            "track_id": track_id,
+            "last_status": balance.last_status,
+            "amount": amount,
+        }
+
+    def adjust(self, activities: List[Activity]) -> None:
+        # Has to run in the ingest transaction, after balances are updated,
+        # so it cannot interleave with creating checkpoints. Late activities
+        # are summed per checkpoint here and written with one UPDATE for the
+        # amounts and one for the last activity per batch of checkpoints.
+        latest_boundary = self.latest_boundary()
+        late_activities: Dict[str, List[Activity]] = {}
+        for activity in activities:
+            if activity.activity_date < latest_boundary:
+                late_activities.setdefault(activity.track_id, []).append(activity)
+        if not late_activities:
+            return
+
+        earliest_date = min(
+            activity.activity_date
+            for track_activities in late_activities.values()
+            for activity in track_activities
+        )
+        checkpoints = (
+            TrackCheckpoint.objects.filter(
+                track_id__in=late_activities, checkpoint_date__gt=earliest_date
+            )
+            .order_by("id")
+            .values_list(
+                "id",
+                "track_id",
+                "checkpoint_date",
+                "last_activity_date",
+                "last_activity_id",
+            )
+            .iterator(chunk_size=self.batch_size)
+        )
+        amounts: List[Tuple[int, Decimal]] = []
+        last_activities: List[Tuple[int, str, datetime, str]] = []
+        for checkpoint_id, track_id, checkpoint_date, *last_activity in checkpoints:
+            latest = tuple(last_activity)
+            amount = Decimal(0)
+            last_activity = None
+            for activity in late_activities[track_id]:
+                if activity.activity_date >= checkpoint_date:
+                    continue
+                amount += signed_amount(
+                    status=activity.status, amount=activity.billig_amount
+                )
+                if (activity.activity_date, activity.id) >= latest:
+                    last_activity = activity
+                    latest = (activity.activity_date, activity.id)
+            if amount:
+                amounts.append((checkpoint_id, amount))
+            if last_activity is not None:
+                last_activities.append(
+                    (
+                        checkpoint_id,
+                        last_activity.status,
+                        last_activity.activity_date,
+                        last_activity.id,
+                    )
+                )
+            if len(amounts) == self.batch_size:
+                self._update_from_values(set_sql="amount = amount + {}", rows=amounts)
+                amounts = []
+            if len(last_activities) == self.batch_size:
+                self._update_last_activities(rows=last_activities)
+                last_activities = []
+        self._update_from_values(set_sql="amount = amount + {}", rows=amounts)
+        self._update_last_activities(rows=last_activities)
+
+    def _update_last_activities(
+        self, rows: List[Tuple[int, str, datetime, str]]
+    ) -> None:
+        self._update_from_values(
+            set_sql="last_status = {}, last_activity_date = {}, last_activity_id = {}",
+            rows=rows,
+        )
+
+    @staticmethod
+    def _update_from_values(set_sql: str, rows: List[tuple]) -> None:
+        # UPDATE ... FROM (VALUES ...), the first value of a row is the
+        # checkpoint ID and the others fill the placeholders of set_sql.
+        if not rows:
+            return
+        connection = connections[database()]
+        quote_name = connection.ops.quote_name
+        table = quote_name(TrackCheckpoint._meta.db_table)
+        width = len(rows[0])
+        row = f"({', '.join(['%s'] * width)})"
+        assignments = set_sql.format(
+            *(f"updates.column{index}" for index in range(2, width + 1))
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET {assignments} "
+                f"FROM (VALUES {', '.join([row] * len(rows))}) AS updates "
+                f"WHERE {table}.{quote_name('id')} = updates.column1",
+                [value for values in rows for value in values],
+            )
+
+    def create(self, until: Optional[datetime] = None) -> int:
+        until = self.boundary(until or self.latest_boundary())
+        latest = TrackCheckpoint.objects.aggregate(latest=Max("checkpoint_date"))[
+            "latest"
+        ]
+        if latest is None:
+            return self.backfill(until=until)
+
+        created = 0
+        checkpoint_date = latest + self.interval
+        while checkpoint_date <= until:
+            created += self._create_at(checkpoint_date=checkpoint_date)
+            checkpoint_date += self.interval
+        return created
+
+    def backfill(
+        self, until: Optional[datetime] = None, track_ids: Optional[List[str]] = None
+    ) -> int:
+        activity_partitioner.check_complete()
+        until = self.boundary(until or self.latest_boundary())
+        stale_checkpoints = TrackCheckpoint.objects.all()
+        activities = Activity.objects.filter(activity_date__lt=until)
+        if track_ids is not None:
+            stale_checkpoints = stale_checkpoints.filter(track_id__in=track_ids)
+            activities = activities.filter(track_id__in=track_ids)
+        with transaction.atomic(using=database()):
+            activity_balancer.lock()
+            stale_checkpoints.delete()
+            checkpoints = self._replay_checkpoints(
+                rows=activities.order_by("track_id", "activity_date", "id")
+                .values_list(
+                    "track_id", "id", "activity_date", "status", "billig_amount"
+                )
+                .iterator(chunk_size=self.batch_size)
+            )
+            created = 0
+            batch: List[TrackCheckpoint] = []
+            for checkpoint in checkpoints:
+                batch.append(checkpoint)
+                if len(batch) == self.batch_size:
+                    created += len(TrackCheckpoint.objects.bulk_create(batch))
+                    batch = []
+            created += len(TrackCheckpoint.objects.bulk_create(batch))
+        return created
+
+    def _create_at(self, checkpoint_date: datetime) -> int:
+        # Current balance minus activities dated after the boundary gives the
+        # balance at the boundary without reading older history.
+        since = checkpoint_date - self.interval
+        with transaction.atomic(using=database()):
+            activity_balancer.lock()
+            TrackCheckpoint.objects.filter(checkpoint_date=checkpoint_date).delete()
+            balances = list(
+                TrackBalance.objects.filter(last_activity_date__gte=since).order_by(
+                    "track_id"
+                )
+            )
+            created = 0
+            for start in range(0, len(balances), self.batch_size):
+                end = start + self.batch_size
+                checkpoints = self._checkpoints_at(
+                    checkpoint_date=checkpoint_date, balances=balances[start:end]
+                )
+                created += len(TrackCheckpoint.objects.bulk_create(checkpoints))
+        return created
+
+    def _checkpoints_at(
+        self, checkpoint_date: datetime, balances: List[TrackBalance]
+    ) -> List[TrackCheckpoint]:
+        since = checkpoint_date - self.interval
+        later_amounts: Dict[str, Decimal] = {}
+        last_activities: Dict[str, tuple] = {}
+        for track_id, activity_id, activity_date, status, amount in (
+            Activity.objects.filter(
+                track_id__in=[balance.track_id for balance in balances],
+                activity_date__gte=since,
+            )
+            .order_by("activity_date", "id")
+            .values_list("track_id", "id", "activity_date", "status", "billig_amount")
+        ):
+            if activity_date >= checkpoint_date:
+                later_amounts[track_id] = later_amounts.get(
+                    track_id, Decimal(0)
+                ) + signed_amount(status=status, amount=amount)
+            else:
+                last_activities[track_id] = (activity_date, status, activity_id)
+
+        return [
+            TrackCheckpoint(
+                track_id=balance.track_id,
+                checkpoint_date=checkpoint_date,
+                amount=balance.amount - later_amounts.get(balance.track_id, Decimal(0)),
+                last_status=last_activities[balance.track_id][1],
+                last_activity_date=last_activities[balance.track_id][0],
+                last_activity_id=last_activities[balance.track_id][2],
+            )
+            for balance in balances
+            if balance.track_id in last_activities
+        ]
+
+    def _replay_checkpoints(self, rows) -> Iterator[TrackCheckpoint]:
+        track_id = None
+        balance: Optional[BalanceChange] = None
+        for row_track_id, activity_id, activity_date, status, amount in rows:
+            day = self.boundary(activity_date)
+            if balance is not None and (
+                row_track_id != track_id
+                or day != self.boundary(balance.last_activity_date)
+            ):
+                yield self._checkpoint(track_id=track_id, balance=balance)
+            if row_track_id != track_id:
+                track_id = row_track_id
+                balance = BalanceChange(
+                    amount=Decimal(0),
+                    last_status=status,
+                    last_activity_date=activity_date,
+                    last_activity_id=activity_id,
+                )
+            balance.add(
+                activity_id=activity_id,
+                activity_date=activity_date,
+                status=status,
+                amount=amount,
+            )
+        if balance is not None:
+            yield self._checkpoint(track_id=track_id, balance=balance)
+
+    def _checkpoint(self, track_id: str, balance: BalanceChange) -> TrackCheckpoint:
+        return TrackCheckpoint(
+            track_id=track_id,
+            checkpoint_date=self.boundary(balance.last_activity_date) + self.interval,
+            amount=balance.amount,
+            last_status=balance.last_status,
+            last_activity_date=balance.last_activity_date,
+            last_activity_id=balance.last_activity_id,
+        )
+
+    @staticmethod
+    def _current_balance(track_id: str) -> Optional[BalanceChange]:
+        try:
+            balance = TrackBalance.objects.get(track_id=track_id)
+        except TrackBalance.DoesNotExist:
+            return None
+        return BalanceChange.of(balance)
+
+
+activity_checkpointer = ActivityCheckpointer()
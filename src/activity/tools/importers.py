@@ -0,0 +1,164 @@
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import DatabaseError
+
+from activity.exceptions.activity_exceptions import InvalidActivity
+from activity.models import Activity
+from activity.tools.validators import activity_validator
+from activity.tools.writers import activity_writer
+
+
+@dataclass
+class ImportReport:
+    accepted: int = 0
+    rejected: int = 0
+    errors: List[dict] = field(default_factory=list)
+    # Lines up to last_line are stored or rejected. An incomplete import
+    # stopped at max_lines, the rest is sent again from the next line.
+    last_line: int = 0
+    complete: bool = True
+
+    def reject(self, line: int, reason: str, max_errors: int) -> None:
+        self.rejected += 1
+        if len(self.errors) < max_errors:
+            self.errors.append({"line": line, "reason": reason})
+
+
+@dataclass
+class ItemsReport:
+    created: int = 0
+    duplicate: int = 0
+    invalid: int = 0
+    results: List[dict] = field(default_factory=list)
+
+    def add(self, activity_id: Optional[str], result: str, reason: str = "") -> None:
+        setattr(self, result, getattr(self, result) + 1)
+        item = {"id": activity_id, "result": result}
+        if reason:
+            item["reason"] = reason
+        self.results.append(item)
+
+
+class ActivityImporter:
+    chunk_size = 1000
+    max_reported_errors = 100
+
+    def import_lines(
+        self, lines: Iterable[bytes], max_lines: Optional[int] = None
+    ) -> ImportReport:
+        report = ImportReport()
+        chunk: List[Tuple[int, Activity]] = []
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            if max_lines is not None and line_number > max_lines:
+                report.complete = False
+                break
+            report.last_line = line_number
+            try:
+                data = json.loads(line)
+            except ValueError:
+                self._reject(report, line_number, "Invalid JSON")
+                continue
+            try:
+                activity = activity_validator.validate(data=data)
+            except InvalidActivity as error:
+                self._reject(report, line_number, str(error))
+                continue
+
+            chunk.append((line_number, activity))
+            if len(chunk) >= self.chunk_size:
+                self._flush(report=report, chunk=chunk)
+                chunk = []
+        self._flush(report=report, chunk=chunk)
+        return report
+
+    def _flush(self, report: ImportReport, chunk: List[Tuple[int, Activity]]) -> None:
+        # In a stream the first occurrence of an ID wins, later ones are
+        # reported as duplicates, the same as IDs already stored in db.
+        unique_activities = {}
+        for line_number, activity in chunk:
+            if activity.id in unique_activities:
+                self._reject(report, line_number, "Duplicated activity")
+            else:
+                unique_activities[activity.id] = (line_number, activity)
+
+        created_ids, failed_ids = self._save(
+            activities=[activity for _, activity in unique_activities.values()]
+        )
+        report.accepted += len(created_ids)
+        for line_number, activity in unique_activities.values():
+            if activity.id in failed_ids:
+                self._reject(report, line_number, "Cannot store activity")
+            elif activity.id not in created_ids:
+                self._reject(report, line_number, "Duplicated activity")
+
+    def import_items(self, items: list) -> ItemsReport:
+        # Results follow the order of items. The first occurrence of an ID
+        # wins, stored IDs are detected by the insert itself.
+        validated: List[Tuple[Optional[str], Optional[Activity], str]] = []
+        unique_activities: Dict[str, Activity] = {}
+        for data in items:
+            try:
+                activity = activity_validator.validate(data=data)
+            except InvalidActivity as error:
+                activity_id = data.get("id") if isinstance(data, dict) else None
+                if not isinstance(activity_id, str):
+                    activity_id = None
+                validated.append((activity_id, None, str(error)))
+                continue
+            if activity.id in unique_activities:
+                validated.append((activity.id, None, ""))
+            else:
+                unique_activities[activity.id] = activity
+                validated.append((activity.id, activity, ""))
+
+        created_ids = set()
+        failed_ids = set()
+        activities = list(unique_activities.values())
+        for start in range(0, len(activities), self.chunk_size):
+            end = start + self.chunk_size
+            chunk_created_ids, chunk_failed_ids = self._save(
+                activities=activities[start:end]
+            )
+            created_ids.update(chunk_created_ids)
+            failed_ids.update(chunk_failed_ids)
+
+        report = ItemsReport()
+        for activity_id, activity, reason in validated:
+            if reason:
+                report.add(activity_id=activity_id, result="invalid", reason=reason)
+            elif activity is not None and activity_id in created_ids:
+                report.add(activity_id=activity_id, result="created")
+            elif activity is not None and activity_id in failed_ids:
+                report.add(
+                    activity_id=activity_id,
+                    result="invalid",
+                    reason="Cannot store activity",
+                )
+            else:
+                report.add(activity_id=activity_id, result="duplicate")
+        return report
+
+    @staticmethod
+    def _save(activities: List[Activity]) -> Tuple[Set[str], Set[str]]:
+        # Returns IDs created and IDs of shards that failed to store, shards
+        # that committed keep their activities.
+        created_ids = set()
+        failed_ids = set()
+        for result in activity_writer.save_new_per_shard(activities=activities):
+            if isinstance(result.error, DatabaseError):
+                failed_ids.update(activity.id for activity in result.activities)
+            else:
+                created_ids.update(activity.id for activity in result.get())
+        return created_ids, failed_ids
+
+    def _reject(self, report: ImportReport, line_number: int, reason: str) -> None:
+        report.reject(
+            line=line_number, reason=reason, max_errors=self.max_reported_errors
+        )
+
+
+activity_importer = ActivityImporter()
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from django.conf import settings
+from django.db import connections, transaction
+
+import psycopg2
+from rest_framework.utils.encoders import JSONEncoder
+
+from activity.tools.shards import activity_shards
+from core.routers import database
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "activity_balances"
+# PostgreSQL refuses NOTIFY payloads of 8000 bytes and more.
+MAX_PAYLOAD = 7900
+
+
+class Subscription:
+    # Changes waiting for one stream. Only the newest aggregate of a track is
+    # kept, so a slow client skips intermediate balances instead of piling
+    # them up, and an idle one costs a dict and an event.
+    def __init__(self, track_ids: Iterable[str], loop: asyncio.AbstractEventLoop):
+        self.track_ids = set(track_ids)
+        self.loop = loop
+        self.closed = False
+        self._pending: Dict[str, dict] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, aggregated_data: dict) -> None:
+        self._pending[aggregated_data["track_id"]] = aggregated_data
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    async def wait(self, timeout: float) -> List[dict]:
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        changes = list(self._pending.values())
+        self._pending.clear()
+        return changes
+
+
+class PostgresListener:
+    # One LISTEN connection of a process to one shard, read by the event
+    # loop whenever the socket has notifications.
+    retry_seconds = 5
+
+    def __init__(self, alias: str, loop: asyncio.AbstractEventLoop, on_notify):
+        self.alias = alias
+        self.loop = loop
+        self.on_notify = on_notify
+        self.connection = None
+        self.stopped = False
+
+    def start(self) -> None:
+        if self.stopped:
+            return
+        try:
+            self.connection = psycopg2.connect(**self._connection_params())
+            self.connection.autocommit = True
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+        except psycopg2.Error:
+            logger.exception("Cannot listen to balance changes on %s", self.alias)
+            self._close()
+            self.loop.call_later(self.retry_seconds, self.start)
+            return
+        self.loop.add_reader(self.connection.fileno(), self._read)
+
+    def stop(self) -> None:
+        self.stopped = True
+        self._close()
+
+    def _connection_params(self) -> dict:
+        # The same database, reached directly when the pool is in the way.
+        params = connections[self.alias].get_connection_params()
+        address = settings.DATABASE_LISTEN_ADDRESSES.get(self.alias, {})
+        params.update({name: value for name, value in address.items() if value})
+        return params
+
+    def _read(self) -> None:
+        try:
+            self.connection.poll()
+        except psycopg2.Error:
+            # Changes sent until the connection is back are lost.
+            logger.exception("Lost balance changes listener on %s", self.alias)
+            self._close()
+            self.loop.call_later(self.retry_seconds, self.start)
+            return
+        while self.connection.notifies:
+            notify = self.connection.notifies.pop(0)
+            self.on_notify(json.loads(notify.payload))
+
+    def _close(self) -> None:
+        if self.connection is None:
+            return
+        if not self.loop.is_closed():
+            self.loop.remove_reader(self.connection.fileno())
+        self.connection.close()
+        self.connection = None
+
+
+class ActivityNotifier:
+    # Writers publish every changed balance, streams subscribe to tracks.
+    # With the postgresql backend changes go out as NOTIFY in the writing
+    # transaction, so they are sent only when it commits, and every process
+    # with subscribers listens to all shards.
+    def __init__(self):
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._listeners: List[PostgresListener] = []
+
+    @property
+    def backend(self) -> str:
+        return settings.ACTIVITY_EVENTS_BACKEND
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend != "none"
+
+    def publish(self, aggregates: List[dict]) -> None:
+        # Has to be called inside the transaction storing the changes. With
+        # the none backend nothing is sent, ingest pays for no NOTIFY.
+        if not aggregates or not self.enabled:
+            return
+        connection = connections[database()]
+        if self.backend == "postgresql" and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                for payload in self._payloads(aggregates=aggregates):
+                    cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
+        else:
+            transaction.on_commit(
+                lambda: self.dispatch(aggregates=aggregates), using=connection.alias
+            )
+
+    def subscribe(self, track_ids: Iterable[str]) -> Subscription:
+        # Runs in the event loop serving the stream.
+        loop = asyncio.get_event_loop()
+        if self.backend == "postgresql" and not self._listeners:
+            self._listeners = [
+                PostgresListener(alias=alias, loop=loop, on_notify=self.dispatch)
+                for alias in activity_shards.shards
+                if connections[alias].vendor == "postgresql"
+            ]
+            for listener in self._listeners:
+                listener.start()
+
+        subscription = Subscription(track_ids=track_ids, loop=loop)
+        for track_id in subscription.track_ids:
+            self._subscriptions.setdefault(track_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        for track_id in subscription.track_ids:
+            subscriptions = self._subscriptions.get(track_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(track_id, None)
+        if not self._subscriptions:
+            for listener in self._listeners:
+                listener.stop()
+            self._listeners = []
+
+    def dispatch(self, aggregates: List[dict]) -> None:
+        # Safe to call from any thread, subscriptions are pushed to in the
+        # loop they belong to, with one wake-up of every loop.
+        pushes: Dict[asyncio.AbstractEventLoop, List[Tuple[Subscription, dict]]] = {}
+        for aggregated_data in aggregates:
+            for subscription in list(
+                self._subscriptions.get(aggregated_data["track_id"], ())
+            ):
+                pushes.setdefault(subscription.loop, []).append(
+                    (subscription, aggregated_data)
+                )
+        for loop, loop_pushes in pushes.items():
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._push, loop_pushes)
+
+    def subscribers(self) -> int:
+        return len(
+            {
+                subscription
+                for subscriptions in self._subscriptions.values()
+                for subscription in subscriptions
+            }
+        )
+
+    @staticmethod
+    def _push(pushes: List[Tuple[Subscription, dict]]) -> None:
+        for subscription, aggregated_data in pushes:
+            subscription.push(aggregated_data)
+
+    @staticmethod
+    def _payloads(aggregates: List[dict]) -> Iterator[str]:
+        encoder = JSONEncoder(separators=(",", ":"))
+        batch: List[str] = []
+        size = 2
+        for aggregated_data in aggregates:
+            item = encoder.encode(aggregated_data)
+            if batch and size + len(item) + 1 > MAX_PAYLOAD:
+                yield f"[{','.join(batch)}]"
+                batch = []
+                size = 2
+            batch.append(item)
+            size += len(item) + 1
+        if batch:
+            yield f"[{','.join(batch)}]"
+
+
+activity_notifier = ActivityNotifier()
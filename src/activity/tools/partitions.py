@@ -0,0 +1,195 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from django.db import connections, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import Max
+from django.utils import timezone
+
+from activity.exceptions.activity_exceptions import ActivitiesArchived
+from activity.models import Activity, ActivityArchive
+from activity.tools.shards import activity_shards
+from core.routers import database
+
+
+class ActivityPartitioner:
+    # PostgreSQL only. Activities are range partitioned by activity_date, one
+    # partition a month named <table>_YYYY_MM, rows dated outside all of them
+    # land in <table>_default (migration 0006).
+    archive_schema = "activity_archive"
+
+    @property
+    def connection(self) -> BaseDatabaseWrapper:
+        return connections[database()]
+
+    @property
+    def table(self) -> str:
+        return Activity._meta.db_table
+
+    @property
+    def default_partition(self) -> str:
+        return f"{self.table}_default"
+
+    @staticmethod
+    def month(date: datetime) -> datetime:
+        return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def next_month(month: datetime) -> datetime:
+        return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    def partition_name(self, month: datetime) -> str:
+        return f"{self.table}_{month:%Y_%m}"
+
+    def partitions(self) -> List[datetime]:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = %s",
+                [self.table],
+            )
+            names = [name for name, in cursor.fetchall()]
+
+        months = []
+        for name in names:
+            try:
+                months.append(datetime.strptime(name, f"{self.table}_%Y_%m"))
+            except ValueError:
+                continue
+        return sorted(months)
+
+    def create(self, month: datetime) -> bool:
+        month = self.month(month)
+        if month in self.partitions():
+            return False
+
+        connection = self.connection
+        quote_name = connection.ops.quote_name
+        table = quote_name(self.table)
+        partition = quote_name(self.partition_name(month))
+        bounds = [self._bound(month), self._bound(self.next_month(month))]
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            # Writes wait until the partition is attached, otherwise rows for
+            # its month could still land in the default partition.
+            cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+            cursor.execute(
+                f"CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS)"
+            )
+            # Attaching fails while the default partition holds rows of the
+            # new range, they are moved before the indexes are built.
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {quote_name(self.default_partition)} "
+                "WHERE activity_date >= %s AND activity_date < %s RETURNING *) "
+                f"INSERT INTO {partition} SELECT * FROM moved",
+                bounds,
+            )
+            cursor.execute(
+                f"ALTER TABLE {table} ATTACH PARTITION {partition} "
+                "FOR VALUES FROM (%s) TO (%s)",
+                bounds,
+            )
+        return True
+
+    def create_ahead(self, months: int, now: Optional[datetime] = None) -> List[str]:
+        month = self.month(now or timezone.now())
+        created = []
+        for _ in range(months + 1):
+            if self.create(month=month):
+                created.append(self.partition_name(month))
+            month = self.next_month(month)
+        return created
+
+    def cover_default(self) -> List[str]:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT DISTINCT date_trunc('month', activity_date AT TIME ZONE 'UTC') "
+                f"FROM {self.connection.ops.quote_name(self.default_partition)}"
+            )
+            months = sorted(month for month, in cursor.fetchall())
+        return [
+            self.partition_name(month) for month in months if self.create(month=month)
+        ]
+
+    def archived_until(self) -> Optional[datetime]:
+        # End of the last detached month, activities dated before it may be
+        # missing from the table.
+        latest = ActivityArchive.objects.aggregate(latest=Max("month"))["latest"]
+        return None if latest is None else self.next_month(latest)
+
+    def archived_ids(self, track_id: str) -> List[str]:
+        # IDs of the track in partitions moved to the archive schema.
+        connection = self.connection
+        if connection.vendor != "postgresql":
+            return []
+        quote_name = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tablename FROM pg_tables "
+                "WHERE schemaname = %s AND tablename LIKE %s ORDER BY tablename",
+                [self.archive_schema, f"{self.table}\\_%"],
+            )
+            tables = [table for table, in cursor.fetchall()]
+            ids = []
+            for table in tables:
+                cursor.execute(
+                    f"SELECT id FROM {quote_name(self.archive_schema)}."
+                    f"{quote_name(table)} WHERE track_id = %s",
+                    [track_id],
+                )
+                ids += [activity_id for activity_id, in cursor.fetchall()]
+        return ids
+
+    def check_complete(self, since: Optional[datetime] = None) -> None:
+        # Balances, checkpoints and rollups keep archived amounts, recomputing
+        # them from the table would silently drop those.
+        archived_until = self.archived_until()
+        if archived_until is not None and (since is None or since < archived_until):
+            raise ActivitiesArchived(
+                f"Activities before {archived_until:%Y-%m} are archived on "
+                f"{database()}"
+            )
+
+    def check_shards_complete(self, since: Optional[datetime] = None) -> None:
+        # Lets commands refuse before any shard is rebuilt.
+        for alias in activity_shards.shards:
+            with activity_shards.using(alias=alias):
+                self.check_complete(since=since)
+
+    def detach(self, before: datetime, drop: bool = False) -> List[str]:
+        # Detached activities stop counting in history. Their IDs stay in the
+        # registry, so they are never stored again, and the month is recorded
+        # so that nothing is rebuilt without them.
+        connection = self.connection
+        alias = connection.alias
+        quote_name = connection.ops.quote_name
+        table = quote_name(self.table)
+        detached = []
+        for month in self.partitions():
+            if self.next_month(month) > before:
+                break
+            name = self.partition_name(month)
+            with transaction.atomic(using=alias), connection.cursor() as cursor:
+                cursor.execute(
+                    f"ALTER TABLE {table} DETACH PARTITION {quote_name(name)}"
+                )
+                if drop:
+                    cursor.execute(f"DROP TABLE {quote_name(name)}")
+                else:
+                    schema = quote_name(self.archive_schema)
+                    cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+                    cursor.execute(
+                        f"ALTER TABLE {quote_name(name)} SET SCHEMA {schema}"
+                    )
+                ActivityArchive.objects.create(month=month, dropped=drop)
+            detached.append(name)
+        return detached
+
+    @staticmethod
+    def _bound(month: datetime) -> str:
+        # Partition bounds have to be plain literals on PostgreSQL 11.
+        return f"{month:%Y-%m-%d %H:%M:%S}+00"
+
+
+activity_partitioner = ActivityPartitioner()
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.utils import timezone
+
+from activity.exceptions.activity_exceptions import InvalidActivity
+from activity.models import Activity, ActivityQueueEntry
+from activity.tools.validators import activity_validator
+from activity.tools.writers import activity_writer
+
+
+@dataclass
+class DrainReport:
+    entries: int = 0
+    activities: int = 0
+    created: int = 0
+
+
+class ActivityQueue:
+    # Database outbox of accepted activities. The worker takes the oldest
+    # entries, stores them with as few inserts as possible and deletes them in
+    # the same transaction, so every entry is stored exactly once.
+    batch_size = 5000
+    max_entries = 1000
+
+    def enqueue(self, activities: List[Activity]) -> ActivityQueueEntry:
+        return ActivityQueueEntry.objects.create(
+            activities=[self._dump(activity=activity) for activity in activities],
+            size=len(activities),
+        )
+
+    def drain(self, batch_size: Optional[int] = None) -> DrainReport:
+        batch_size = batch_size or self.batch_size
+        with transaction.atomic():
+            # Workers running side by side take different entries.
+            sizes = list(
+                ActivityQueueEntry.objects.select_for_update(skip_locked=True)
+                .order_by("id")
+                .values_list("id", "size")[: self.max_entries]
+            )
+            entry_ids = []
+            size = 0
+            for entry_id, entry_size in sizes:
+                if entry_ids and size + entry_size > batch_size:
+                    break
+                entry_ids.append(entry_id)
+                size += entry_size
+
+            entries = ActivityQueueEntry.objects.filter(id__in=entry_ids).order_by("id")
+            activities = self._coalesce(
+                entries=entries.values_list("activities", flat=True)
+            )
+            created = 0
+            for start in range(0, len(activities), self.batch_size):
+                end = start + self.batch_size
+                created += len(
+                    activity_writer.save_new(activities=activities[start:end])
+                )
+            entries.delete()
+        return DrainReport(entries=len(entry_ids), activities=size, created=created)
+
+    @staticmethod
+    def stats() -> dict:
+        stats = ActivityQueueEntry.objects.aggregate(
+            entries=Count("id"), activities=Sum("size"), oldest=Min("enqueued_at")
+        )
+        lag = None
+        if stats["oldest"] is not None:
+            lag = (timezone.now() - stats["oldest"]).total_seconds()
+        return {
+            "entries": stats["entries"],
+            "activities": stats["activities"] or 0,
+            "oldest_enqueued_at": stats["oldest"],
+            "lag": lag,
+        }
+
+    @staticmethod
+    def _coalesce(entries) -> List[Activity]:
+        # The same as in separate requests, the first stored activity of an ID
+        # wins. Entries were validated on enqueue, so invalid ones are skipped.
+        activities: Dict[str, Activity] = {}
+        for entry in entries:
+            for data in entry:
+                try:
+                    activity = activity_validator.validate(data=data)
+                except InvalidActivity:
+                    continue
+                activities.setdefault(activity.id, activity)
+        return list(activities.values())
+
+    @staticmethod
+    def _dump(activity: Activity) -> dict:
+        return {
+            "id": activity.id,
+            "activity_date": activity.activity_date.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+            "track_id": activity.track_id,
+            "status": activity.status,
+            "billig_amount": str(activity.billig_amount),
+        }
+
+
+activity_queue = ActivityQueue()
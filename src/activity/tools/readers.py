@@ -0,0 +1,84 @@
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from django.db.models import QuerySet
+
+from activity.models import Activity, TrackBalance
+from activity.tools.balances import activity_balancer
+from activity.tools.caches import activity_cache
+from activity.tools.replicas import activity_replicas
+from activity.tools.shards import activity_shards
+
+
+class ActivityReader:
+    @staticmethod
+    def retrieve(track_id: str) -> Tuple[dict, bool, datetime]:
+        # The aggregate comes with the version of the balance it was made of.
+        cached = activity_cache.get(track_id=track_id)
+        if cached is not None:
+            aggregated_data, version = cached
+            return aggregated_data, True, version
+        with activity_shards.track(track_id=track_id):
+            with activity_replicas.reads(track_ids=[track_id]):
+                balance = activity_balancer.get(track_id=track_id)
+        aggregated_data = activity_balancer.to_aggregate(balance=balance)
+        activity_cache.add(aggregated_data=aggregated_data, version=balance.updated_at)
+        return aggregated_data, False, balance.updated_at
+
+    @staticmethod
+    def version(track_id: str) -> Optional[datetime]:
+        # None for unknown tracks.
+        cached = activity_cache.get(track_id=track_id)
+        if cached is not None:
+            return cached[1]
+        with activity_shards.track(track_id=track_id):
+            with activity_replicas.reads(track_ids=[track_id]):
+                balance = TrackBalance.objects.filter(track_id=track_id).first()
+        if balance is None:
+            return None
+        activity_cache.add(
+            aggregated_data=activity_balancer.to_aggregate(balance=balance),
+            version=balance.updated_at,
+        )
+        return balance.updated_at
+
+    @staticmethod
+    def retrieve_many(track_ids: List[str]) -> dict:
+        aggregates = activity_cache.get_many(track_ids=track_ids)
+        missing_track_ids = [
+            track_id for track_id in track_ids if track_id not in aggregates
+        ]
+        shards = activity_shards.split_track_ids(track_ids=missing_track_ids)
+        for alias, shard_track_ids in shards.items():
+            with activity_shards.using(alias=alias):
+                with activity_replicas.reads(track_ids=shard_track_ids):
+                    aggregates.update(
+                        activity_balancer.retrieve_many(track_ids=shard_track_ids)
+                    )
+        return {
+            "results": [
+                aggregates[track_id] for track_id in track_ids if track_id in aggregates
+            ],
+            "not_found": [
+                track_id for track_id in track_ids if track_id not in aggregates
+            ],
+        }
+
+    @staticmethod
+    def history(
+        track_id: str,
+        statuses: Optional[Iterable[str]] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+    ) -> QuerySet:
+        activities = Activity.objects.filter(track_id=track_id)
+        if statuses:
+            activities = activities.filter(status__in=sorted(statuses))
+        if date_from is not None:
+            activities = activities.filter(activity_date__gte=date_from)
+        if date_to is not None:
+            activities = activities.filter(activity_date__lt=date_to)
+        return activities
+
+
+activity_reader = ActivityReader()
@@ -0,0 +1,298 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from django.db import connections, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from activity.exceptions.activity_exceptions import ActivityIDConflict
+from activity.models import (
+    Activity,
+    ActivityArchive,
+    ActivityKey,
+    TrackBalance,
+    TrackCheckpoint,
+    TrackRollup,
+)
+from activity.tools.balances import BalanceChange, activity_balancer
+from activity.tools.caches import activity_cache
+from activity.tools.notifications import activity_notifier
+from activity.tools.partitions import activity_partitioner
+from activity.tools.rollups import ROLLUP_FIELDS, RollupChange
+from activity.tools.shards import activity_shards
+
+
+@dataclass
+class RebalanceReport:
+    tracks: int = 0
+    activities: int = 0
+    moves: Dict[Tuple[str, str], int] = field(default_factory=dict)
+
+    def add(self, source: str, target: str, activities: int) -> None:
+        self.tracks += 1
+        self.activities += activities
+        self.moves[source, target] = self.moves.get((source, target), 0) + 1
+
+
+class ActivityRebalancer:
+    # Moves tracks whose shard changed after a shard was added. Run it once
+    # every worker uses the new ACTIVITY_SHARDS: new activities of a moved
+    # track already go to its new shard. Balances, checkpoints and rollups
+    # are copied as they are, so amounts of archived activities move along,
+    # and merged with whatever the new shard already stored for the track.
+    batch_size = 1000
+
+    def misplaced(self, alias: str) -> List[str]:
+        track_ids = (
+            TrackBalance.objects.using(alias)
+            .order_by("track_id")
+            .values_list("track_id", flat=True)
+        )
+        return [
+            track_id
+            for track_id in track_ids.iterator(chunk_size=self.batch_size)
+            if activity_shards.shard_for(track_id) != alias
+        ]
+
+    def rebalance(self, dry_run: bool = False) -> RebalanceReport:
+        report = RebalanceReport()
+        for source in activity_shards.shards:
+            for track_id in self.misplaced(alias=source):
+                target = activity_shards.shard_for(track_id)
+                if dry_run:
+                    activities = (
+                        Activity.objects.using(source).filter(track_id=track_id).count()
+                    )
+                else:
+                    activities = self.move(track_id=track_id, source=source)
+                report.add(source=source, target=target, activities=activities)
+        return report
+
+    def move(self, track_id: str, source: str) -> int:
+        # The new shard commits first. If the old one fails to commit after
+        # it, the next run finds the activities copied and only cleans up.
+        target = activity_shards.shard_for(track_id)
+        activities = Activity.objects.using(source).filter(track_id=track_id)
+        with transaction.atomic(using=source):
+            balance = (
+                TrackBalance.objects.using(source)
+                .select_for_update()
+                .get(track_id=track_id)
+            )
+            with transaction.atomic(using=target):
+                if not self._copied(track_id=track_id, source=source, target=target):
+                    self._copy_activities(
+                        track_id=track_id,
+                        activities=activities,
+                        source=source,
+                        target=target,
+                    )
+                    self._merge_state(balance=balance, source=source, target=target)
+
+            moved_ids = activities.values("id")
+            ActivityKey.objects.using(source).filter(id__in=moved_ids).delete()
+            moved = activities.delete()[0]
+            TrackBalance.objects.using(source).filter(track_id=track_id).delete()
+            TrackCheckpoint.objects.using(source).filter(track_id=track_id).delete()
+            TrackRollup.objects.using(source).filter(track_id=track_id).delete()
+        return moved
+
+    @staticmethod
+    def _copied(track_id: str, source: str, target: str) -> bool:
+        activity_id = (
+            Activity.objects.using(source)
+            .filter(track_id=track_id)
+            .values_list("id", flat=True)
+            .first()
+        )
+        return (
+            activity_id is not None
+            and Activity.objects.using(target)
+            .filter(id=activity_id, track_id=track_id)
+            .exists()
+        )
+
+    def _copy_activities(
+        self, track_id: str, activities: QuerySet, source: str, target: str
+    ) -> None:
+        # Rows are inserted as they are, without updating balances, caches
+        # or subscribers. IDs of archived activities are reserved as well.
+        batch: List[Activity] = []
+        for activity in activities.order_by("activity_date", "id").iterator(
+            chunk_size=self.batch_size
+        ):
+            batch.append(activity)
+            if len(batch) == self.batch_size:
+                self._insert(track_id=track_id, activities=batch, target=target)
+                batch = []
+        self._insert(track_id=track_id, activities=batch, target=target)
+
+        with activity_shards.using(alias=source):
+            archived_ids = activity_partitioner.archived_ids(track_id=track_id)
+        batch_ids: List[str] = []
+        for activity_id in archived_ids:
+            batch_ids.append(activity_id)
+            if len(batch_ids) == self.batch_size:
+                self._reserve(track_id=track_id, activity_ids=batch_ids, target=target)
+                batch_ids = []
+        if batch_ids:
+            self._reserve(track_id=track_id, activity_ids=batch_ids, target=target)
+        ActivityArchive.objects.using(target).bulk_create(
+            [
+                ActivityArchive(month=archive.month, dropped=archive.dropped)
+                for archive in ActivityArchive.objects.using(source)
+            ],
+            ignore_conflicts=True,
+        )
+
+    def _insert(self, track_id: str, activities: List[Activity], target: str) -> None:
+        if not activities:
+            return
+        self._reserve(
+            track_id=track_id,
+            activity_ids=[activity.id for activity in activities],
+            target=target,
+        )
+        connection = connections[target]
+        if connection.vendor == "postgresql":
+            # The IDs are registered already, the registering trigger skips
+            # the next insert (migration 0006).
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT set_config('activity.ids_registered', 'on', true)"
+                )
+        Activity.objects.using(target).bulk_create(activities)
+
+    @staticmethod
+    def _reserve(track_id: str, activity_ids: List[str], target: str) -> None:
+        # IDs are unique per shard only, an ID the new shard already stores
+        # would be lost.
+        if ActivityKey.objects.using(target).filter(id__in=activity_ids).exists() or (
+            Activity.objects.using(target).filter(id__in=activity_ids).exists()
+        ):
+            raise ActivityIDConflict(
+                f"Activities of track {track_id} clash with stored IDs"
+            )
+        ActivityKey.objects.using(target).bulk_create(
+            [ActivityKey(id=activity_id) for activity_id in activity_ids]
+        )
+
+    def _merge_state(self, balance: TrackBalance, source: str, target: str) -> None:
+        track_id = balance.track_id
+        TrackBalance.objects.using(target).bulk_create(
+            [
+                TrackBalance(
+                    track_id=track_id,
+                    amount=0,
+                    last_status=balance.last_status,
+                    last_activity_date=balance.last_activity_date,
+                    last_activity_id=balance.last_activity_id,
+                    updated_at=balance.updated_at,
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        # Writes of the track on the new shard wait for the move from here.
+        merged = (
+            TrackBalance.objects.using(target)
+            .select_for_update()
+            .get(track_id=track_id)
+        )
+        BalanceChange.of(balance).apply_to(merged)
+        merged.updated_at = max(merged.updated_at, balance.updated_at)
+        activity_balancer.touch(balance=merged, now=timezone.now())
+        merged.save(using=target)
+
+        self._merge_checkpoints(track_id=track_id, source=source, target=target)
+        self._merge_rollups(track_id=track_id, source=source, target=target)
+
+        # Published and dropped from the cache once, when the new shard has
+        # the whole track.
+        with activity_shards.using(alias=target):
+            activity_notifier.publish(
+                aggregates=[activity_balancer.to_aggregate(balance=merged)]
+            )
+        transaction.on_commit(
+            lambda: activity_cache.delete(track_ids=[track_id]), using=target
+        )
+
+    def _merge_checkpoints(self, track_id: str, source: str, target: str) -> None:
+        # Checkpoints are sparse, the balance at a day boundary is the one of
+        # the latest checkpoint up to it. Both shards hold part of the track.
+        source_checkpoints = list(
+            TrackCheckpoint.objects.using(source)
+            .filter(track_id=track_id)
+            .order_by("checkpoint_date")
+        )
+        target_checkpoints = list(
+            TrackCheckpoint.objects.using(target)
+            .filter(track_id=track_id)
+            .order_by("checkpoint_date")
+        )
+        dates = sorted(
+            {
+                checkpoint.checkpoint_date
+                for checkpoint in source_checkpoints + target_checkpoints
+            }
+        )
+        merged = []
+        for checkpoint_date in dates:
+            source_checkpoint = self._checkpoint_at(source_checkpoints, checkpoint_date)
+            target_checkpoint = self._checkpoint_at(target_checkpoints, checkpoint_date)
+            base = target_checkpoint or source_checkpoint
+            checkpoint = TrackCheckpoint(
+                track_id=track_id,
+                checkpoint_date=checkpoint_date,
+                amount=base.amount,
+                last_status=base.last_status,
+                last_activity_date=base.last_activity_date,
+                last_activity_id=base.last_activity_id,
+            )
+            if target_checkpoint is not None and source_checkpoint is not None:
+                BalanceChange.of(source_checkpoint).apply_to(checkpoint)
+            merged.append(checkpoint)
+        TrackCheckpoint.objects.using(target).filter(track_id=track_id).delete()
+        TrackCheckpoint.objects.using(target).bulk_create(
+            merged, batch_size=self.batch_size
+        )
+
+    def _merge_rollups(self, track_id: str, source: str, target: str) -> None:
+        stored = {
+            (rollup.granularity, rollup.bucket_start): rollup
+            for rollup in TrackRollup.objects.using(target)
+            .select_for_update()
+            .filter(track_id=track_id)
+        }
+        created = []
+        updated = []
+        for rollup in TrackRollup.objects.using(source).filter(track_id=track_id):
+            existing = stored.get((rollup.granularity, rollup.bucket_start))
+            if existing is None:
+                rollup.pk = None
+                created.append(rollup)
+            else:
+                RollupChange.of(rollup).apply_to(existing)
+                updated.append(existing)
+        TrackRollup.objects.using(target).bulk_create(
+            created, batch_size=self.batch_size
+        )
+        TrackRollup.objects.using(target).bulk_update(
+            updated,
+            fields=ROLLUP_FIELDS,
+            batch_size=self.batch_size,
+        )
+
+    @staticmethod
+    def _checkpoint_at(
+        checkpoints: List[TrackCheckpoint], checkpoint_date: datetime
+    ) -> Optional[TrackCheckpoint]:
+        latest = None
+        for checkpoint in checkpoints:
+            if checkpoint.checkpoint_date > checkpoint_date:
+                break
+            latest = checkpoint
+        return latest
+
+
+activity_rebalancer = ActivityRebalancer()
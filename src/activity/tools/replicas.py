@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+
+from core.routers import replica_reads
+
+
+class ActivityReplicas:
+    # A client that has just stored activities of a track reads the track
+    # from the primary for DATABASE_REPLICA_STICKY_SECONDS, replicas may not
+    # have them yet. The marks live in the activity cache, so they are shared
+    # by all workers.
+    key_prefix = "primary"
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[settings.ACTIVITY_CACHE_ALIAS]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.DATABASE_REPLICAS)
+
+    def stick(self, track_ids: Iterable[str]) -> None:
+        timeout = settings.DATABASE_REPLICA_STICKY_SECONDS
+        if not self.enabled or timeout <= 0:
+            return
+        self.cache.set_many(
+            {self._key(track_id=track_id): True for track_id in set(track_ids)},
+            timeout=timeout,
+        )
+
+    def sticky(self, track_ids: Iterable[str]) -> bool:
+        return bool(
+            self.cache.get_many(
+                [self._key(track_id=track_id) for track_id in track_ids]
+            )
+        )
+
+    @contextmanager
+    def reads(self, track_ids: Iterable[str]) -> Iterator[None]:
+        # Replica reads of the tracks unless one of them was written recently.
+        track_ids = list(track_ids)
+        with replica_reads(enabled=self.enabled and not self.sticky(track_ids)):
+            yield
+
+    def _key(self, track_id: str) -> str:
+        return f"{self.key_prefix}:{track_id}"
+
+
+activity_replicas = ActivityReplicas()
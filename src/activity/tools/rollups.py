@@ -0,0 +1,351 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import connections, transaction
+from django.db.models import F, Sum
+
+from activity.models import Activity, TrackRollup
+from activity.tools.balances import ActivityRow, activity_balancer
+from activity.tools.partitions import activity_partitioner
+from activity.tools.replicas import activity_replicas
+from activity.tools.shards import activity_shards
+from activity.tools.validators import CENT
+from core.routers import database
+
+
+RollupKey = Tuple[str, str, datetime]
+ROLLUP_KEY = ("track_id", "granularity", "bucket_start")
+# Counters first, then the fields of the last activity.
+ROLLUP_FIELDS = (
+    "amount_s",
+    "amount_r",
+    "count_a",
+    "count_s",
+    "count_r",
+    "last_status",
+    "last_activity_date",
+    "last_activity_id",
+)
+
+
+@dataclass
+class RollupChange:
+    last_status: str
+    last_activity_date: datetime
+    last_activity_id: str
+    amount_s: Decimal = Decimal(0)
+    amount_r: Decimal = Decimal(0)
+    count_a: int = 0
+    count_s: int = 0
+    count_r: int = 0
+
+    @classmethod
+    def of(cls, rollup: TrackRollup) -> "RollupChange":
+        return cls(
+            last_status=rollup.last_status,
+            last_activity_date=rollup.last_activity_date,
+            last_activity_id=rollup.last_activity_id,
+            amount_s=rollup.amount_s,
+            amount_r=rollup.amount_r,
+            count_a=rollup.count_a,
+            count_s=rollup.count_s,
+            count_r=rollup.count_r,
+        )
+
+    def add(
+        self, activity_id: str, activity_date: datetime, status: str, amount: Decimal
+    ) -> None:
+        if status == "S":
+            self.amount_s += amount
+            self.count_s += 1
+        elif status == "R":
+            self.amount_r += amount
+            self.count_r += 1
+        else:
+            self.count_a += 1
+        if (activity_date, activity_id) >= self.last_activity:
+            self.last_status = status
+            self.last_activity_date = activity_date
+            self.last_activity_id = activity_id
+
+    def apply_to(self, rollup: TrackRollup) -> None:
+        rollup.amount_s += self.amount_s
+        rollup.amount_r += self.amount_r
+        rollup.count_a += self.count_a
+        rollup.count_s += self.count_s
+        rollup.count_r += self.count_r
+        if self.last_activity >= (rollup.last_activity_date, rollup.last_activity_id):
+            rollup.last_status = self.last_status
+            rollup.last_activity_date = self.last_activity_date
+            rollup.last_activity_id = self.last_activity_id
+
+    @property
+    def last_activity(self) -> Tuple[datetime, str]:
+        return self.last_activity_date, self.last_activity_id
+
+
+class ActivityRollups:
+    # Hourly and daily billing per track. Ingest adds to them in the same
+    # transaction as it updates balances, so the balance row locks keep
+    # writers of a track in order and rebuilds see a consistent snapshot.
+    intervals = {
+        "hour": timedelta(hours=1),
+        "day": timedelta(days=1),
+    }
+    batch_size = 1000
+
+    def __init__(self):
+        self._date_field = Activity._meta.get_field("activity_date")
+        self._amount_field = Activity._meta.get_field("billig_amount")
+
+    @staticmethod
+    def bucket(date: datetime, granularity: str) -> datetime:
+        date = date.replace(minute=0, second=0, microsecond=0)
+        if granularity == "day":
+            date = date.replace(hour=0)
+        return date
+
+    def apply(self, activities: Iterable[Activity]) -> int:
+        # Adds the activities to their buckets with one upsert per batch of
+        # buckets. Only the rows of those buckets are written and locked.
+        changes = self._collect_changes(
+            (
+                activity.track_id,
+                activity.id,
+                activity.activity_date,
+                activity.status,
+                activity.billig_amount,
+            )
+            for activity in activities
+        )
+        keys = sorted(changes)
+        for start in range(0, len(keys), self.batch_size):
+            end = start + self.batch_size
+            self._upsert(
+                rollups=[
+                    self._rollup(key=key, change=changes[key])
+                    for key in keys[start:end]
+                ]
+            )
+        return len(keys)
+
+    @staticmethod
+    def _upsert(rollups: List[TrackRollup]) -> None:
+        # INSERT ... ON CONFLICT DO UPDATE adding the new counts to stored
+        # ones, the later activity by (activity_date, id) wins last_status.
+        connection = connections[database()]
+        quote_name = connection.ops.quote_name
+        table = quote_name(TrackRollup._meta.db_table)
+        fields = [
+            TrackRollup._meta.get_field(name) for name in ROLLUP_KEY + ROLLUP_FIELDS
+        ]
+        columns = ", ".join(quote_name(field.column) for field in fields)
+        row = f"({', '.join(['%s'] * len(fields))})"
+        params = [
+            field.get_db_prep_save(getattr(rollup, field.attname), connection)
+            for rollup in rollups
+            for field in fields
+        ]
+        sums = [
+            f"{quote_name(name)} = {table}.{quote_name(name)} "
+            f"+ EXCLUDED.{quote_name(name)}"
+            for name in ROLLUP_FIELDS[:5]
+        ]
+        date = quote_name("last_activity_date")
+        activity_id = quote_name("last_activity_id")
+        later = (
+            f"(EXCLUDED.{date}, EXCLUDED.{activity_id}) "
+            f">= ({table}.{date}, {table}.{activity_id})"
+        )
+        latest = [
+            f"{quote_name(name)} = CASE WHEN {later} THEN EXCLUDED.{quote_name(name)} "
+            f"ELSE {table}.{quote_name(name)} END"
+            for name in ROLLUP_FIELDS[5:]
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"VALUES {', '.join([row] * len(rollups))} "
+                f"ON CONFLICT ({', '.join(quote_name(name) for name in ROLLUP_KEY)}) "
+                f"DO UPDATE SET {', '.join(sums + latest)}",
+                params,
+            )
+
+    def rebuild(
+        self, track_ids: Optional[List[str]] = None, since: Optional[datetime] = None
+    ) -> int:
+        # Replays stored activities into rollups, from the day of since on
+        # when given, older rollups are kept.
+        if since is not None:
+            since = self.bucket(since, granularity="day")
+        activity_partitioner.check_complete(since=since)
+        stale_rollups = TrackRollup.objects.all()
+        activities = Activity.objects.all()
+        if track_ids is not None:
+            stale_rollups = stale_rollups.filter(track_id__in=track_ids)
+            activities = activities.filter(track_id__in=track_ids)
+        if since is not None:
+            stale_rollups = stale_rollups.filter(bucket_start__gte=since)
+            activities = activities.filter(activity_date__gte=since)
+        with transaction.atomic(using=database()):
+            activity_balancer.lock()
+            stale_rollups.delete()
+            rollups = self._replay_rollups(
+                rows=activities.order_by("track_id", "activity_date", "id")
+                .values_list(
+                    "track_id", "id", "activity_date", "status", "billig_amount"
+                )
+                .iterator(chunk_size=self.batch_size)
+            )
+            created = 0
+            batch: List[TrackRollup] = []
+            for rollup in rollups:
+                batch.append(rollup)
+                if len(batch) == self.batch_size:
+                    created += len(TrackRollup.objects.bulk_create(batch))
+                    batch = []
+            created += len(TrackRollup.objects.bulk_create(batch))
+        return created
+
+    def series(
+        self,
+        granularity: str,
+        date_from: datetime,
+        date_to: datetime,
+        track_id: Optional[str] = None,
+    ) -> List[dict]:
+        # Net billing of every bucket starting in the range, empty buckets
+        # included. Only rollups are read, of the track's shard or of all.
+        start = self.bucket(date_from, granularity=granularity)
+        totals: Dict[datetime, dict] = {}
+        if track_id is None:
+            for alias in activity_shards.shards:
+                with activity_shards.using(alias=alias):
+                    self._add_totals(
+                        totals=totals,
+                        rollups=TrackRollup.objects.filter(granularity=granularity),
+                        start=start,
+                        end=date_to,
+                    )
+        else:
+            with activity_shards.track(track_id=track_id):
+                with activity_replicas.reads(track_ids=[track_id]):
+                    self._add_totals(
+                        totals=totals,
+                        rollups=TrackRollup.objects.filter(
+                            granularity=granularity, track_id=track_id
+                        ),
+                        start=start,
+                        end=date_to,
+                    )
+
+        series = []
+        bucket_start = start
+        while bucket_start < date_to:
+            series.append(
+                totals.get(
+                    bucket_start,
+                    {"bucket": bucket_start, "amount": Decimal(0), "activities": 0},
+                )
+            )
+            bucket_start += self.intervals[granularity]
+        return series
+
+    def buckets(self, granularity: str, date_from: datetime, date_to: datetime) -> int:
+        start = self.bucket(date_from, granularity=granularity)
+        interval = self.intervals[granularity]
+        return (date_to - start + interval - timedelta(microseconds=1)) // interval
+
+    @staticmethod
+    def _add_totals(
+        totals: Dict[datetime, dict], rollups, start: datetime, end: datetime
+    ) -> None:
+        for bucket_start, amount, activities in (
+            rollups.filter(bucket_start__gte=start, bucket_start__lt=end)
+            .values("bucket_start")
+            .annotate(
+                amount=Sum(F("amount_s") - F("amount_r")),
+                activities=Sum(F("count_a") + F("count_s") + F("count_r")),
+            )
+            .order_by("bucket_start")
+            .values_list("bucket_start", "amount", "activities")
+        ):
+            total = totals.setdefault(
+                bucket_start,
+                {"bucket": bucket_start, "amount": Decimal(0), "activities": 0},
+            )
+            total["amount"] += amount
+            total["activities"] += activities
+
+    def _collect_changes(
+        self, rows: Iterable[ActivityRow]
+    ) -> Dict[RollupKey, RollupChange]:
+        changes: Dict[RollupKey, RollupChange] = {}
+        for track_id, activity_id, activity_date, status, billig_amount in rows:
+            activity_date = self._date_field.to_python(activity_date)
+            amount = self._amount_field.to_python(billig_amount).quantize(CENT)
+            for granularity in self.intervals:
+                key = (track_id, granularity, self.bucket(activity_date, granularity))
+                changes.setdefault(
+                    key,
+                    RollupChange(
+                        last_status=status,
+                        last_activity_date=activity_date,
+                        last_activity_id=activity_id,
+                    ),
+                ).add(
+                    activity_id=activity_id,
+                    activity_date=activity_date,
+                    status=status,
+                    amount=amount,
+                )
+        return changes
+
+    def _replay_rollups(self, rows: Iterable[ActivityRow]) -> Iterator[TrackRollup]:
+        # Rows come ordered by track and date, so a bucket is complete as
+        # soon as a row falls into another one.
+        buckets: Dict[str, Tuple[RollupKey, RollupChange]] = {}
+        for track_id, activity_id, activity_date, status, amount in rows:
+            for granularity in self.intervals:
+                key = (track_id, granularity, self.bucket(activity_date, granularity))
+                if granularity in buckets and buckets[granularity][0] != key:
+                    yield self._rollup(*buckets.pop(granularity))
+                if granularity not in buckets:
+                    buckets[granularity] = (
+                        key,
+                        RollupChange(
+                            last_status=status,
+                            last_activity_date=activity_date,
+                            last_activity_id=activity_id,
+                        ),
+                    )
+                buckets[granularity][1].add(
+                    activity_id=activity_id,
+                    activity_date=activity_date,
+                    status=status,
+                    amount=amount,
+                )
+        for key, change in buckets.values():
+            yield self._rollup(key=key, change=change)
+
+    @staticmethod
+    def _rollup(key: RollupKey, change: RollupChange) -> TrackRollup:
+        track_id, granularity, bucket_start = key
+        return TrackRollup(
+            track_id=track_id,
+            granularity=granularity,
+            bucket_start=bucket_start,
+            amount_s=change.amount_s,
+            amount_r=change.amount_r,
+            count_a=change.count_a,
+            count_s=change.count_s,
+            count_r=change.count_r,
+            last_status=change.last_status,
+            last_activity_date=change.last_activity_date,
+            last_activity_id=change.last_activity_id,
+        )
+
+
+activity_rollups = ActivityRollups()
@@ -0,0 +1,154 @@
+import hashlib
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from activity.models import Activity
+from core.routers import use_database
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class ShardResult(Generic[T]):
+    # Outcome of one shard's batch, either a value or the error it raised.
+    alias: str
+    activities: List[Activity]
+    value: Optional[T] = None
+    error: Optional[Exception] = None
+
+    def get(self) -> T:
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class HashRing:
+    # Consistent hashing, every node owns `replicas` points of the ring and a
+    # key belongs to the first point after its hash. Adding a node moves only
+    # the keys the new node takes over.
+    def __init__(self, nodes: Iterable[str], replicas: int = 100):
+        points = sorted(
+            (self.hash(f"{node}:{index}"), node)
+            for node in nodes
+            for index in range(replicas)
+        )
+        if not points:
+            raise ValueError("Hash ring needs at least one node")
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+    def node(self, key: str) -> str:
+        index = bisect_right(self._hashes, self.hash(key))
+        return self._nodes[index % len(self._nodes)]
+
+
+@lru_cache(maxsize=None)
+def _ring(shards: Tuple[str, ...]) -> HashRing:
+    return HashRing(nodes=shards)
+
+
+@lru_cache(maxsize=None)
+def _writers(max_workers: int) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shard")
+
+
+class ActivityShards:
+    # Every track lives on one of settings.ACTIVITY_SHARDS, together with its
+    # activities, balance and checkpoints. Code running inside track() or
+    # using() reads and writes the sharded models on that shard only.
+    @property
+    def shards(self) -> List[str]:
+        return settings.ACTIVITY_SHARDS
+
+    def shard_for(self, track_id: str) -> str:
+        return _ring(tuple(self.shards)).node(track_id)
+
+    def split(self, activities: Iterable[Activity]) -> Dict[str, List[Activity]]:
+        groups: Dict[str, List[Activity]] = {}
+        for activity in activities:
+            groups.setdefault(self.shard_for(activity.track_id), []).append(activity)
+        return groups
+
+    def split_track_ids(self, track_ids: Iterable[str]) -> Dict[str, List[str]]:
+        groups: Dict[str, List[str]] = {}
+        for track_id in track_ids:
+            groups.setdefault(self.shard_for(track_id), []).append(track_id)
+        return groups
+
+    @contextmanager
+    def using(self, alias: str) -> Iterator[None]:
+        with use_database(alias):
+            yield
+
+    @contextmanager
+    def track(self, track_id: str) -> Iterator[None]:
+        with use_database(self.shard_for(track_id)):
+            yield
+
+    def map(
+        self, func: Callable[[List[Activity]], T], activities: Iterable[Activity]
+    ) -> List[ShardResult[T]]:
+        # Calls func with the activities of every shard on that shard. Batches
+        # of several shards are written in parallel, each in its own
+        # transaction, so a failure of one shard does not undo the others and
+        # is returned with the batch instead of raised.
+        groups = self.split(activities)
+        if len(groups) == 1:
+            alias, group = groups.popitem()
+            with use_database(alias):
+                return [self._result(alias, func, group)]
+
+        executor = _writers(max_workers=settings.ACTIVITY_SHARD_WRITERS)
+        futures = [
+            executor.submit(self._run, alias, func, group)
+            for alias, group in groups.items()
+        ]
+        wait(futures)
+        return [future.result() for future in futures]
+
+    @classmethod
+    def _run(
+        cls, alias: str, func: Callable[[List[Activity]], T], group
+    ) -> ShardResult[T]:
+        # Worker threads keep their own connections, the same way request
+        # threads do.
+        close_old_connections()
+        try:
+            with use_database(alias):
+                return cls._result(alias, func, group)
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def _result(
+        alias: str, func: Callable[[List[Activity]], T], group
+    ) -> ShardResult[T]:
+        try:
+            return ShardResult(alias=alias, activities=group, value=func(group))
+        except Exception as error:
+            return ShardResult(alias=alias, activities=group, error=error)
+
+
+activity_shards = ActivityShards()
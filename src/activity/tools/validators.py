@@ -0,0 +1,119 @@
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
+from activity.exceptions.activity_exceptions import InvalidActivity
+from activity.models import STATUSES, Activity
+
+
+CENT = Decimal("0.01")
+
+# Same format as "%Y-%m-%dT%H:%M:%S.%f" accepted by strptime before.
+ACTIVITY_DATE_PATTERN = re.compile(
+    r"(\d{4})-(\d{1,2})-(\d{1,2})T(\d{1,2}):(\d{1,2}):(\d{1,2})\.(\d{1,6})"
+)
+
+
+class ActivityValidator:
+    def __init__(self):
+        self._statuses = frozenset(status for status, _ in STATUSES)
+        self._id_max_length = Activity._meta.get_field("id").max_length
+        self._track_id_max_length = Activity._meta.get_field("track_id").max_length
+        amount_field = Activity._meta.get_field("billig_amount")
+        self._max_amount = Decimal(10) ** (
+            amount_field.max_digits - amount_field.decimal_places
+        )
+
+    def validate(self, data: Any) -> Activity:
+        try:
+            activity_id = data["id"]
+            activity_date = data["activity_date"]
+            track_id = data["track_id"]
+            status = data["status"]
+            billig_amount = data["billig_amount"]
+        except KeyError as error:
+            raise InvalidActivity(f"Missing {error.args[0]}")
+        except TypeError:
+            raise InvalidActivity("Activity has to be an object")
+
+        if not isinstance(activity_id, str) or len(activity_id) > self._id_max_length:
+            raise InvalidActivity("Invalid id")
+        if not isinstance(track_id, str) or len(track_id) > self._track_id_max_length:
+            raise InvalidActivity("Invalid track_id")
+        if status not in self._statuses:
+            raise InvalidActivity("Invalid status")
+
+        return Activity(
+            id=activity_id,
+            activity_date=self._parse_activity_date(value=activity_date),
+            track_id=track_id,
+            status=status,
+            billig_amount=self._parse_amount(value=billig_amount),
+        )
+
+    def is_valid(self, data: Any) -> bool:
+        try:
+            self.validate(data=data)
+        except InvalidActivity:
+            return False
+        return True
+
+    @staticmethod
+    def _parse_activity_date(value: Any) -> datetime:
+        if isinstance(value, datetime):
+            return value
+        # Canonical "2021-04-16T09:14:16.435742" dates are parsed natively.
+        if (
+            isinstance(value, str)
+            and len(value) == 26
+            and value[10] == "T"
+            and value[19] == "."
+            and value[20:].isdigit()
+        ):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                raise InvalidActivity("Invalid activity_date")
+
+        match = (
+            ACTIVITY_DATE_PATTERN.fullmatch(value) if isinstance(value, str) else None
+        )
+        if match is None:
+            raise InvalidActivity("Invalid activity_date")
+
+        year, month, day, hour, minute, second, fraction = match.groups()
+        try:
+            return datetime(
+                int(year),
+                int(month),
+                int(day),
+                int(hour),
+                int(minute),
+                int(second),
+                int(fraction.ljust(6, "0")),
+            )
+        except ValueError:
+            raise InvalidActivity("Invalid activity_date")
+
+    def _parse_amount(self, value: Any) -> Decimal:
+        if isinstance(value, bool):
+            raise InvalidActivity("Invalid billig_amount")
+        try:
+            if isinstance(value, float):
+                amount = Decimal(repr(value))
+            elif isinstance(value, (int, str, Decimal)):
+                amount = Decimal(value)
+            else:
+                raise InvalidActivity("Invalid billig_amount")
+        except InvalidOperation:
+            raise InvalidActivity("Invalid billig_amount")
+
+        if amount.is_finite() and abs(amount) < self._max_amount:
+            amount = amount.quantize(CENT)
+            if abs(amount) < self._max_amount:
+                return amount
+        raise InvalidActivity("Invalid billig_amount")
+
+
+activity_validator = ActivityValidator()
@@ -0,0 +1,116 @@
+from typing import List
+
+from django.db import connections, transaction
+
+from activity.models import Activity, ActivityKey
+from activity.tools.balances import activity_balancer
+from activity.tools.caches import activity_cache
+from activity.tools.checkpoints import activity_checkpointer
+from activity.tools.notifications import activity_notifier
+from activity.tools.replicas import activity_replicas
+from activity.tools.rollups import activity_rollups
+from activity.tools.shards import ShardResult, activity_shards
+from core.routers import database
+
+
+class ActivityWriter:
+    fields = ("id", "activity_date", "track_id", "status", "billig_amount")
+
+    def save(self, activities: List[Activity]) -> None:
+        for result in activity_shards.map(self._save, activities=activities):
+            result.get()
+
+    def save_new(self, activities: List[Activity]) -> List[Activity]:
+        # Skips IDs already stored and returns only the inserted activities,
+        # IDs have to be unique within the batch.
+        return [
+            activity
+            for result in self.save_new_per_shard(activities=activities)
+            for activity in result.get()
+        ]
+
+    def save_new_per_shard(
+        self, activities: List[Activity]
+    ) -> List[ShardResult[List[Activity]]]:
+        # The same as save_new, a shard that fails leaves the others stored.
+        return activity_shards.map(self._save_new, activities=activities)
+
+    def _save(self, activities: List[Activity]) -> None:
+        with transaction.atomic(using=database()):
+            Activity.objects.bulk_create(activities)
+            self._update_balances(activities=activities)
+
+    def _save_new(self, activities: List[Activity]) -> List[Activity]:
+        # Stores activities on the current shard.
+        if not activities:
+            return []
+
+        connection = connections[database()]
+        fields = [Activity._meta.get_field(name) for name in self.fields]
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+        row = f"({', '.join(['%s'] * len(fields))})"
+        params = [
+            field.get_db_prep_save(getattr(activity, field.attname), connection)
+            for activity in activities
+            for field in fields
+        ]
+        values = ", ".join([row] * len(activities))
+        table = connection.ops.quote_name(Activity._meta.db_table)
+        if connection.vendor == "postgresql":
+            sql = self._insert_registered_sql(
+                table=table, columns=columns, values=values, count=len(activities)
+            )
+            params = [activity.id for activity in activities] + params
+        else:
+            sql = (
+                f"INSERT INTO {table} ({columns}) VALUES {values} "
+                "ON CONFLICT (id) DO NOTHING RETURNING id"
+            )
+
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                created_ids = {created_id for created_id, in cursor.fetchall()}
+            created = [
+                activity for activity in activities if activity.id in created_ids
+            ]
+            self._update_balances(activities=created)
+        return created
+
+    @staticmethod
+    def _insert_registered_sql(
+        table: str, columns: str, values: str, count: int
+    ) -> str:
+        # The partitioned table cannot have a unique ID on its own, the ID
+        # registry takes the ON CONFLICT and the registering trigger is told
+        # to skip this one insert (migration 0006).
+        keys = connections[database()].ops.quote_name(ActivityKey._meta.db_table)
+        key_values = ", ".join(["(%s)"] * count)
+        return (
+            "SELECT set_config('activity.ids_registered', 'on', true); "
+            f"WITH new_ids AS (INSERT INTO {keys} (id) VALUES {key_values} "
+            "ON CONFLICT (id) DO NOTHING RETURNING id) "
+            f"INSERT INTO {table} ({columns}) SELECT {columns} "
+            f"FROM (VALUES {values}) AS activities ({columns}) "
+            "WHERE id IN (SELECT id FROM new_ids) RETURNING id"
+        )
+
+    @staticmethod
+    def _update_balances(activities: List[Activity]) -> None:
+        balances = activity_balancer.apply(activities=activities)
+        activity_checkpointer.adjust(activities=activities)
+        activity_rollups.apply(activities=activities)
+        aggregates = [activity_balancer.to_aggregate(balance) for balance in balances]
+        activity_notifier.publish(aggregates=aggregates)
+        track_ids = [aggregated_data["track_id"] for aggregated_data in aggregates]
+        # Entries are dropped rather than overwritten, commits of concurrent
+        # writers may run their callbacks in any order. Reads refill them.
+        transaction.on_commit(
+            lambda: activity_cache.delete(track_ids=track_ids), using=database()
+        )
+        transaction.on_commit(
+            lambda: activity_replicas.stick(track_ids=track_ids), using=database()
+        )
+
+
+activity_writer = ActivityWriter()
@@ -2,10 +2,25 @@ from typing import List
 
 from django.urls import path
 
-from activity.views import activity_create_view, activity_retrieve_view
+from activity.views import (
+    activity_aggregate_batch_view,
+    activity_bulk_create_view,
+    activity_cache_stats_view,
+    activity_create_view,
+    activity_history_view,
+    activity_queue_stats_view,
+    activity_retrieve_view,
+    activity_rollup_view,
+)
 
 
 urlpatterns: List[path] = [
+    path("aggregate/", activity_aggregate_batch_view, name="activity_aggregate_batch"),
+    path("bulk/", activity_bulk_create_view, name="activity_bulk_create"),
+    path("cache/stats/", activity_cache_stats_view, name="activity_cache_stats"),
+    path("queue/", activity_queue_stats_view, name="activity_queue_stats"),
+    path("rollups/", activity_rollup_view, name="activity_rollups"),
+    path("<str:track_id>/history/", activity_history_view, name="activity_history"),
     path("<str:track_id>/", activity_retrieve_view, name="activity_aggregate"),
     path("", activity_create_view, name="activity_create"),
 ]
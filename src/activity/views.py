@@ -1,52 +1,244 @@
+from django.conf import settings
+
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
+    HTTP_202_ACCEPTED,
     HTTP_400_BAD_REQUEST,
     HTTP_404_NOT_FOUND,
 )
 from rest_framework.views import APIView
 
+from activity.conditional import not_modified, version_headers
 from activity.exceptions.activity_exceptions import TrackIDDoesNotExists
-from activity.models import Activity
-from activity.serializers import ActivityAggregateSerializer, ActivitySerializer
-from activity.tools.aggregators import activity_aggregator
+from activity.idempotency import IDEMPOTENCY_KEY_HEADER, idempotent
+from activity.pagination import ActivityHistoryPagination
+from activity.serializers import (
+    ActivityAggregateBatchResultSerializer,
+    ActivityAggregateBatchSerializer,
+    ActivityAggregateQuerySerializer,
+    ActivityAggregateSerializer,
+    ActivityCacheStatsSerializer,
+    ActivityHistoryQuerySerializer,
+    ActivityHistorySerializer,
+    ActivityImportReportSerializer,
+    ActivityItemsReportSerializer,
+    ActivityQueuedSerializer,
+    ActivityQueueStatsSerializer,
+    ActivityRollupQuerySerializer,
+    ActivityRollupSeriesSerializer,
+    ActivitySerializer,
+)
+from activity.tools.caches import activity_cache
 from activity.tools.checkers import activity_checker
+from activity.tools.checkpoints import activity_checkpointer
+from activity.tools.importers import activity_importer
+from activity.tools.queues import activity_queue
+from activity.tools.readers import activity_reader
+from activity.tools.replicas import activity_replicas
+from activity.tools.rollups import activity_rollups
+from activity.tools.shards import activity_shards
+from activity.tools.writers import activity_writer
 
 
 class ActivityRetrieveView(APIView):
-    def get_queryset(self):
-        return Activity.objects.filter(track_id=self.kwargs["track_id"]).order_by(
-            "-activity_date"
-        )
-
-    @swagger_auto_schema(responses={200: ActivityAggregateSerializer, 404: "Not found"})
+    @swagger_auto_schema(
+        query_serializer=ActivityAggregateQuerySerializer,
+        manual_parameters=[
+            openapi.Parameter(
+                "If-None-Match",
+                openapi.IN_HEADER,
+                description="ETag of the aggregate the client already has",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+        responses={
+            200: ActivityAggregateSerializer,
+            304: "Not modified",
+            400: "Bad Request",
+            404: "Not found",
+        },
+    )
     def get(self, request: Request, **kwargs) -> Response:
         track_id = kwargs["track_id"]
+        query = ActivityAggregateQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        headers = {}
         try:
-            aggregated_data = activity_aggregator.aggregate(
-                activities=self.get_queryset()
-            )
-            return Response(aggregated_data, HTTP_200_OK)
+            if query.validated_data:
+                # Read before the aggregate, so the aggregate is never older
+                # than its ETag.
+                version = activity_reader.version(track_id=track_id)
+                aggregated_data = None
+            else:
+                aggregated_data, cached, version = activity_reader.retrieve(
+                    track_id=track_id
+                )
+                headers["X-Cache"] = "HIT" if cached else "MISS"
+            response = not_modified(request=request, version=version)
+            if response is not None:
+                return response
+            if aggregated_data is None:
+                with activity_shards.track(track_id=track_id):
+                    with activity_replicas.reads(track_ids=[track_id]):
+                        aggregated_data = activity_checkpointer.aggregate(
+                            track_id=track_id,
+                            as_of=query.validated_data.get("as_of"),
+                            date_from=query.validated_data.get("from"),
+                            date_to=query.validated_data.get("to"),
+                        )
         except TrackIDDoesNotExists:
             return Response(
                 {"message": f"Track ID {track_id} does not exists"},
                 HTTP_404_NOT_FOUND,
             )
+        if version is not None:
+            headers.update(version_headers(version=version))
+        return Response(aggregated_data, HTTP_200_OK, headers=headers)
 
 
 activity_retrieve_view = ActivityRetrieveView.as_view()
 
 
+class ActivityHistoryView(APIView):
+    pagination_class = ActivityHistoryPagination
+
+    @swagger_auto_schema(
+        query_serializer=ActivityHistoryQuerySerializer,
+        responses={
+            200: ActivityHistorySerializer,
+            400: "Bad Request",
+            404: "Invalid cursor",
+        },
+    )
+    def get(self, request: Request, **kwargs) -> Response:
+        query = ActivityHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        activities = activity_reader.history(
+            track_id=kwargs["track_id"],
+            statuses=query.validated_data.get("status"),
+            date_from=query.validated_data.get("from"),
+            date_to=query.validated_data.get("to"),
+        )
+        paginator = self.pagination_class()
+        with activity_shards.track(track_id=kwargs["track_id"]):
+            with activity_replicas.reads(track_ids=[kwargs["track_id"]]):
+                page = paginator.paginate_queryset(
+                    queryset=activities, request=request, view=self
+                )
+        return paginator.get_paginated_response(
+            ActivitySerializer(page, many=True).data
+        )
+
+
+activity_history_view = ActivityHistoryView.as_view()
+
+
+class ActivityRollupView(APIView):
+    @swagger_auto_schema(
+        operation_description="Net billing per hour or day of a track or of all tracks",
+        query_serializer=ActivityRollupQuerySerializer,
+        responses={200: ActivityRollupSeriesSerializer, 400: "Bad Request"},
+    )
+    def get(self, request: Request) -> Response:
+        query = ActivityRollupQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        series = activity_rollups.series(
+            granularity=query.validated_data["granularity"],
+            date_from=query.validated_data["from"],
+            date_to=query.validated_data["to"],
+            track_id=query.validated_data.get("track_id"),
+        )
+        return Response(
+            ActivityRollupSeriesSerializer(
+                {
+                    "track_id": query.validated_data.get("track_id"),
+                    "granularity": query.validated_data["granularity"],
+                    "results": series,
+                }
+            ).data,
+            HTTP_200_OK,
+        )
+
+
+activity_rollup_view = ActivityRollupView.as_view()
+
+
+class ActivityAggregateBatchView(APIView):
+    @swagger_auto_schema(
+        request_body=ActivityAggregateBatchSerializer,
+        responses={200: ActivityAggregateBatchResultSerializer, 400: "Bad Request"},
+    )
+    def post(self, request: Request) -> Response:
+        serializer = ActivityAggregateBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        track_ids = list(dict.fromkeys(serializer.validated_data["track_ids"]))
+        return Response(activity_reader.retrieve_many(track_ids=track_ids), HTTP_200_OK)
+
+
+activity_aggregate_batch_view = ActivityAggregateBatchView.as_view()
+
+
+class ActivityCacheStatsView(APIView):
+    @swagger_auto_schema(responses={200: ActivityCacheStatsSerializer})
+    def get(self, request: Request) -> Response:
+        return Response(
+            ActivityCacheStatsSerializer(activity_cache.stats()).data, HTTP_200_OK
+        )
+
+
+activity_cache_stats_view = ActivityCacheStatsView.as_view()
+
+
+class ActivityQueueStatsView(APIView):
+    @swagger_auto_schema(responses={200: ActivityQueueStatsSerializer})
+    def get(self, request: Request) -> Response:
+        return Response(
+            ActivityQueueStatsSerializer(activity_queue.stats()).data, HTTP_200_OK
+        )
+
+
+activity_queue_stats_view = ActivityQueueStatsView.as_view()
+
+
 class ActivityCreateView(APIView):
     @swagger_auto_schema(
         request_body=ActivitySerializer,
-        responses={201: "Created", 400: "Bad " "Request"},
+        manual_parameters=[
+            openapi.Parameter(
+                "results",
+                openapi.IN_QUERY,
+                description="items: store synchronously and report every activity",
+                type=openapi.TYPE_STRING,
+                enum=["items"],
+            ),
+            openapi.Parameter(
+                IDEMPOTENCY_KEY_HEADER,
+                openapi.IN_HEADER,
+                description="Replay the stored response of a retried request",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
+        responses={
+            200: ActivityItemsReportSerializer,
+            201: "Created",
+            202: ActivityQueuedSerializer,
+            400: "Bad " "Request",
+            409: "Request with the same Idempotency-Key is in progress",
+            422: "Idempotency-Key was used for a different request",
+        },
     )
+    @idempotent
     def post(self, request: Request) -> Response:
         activities = request.data
+        if request.query_params.get("results") == "items":
+            return self._store_items(activities=activities)
+        if settings.ACTIVITY_INGEST_MODE == "queue":
+            return self._enqueue(activities=activities)
         if isinstance(activities, list):
             unique_activities = (
                 activity_checker.prepare_unique_activities_possible_to_save(
@@ -59,21 +251,71 @@ class ActivityCreateView(APIView):
                     HTTP_400_BAD_REQUEST,
                 )
             else:
-                Activity.objects.bulk_create(unique_activities)
+                activity_writer.save(activities=unique_activities)
                 return Response(status=HTTP_201_CREATED)
         else:
-            if not activity_checker.check_possibility_to_save(data=activities):
+            activity = activity_checker.prepare_activity_possible_to_save(
+                data=activities
+            )
+            if activity is None:
                 return Response(
                     {"message": "Cannot store any activity"},
                     HTTP_400_BAD_REQUEST,
                 )
-            self._perform_create(data=activities)
+            activity_writer.save(activities=[activity])
             return Response(status=HTTP_201_CREATED)
 
-    def _perform_create(self, data: dict):
-        serializer = ActivitySerializer(data=data)
-        if serializer.is_valid(raise_exception=True):
-            serializer.save()
+    @staticmethod
+    def _store_items(activities) -> Response:
+        if not isinstance(activities, list):
+            activities = [activities]
+        report = activity_importer.import_items(items=activities)
+        if report.created:
+            status = HTTP_201_CREATED
+        elif report.duplicate:
+            status = HTTP_200_OK
+        else:
+            status = HTTP_400_BAD_REQUEST
+        return Response(ActivityItemsReportSerializer(report).data, status)
+
+    @staticmethod
+    def _enqueue(activities) -> Response:
+        # Only the shape is checked here, stored IDs are skipped by the worker.
+        if not isinstance(activities, list):
+            activities = [activities]
+        valid_activities = activity_checker.prepare_unique_valid_activities(
+            activities=activities
+        )
+        if not valid_activities:
+            return Response(
+                {"message": "Cannot store any activity"},
+                HTTP_400_BAD_REQUEST,
+            )
+        entry = activity_queue.enqueue(activities=valid_activities)
+        return Response(ActivityQueuedSerializer(entry).data, HTTP_202_ACCEPTED)
 
 
 activity_create_view = ActivityCreateView.as_view()
+
+
+class ActivityBulkCreateView(APIView):
+    @swagger_auto_schema(
+        operation_description="Store activities sent as newline-delimited JSON",
+        responses={
+            201: ActivityImportReportSerializer,
+            400: ActivityImportReportSerializer,
+        },
+    )
+    def post(self, request: Request) -> Response:
+        report = activity_importer.import_lines(
+            lines=request.stream or (), max_lines=settings.ACTIVITY_BULK_MAX_LINES
+        )
+        return Response(
+            ActivityImportReportSerializer(report).data,
+            HTTP_201_CREATED
+            if report.accepted or not report.complete
+            else HTTP_400_BAD_REQUEST,
+        )
+
+
+activity_bulk_create_view = ActivityBulkCreateView.as_view()
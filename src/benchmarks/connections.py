@@ -0,0 +1,122 @@
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.utils import load_backend
+
+from benchmarks.reports import LatencyReport
+
+
+@dataclass(frozen=True)
+class ConnectionMode:
+    name: str
+    max_age: Optional[int]
+    health_checks: bool = False
+    pooled: bool = False
+
+
+# Before persistent connections every request opened its own, the pooled
+# modes connect through PgBouncer (or any server given as the pooler).
+MODES = [
+    ConnectionMode(name="per request", max_age=0),
+    ConnectionMode(name="persistent", max_age=60),
+    ConnectionMode(name="persistent checked", max_age=60, health_checks=True),
+]
+POOLED_MODES = [
+    ConnectionMode(name="pooled per request", max_age=0, pooled=True),
+    ConnectionMode(
+        name="pooled persistent checked", max_age=60, health_checks=True, pooled=True
+    ),
+]
+
+
+@dataclass
+class ConnectionReport(LatencyReport):
+    connections: int = 0
+    setups: List[float] = field(default_factory=list)
+
+    def as_row(self) -> dict:
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections": self.connections,
+            "setup ms": round(statistics.mean(self.setups) * 1000, 3)
+            if self.setups
+            else "-",
+            "p50 ms": round(self.percentile(50) * 1000, 3),
+            "p95 ms": round(self.percentile(95) * 1000, 3),
+        }
+
+
+class ConnectionBenchmark:
+    # Every request of a mode runs on its own connection wrapper the way
+    # Django serves requests: obsolete connections are closed when a request
+    # starts and finishes, the first query connects (or checks the health of
+    # a kept connection). Setup is the time spent before the query can run.
+    query = "SELECT 1"
+
+    def __init__(
+        self,
+        requests: int = 500,
+        pooler_host: Optional[str] = None,
+        pooler_port: Optional[str] = None,
+        alias: str = DEFAULT_DB_ALIAS,
+    ):
+        self.requests = requests
+        self.pooler_host = pooler_host
+        self.pooler_port = pooler_port
+        self.alias = alias
+
+    @property
+    def modes(self) -> List[ConnectionMode]:
+        if self.pooler_host is None:
+            return MODES
+        return MODES + POOLED_MODES
+
+    def run(self) -> List[ConnectionReport]:
+        return [self._measure(mode=mode) for mode in self.modes]
+
+    def _wrapper(self, mode: ConnectionMode):
+        settings_dict = {
+            **connections.databases[self.alias],
+            "CONN_MAX_AGE": mode.max_age,
+            "CONN_HEALTH_CHECKS": mode.health_checks,
+        }
+        if mode.pooled:
+            settings_dict["HOST"] = self.pooler_host
+            settings_dict["PORT"] = self.pooler_port
+        backend = load_backend(settings_dict["ENGINE"])
+        return backend.DatabaseWrapper(settings_dict, f"benchmark_{self.alias}")
+
+    def _measure(self, mode: ConnectionMode) -> ConnectionReport:
+        wrapper = self._wrapper(mode=mode)
+        report = ConnectionReport(name=mode.name)
+        started = time.perf_counter()
+        try:
+            for _ in range(self.requests):
+                request_started = time.perf_counter()
+                wrapper.close_if_unusable_or_obsolete()
+                kept = wrapper.connection
+                try:
+                    wrapper.ensure_connection()
+                    setup = time.perf_counter() - request_started
+                    opened = wrapper.connection is not kept
+                    with wrapper.cursor() as cursor:
+                        cursor.execute(self.query)
+                        cursor.fetchone()
+                except DatabaseError:
+                    wrapper.close()
+                    report.errors += 1
+                    continue
+                finally:
+                    wrapper.close_if_unusable_or_obsolete()
+                report.connections += opened
+                report.setups.append(setup)
+                report.latencies.append(time.perf_counter() - request_started)
+        finally:
+            wrapper.close()
+        report.elapsed = time.perf_counter() - started
+        return report
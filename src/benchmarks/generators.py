@@ -0,0 +1,72 @@
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from random import Random
+from typing import Dict, Iterator, List, TextIO
+
+
+DEFAULT_STATUS_MIX = {"A": 0.2, "S": 0.5, "R": 0.3}
+
+
+@dataclass
+class ActivityGenerator:
+    # The same seed always gives the same activities, so runs of different
+    # releases replay exactly the same traffic.
+    tracks: int = 100
+    activities_per_track: int = 100
+    status_mix: Dict[str, float] = field(
+        default_factory=lambda: dict(DEFAULT_STATUS_MIX)
+    )
+    duplicate_ratio: float = 0.0
+    seed: int = 0
+    start: datetime = datetime(2021, 1, 1)
+
+    @property
+    def track_ids(self) -> List[str]:
+        return [f"T{index:09d}" for index in range(self.tracks)]
+
+    def generate(self) -> Iterator[dict]:
+        random = Random(self.seed)
+        statuses = list(self.status_mix)
+        weights = list(self.status_mix.values())
+        track_ids = self.track_ids if self.activities_per_track > 0 else []
+        remaining = [self.activities_per_track] * len(track_ids)
+        emitted: List[dict] = []
+        activity_date = self.start
+        index = 0
+
+        while track_ids:
+            position = random.randrange(len(track_ids))
+            track_id = track_ids[position]
+            remaining[position] -= 1
+            if not remaining[position]:
+                track_ids[position] = track_ids[-1]
+                remaining[position] = remaining[-1]
+                track_ids.pop()
+                remaining.pop()
+
+            activity_date += timedelta(microseconds=random.randint(1, 10_000_000))
+            activity = {
+                "id": f"G{index:019d}",
+                "activity_date": activity_date.strftime("%Y-%m-%dT%H:%M:%S.%f"),
+                "track_id": track_id,
+                "status": random.choices(statuses, weights)[0],
+                "billig_amount": round(random.uniform(0, 1000), 2),
+            }
+            index += 1
+            emitted.append(activity)
+            yield activity
+
+            if random.random() < self.duplicate_ratio:
+                yield dict(random.choice(emitted))
+
+    def write(self, output: TextIO) -> int:
+        count = 0
+        for activity in self.generate():
+            output.write(f"{json.dumps(activity)}\n")
+            count += 1
+        return count
+
+
+def read_activities(lines: TextIO) -> List[dict]:
+    return [json.loads(line) for line in lines if line.strip()]
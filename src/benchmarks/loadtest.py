@@ -0,0 +1,73 @@
+import time
+from http.client import HTTPConnection
+from queue import Empty, Queue
+from threading import Lock, Thread
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+from benchmarks.reports import LatencyReport
+
+
+class HttpLoadTest:
+    # Every worker keeps its own keep-alive connection, so the numbers show
+    # server throughput rather than TCP handshakes.
+    timeout = 10
+
+    def __init__(self, name: str, base_url: str):
+        url = urlsplit(base_url)
+        self.name = name
+        self.host = url.hostname
+        self.port = url.port
+        self.prefix = url.path.rstrip("/")
+
+    def run(
+        self,
+        paths: List[str],
+        concurrency: int,
+        method: str = "GET",
+        body: Optional[bytes] = None,
+        content_type: str = "application/json",
+    ) -> LatencyReport:
+        report = LatencyReport(name=self.name)
+        queue: Queue = Queue()
+        for path in paths:
+            queue.put(path)
+        lock = Lock()
+
+        def worker():
+            connection = HTTPConnection(self.host, self.port, timeout=self.timeout)
+            while True:
+                try:
+                    path = queue.get_nowait()
+                except Empty:
+                    break
+                started = time.perf_counter()
+                try:
+                    connection.request(
+                        method,
+                        f"{self.prefix}{path}",
+                        body=body,
+                        headers={"Content-Type": content_type},
+                    )
+                    response = connection.getresponse()
+                    response.read()
+                    failed = response.status >= 500
+                except OSError:
+                    connection.close()
+                    failed = True
+                latency = time.perf_counter() - started
+                with lock:
+                    if failed:
+                        report.errors += 1
+                    else:
+                        report.latencies.append(latency)
+            connection.close()
+
+        workers = [Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        report.elapsed = time.perf_counter() - started
+        return report
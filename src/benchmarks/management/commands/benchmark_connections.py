@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.connections import ConnectionBenchmark
+from benchmarks.reports import format_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the connection setup overhead of a connection per request with "
+        "persistent (and health checked) connections of the configured database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument(
+            "--pooler",
+            help="HOST:PORT of PgBouncer in front of the same database, "
+            "adds the pooled modes",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("--requests has to be positive")
+        pooler_host = pooler_port = None
+        if options["pooler"]:
+            pooler_host, _, pooler_port = options["pooler"].rpartition(":")
+            if not pooler_host or not pooler_port.isdigit():
+                raise CommandError(f"Invalid pooler {options['pooler']}")
+
+        benchmark = ConnectionBenchmark(
+            requests=options["requests"],
+            pooler_host=pooler_host,
+            pooler_port=pooler_port,
+        )
+        self.stdout.write(format_table(reports=benchmark.run()))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.reports import format_table
+from benchmarks.serialization import SerializationBenchmark
+from core import parsers
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare parse and render time of the stdlib JSON parser and renderer with "
+        "the orjson backed ones used by the API, no database is needed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1,1000,100000",
+            help="Comma separated numbers of activities per payload",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError(f"Invalid sizes {options['sizes']}")
+        if min(sizes) < 1:
+            raise CommandError("--sizes have to be positive")
+        if options["repeat"] < 1:
+            raise CommandError("--repeat has to be positive")
+        if parsers.orjson is None:
+            self.stderr.write("orjson is not installed, both sides use the stdlib")
+
+        benchmark = SerializationBenchmark(repeat=options["repeat"])
+        self.stdout.write(format_table(reports=benchmark.run(sizes=sizes)))
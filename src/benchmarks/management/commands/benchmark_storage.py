@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from benchmarks.management.commands.generate_activities import (
+    add_generator_arguments,
+    build_generator,
+)
+from benchmarks.reports import format_table
+from benchmarks.storage import StorageBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare size and scan speed of the wide and compact activity layouts on "
+        "generated activities, only temporary tables of the configured PostgreSQL "
+        "database are used"
+    )
+
+    def add_arguments(self, parser):
+        add_generator_arguments(parser)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("The storage benchmark needs PostgreSQL")
+        if options["repeat"] < 1:
+            raise CommandError("--repeat has to be positive")
+
+        benchmark = StorageBenchmark(repeat=options["repeat"])
+        reports = benchmark.run(activities=build_generator(options=options).generate())
+        self.stdout.write(format_table(reports=reports))
@@ -0,0 +1,60 @@
+from typing import Dict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.generators import DEFAULT_STATUS_MIX, ActivityGenerator
+
+
+def parse_status_mix(value: str) -> Dict[str, float]:
+    status_mix = {}
+    for part in value.split(","):
+        status, _, weight = part.partition("=")
+        try:
+            status_mix[status.strip()] = float(weight)
+        except ValueError:
+            raise CommandError(f"Invalid status weight {part}")
+    return status_mix
+
+
+def add_generator_arguments(parser) -> None:
+    parser.add_argument("--tracks", type=int, default=100)
+    parser.add_argument("--activities-per-track", type=int, default=100)
+    parser.add_argument(
+        "--status-mix",
+        default=",".join(f"{key}={value}" for key, value in DEFAULT_STATUS_MIX.items()),
+        help="Comma separated STATUS=WEIGHT pairs",
+    )
+    parser.add_argument(
+        "--duplicate-ratio",
+        type=float,
+        default=0.0,
+        help="Share of activities which are sent once more",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def build_generator(options: dict) -> ActivityGenerator:
+    return ActivityGenerator(
+        tracks=options["tracks"],
+        activities_per_track=options["activities_per_track"],
+        status_mix=parse_status_mix(options["status_mix"]),
+        duplicate_ratio=options["duplicate_ratio"],
+        seed=options["seed"],
+    )
+
+
+class Command(BaseCommand):
+    help = "Write reproducible synthetic activities as newline-delimited JSON"
+
+    def add_arguments(self, parser):
+        add_generator_arguments(parser)
+        parser.add_argument("--output", help="File to write, stdout by default")
+
+    def handle(self, *args, **options):
+        generator = build_generator(options=options)
+        if options["output"]:
+            with open(options["output"], "w") as output:
+                count = generator.write(output=output)
+        else:
+            count = generator.write(output=self.stdout)
+        self.stderr.write(f"Generated {count} activities")
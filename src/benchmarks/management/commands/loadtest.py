@@ -0,0 +1,70 @@
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from activity.models import TrackBalance
+from benchmarks.loadtest import HttpLoadTest
+from benchmarks.reports import format_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput and latency of the aggregate endpoint served by "
+        "different deployments, e.g. WSGI and ASGI"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            action="append",
+            dest="targets",
+            required=True,
+            help="NAME=URL with {track_id} placeholder, can be used multiple times",
+        )
+        parser.add_argument(
+            "--track-id",
+            action="append",
+            dest="track_ids",
+            help="Track ID to query, can be used multiple times",
+        )
+        parser.add_argument(
+            "--tracks",
+            type=int,
+            default=100,
+            help="Number of stored tracks to query when no track ID is given",
+        )
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=100)
+
+    def handle(self, *args, **options):
+        track_ids = options["track_ids"] or list(
+            TrackBalance.objects.order_by("track_id").values_list(
+                "track_id", flat=True
+            )[: options["tracks"]]
+        )
+        if not track_ids:
+            raise CommandError("There are no tracks to query")
+
+        reports = []
+        for target in options["targets"]:
+            name, _, url = target.partition("=")
+            if "{track_id}" not in url:
+                raise CommandError(f"Target {target} has no {{track_id}} placeholder")
+            url_parts = urlsplit(url)
+            load_test = HttpLoadTest(
+                name=name, base_url=f"{url_parts.scheme}://{url_parts.netloc}"
+            )
+            paths = [
+                url_parts.path.format(track_id=quote(track_ids[index % len(track_ids)]))
+                for index in range(options["requests"])
+            ]
+            if options["warmup"]:
+                load_test.run(
+                    paths=paths[: options["warmup"]],
+                    concurrency=options["concurrency"],
+                )
+            reports.append(
+                load_test.run(paths=paths, concurrency=options["concurrency"])
+            )
+        self.stdout.write(format_table(reports=reports))
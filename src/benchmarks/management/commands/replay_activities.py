@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from activity.tools.caches import activity_cache
+from benchmarks.generators import read_activities
+from benchmarks.management.commands.generate_activities import (
+    add_generator_arguments,
+    build_generator,
+)
+from benchmarks.replay import ActivityReplay, HttpTransport, TestClientTransport
+from benchmarks.reports import format_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay activities against the create and aggregate endpoints and report "
+        "throughput, latency and DB queries per endpoint. Without --url views run "
+        "in-process on a throwaway test database of the configured engine"
+    )
+
+    def add_arguments(self, parser):
+        add_generator_arguments(parser)
+        parser.add_argument(
+            "--input",
+            help="Newline-delimited JSON activities, generated when not given",
+        )
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server, e.g. http://localhost:8000",
+        )
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--reads-per-track", type=int, default=1)
+        parser.add_argument(
+            "--cold-reads",
+            action="store_true",
+            help="Clear the aggregate cache before reads, only without --url",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Reuse the throwaway test database between runs",
+        )
+
+    def handle(self, *args, **options):
+        if options["input"]:
+            with open(options["input"]) as lines:
+                activities = read_activities(lines=lines)
+        else:
+            activities = list(build_generator(options=options).generate())
+
+        if options["url"]:
+            reports = self._replay(
+                transport=HttpTransport(base_url=options["url"]),
+                activities=activities,
+                options=options,
+            )
+        else:
+            setup_test_environment()
+            old_config = setup_databases(
+                verbosity=0, interactive=False, keepdb=options["keepdb"]
+            )
+            try:
+                activity_cache.clear()
+                reports = self._replay(
+                    transport=TestClientTransport(),
+                    activities=activities,
+                    options=options,
+                )
+            finally:
+                teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+                teardown_test_environment()
+        self.stdout.write(format_table(reports=reports))
+
+    @staticmethod
+    def _replay(transport, activities: list, options: dict) -> list:
+        replay = ActivityReplay(
+            transport=transport,
+            batch_size=options["batch_size"],
+            reads_per_track=options["reads_per_track"],
+            cold_reads=options["cold_reads"],
+        )
+        return replay.run(activities=activities)
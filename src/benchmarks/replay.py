@@ -0,0 +1,148 @@
+import json
+import time
+from http.client import HTTPConnection
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from activity.tools.caches import activity_cache
+from benchmarks.reports import LatencyReport
+
+
+class QueryCounter:
+    # Request start resets the debug query log, so queries are counted on
+    # execution instead of using CaptureQueriesContext.
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class TestClientTransport:
+    # Views run in this process, so every request reports its DB queries too.
+    def __init__(self):
+        self.client = Client(raise_request_exception=False)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes = b"",
+        content_type: str = "application/json",
+    ) -> Tuple[int, Optional[int]]:
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            response = self.client.generic(
+                method, path, data=body, content_type=content_type
+            )
+        return response.status_code, queries.count
+
+    def close(self) -> None:
+        pass
+
+
+class HttpTransport:
+    timeout = 10
+
+    def __init__(self, base_url: str):
+        url = urlsplit(base_url)
+        self.prefix = url.path.rstrip("/")
+        self.connection = HTTPConnection(url.hostname, url.port, timeout=self.timeout)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes = b"",
+        content_type: str = "application/json",
+    ) -> Tuple[int, Optional[int]]:
+        self.connection.request(
+            method,
+            f"{self.prefix}{path}",
+            body=body or None,
+            headers={"Content-Type": content_type},
+        )
+        response = self.connection.getresponse()
+        response.read()
+        return response.status, None
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class ActivityReplay:
+    def __init__(
+        self,
+        transport,
+        batch_size: int = 100,
+        reads_per_track: int = 1,
+        cold_reads: bool = False,
+    ):
+        self.transport = transport
+        self.batch_size = batch_size
+        self.reads_per_track = reads_per_track
+        self.cold_reads = cold_reads
+
+    def run(self, activities: List[dict]) -> List[LatencyReport]:
+        track_ids = list(dict.fromkeys(activity["track_id"] for activity in activities))
+        try:
+            return [
+                self.create(activities=activities),
+                self.retrieve(track_ids=track_ids * self.reads_per_track),
+            ]
+        finally:
+            self.transport.close()
+
+    def create(self, activities: List[dict]) -> LatencyReport:
+        path = reverse("activity_create")
+        batches = []
+        for start in range(0, len(activities), self.batch_size):
+            end = start + self.batch_size
+            batches.append(json.dumps(activities[start:end]).encode())
+        return self._replay(
+            name="create", requests=[("POST", path, body) for body in batches]
+        )
+
+    def retrieve(self, track_ids: List[str]) -> LatencyReport:
+        if self.cold_reads:
+            # Writes fill the cache, clearing it measures the database path.
+            activity_cache.clear()
+        return self._replay(
+            name="retrieve",
+            requests=[
+                (
+                    "GET",
+                    reverse("activity_aggregate", kwargs={"track_id": track_id}),
+                    b"",
+                )
+                for track_id in track_ids
+            ],
+        )
+
+    def _replay(
+        self, name: str, requests: List[Tuple[str, str, bytes]]
+    ) -> LatencyReport:
+        report = LatencyReport(name=name)
+        started = time.perf_counter()
+        for method, path, body in requests:
+            request_started = time.perf_counter()
+            try:
+                status, queries = self.transport.request(method, path, body=body)
+            except OSError:
+                self.transport.close()
+                report.errors += 1
+                continue
+            latency = time.perf_counter() - request_started
+            if status >= 500:
+                report.errors += 1
+                continue
+            report.latencies.append(latency)
+            if queries is not None:
+                report.queries.append(queries)
+        report.elapsed = time.perf_counter() - started
+        return report
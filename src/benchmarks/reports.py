@@ -0,0 +1,65 @@
+import math
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class LatencyReport:
+    name: str
+    elapsed: float = 0.0
+    errors: int = 0
+    latencies: List[float] = field(default_factory=list)
+    queries: List[int] = field(default_factory=list)
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + self.errors
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        rank = max(math.ceil(percent / 100 * len(latencies)), 1)
+        return latencies[rank - 1]
+
+    @property
+    def queries_per_request(self) -> Optional[float]:
+        # Only known when the replay runs in the same process as the views.
+        if not self.queries:
+            return None
+        return sum(self.queries) / len(self.queries)
+
+    def as_row(self) -> dict:
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "errors": self.errors,
+            "req/s": round(self.throughput, 1),
+            "p50 ms": round(self.percentile(50) * 1000, 2),
+            "p95 ms": round(self.percentile(95) * 1000, 2),
+            "p99 ms": round(self.percentile(99) * 1000, 2),
+            "queries/req": "-"
+            if self.queries_per_request is None
+            else round(self.queries_per_request, 1),
+        }
+
+
+def format_table(reports: list) -> str:
+    rows = [report.as_row() for report in reports]
+    if not rows:
+        return ""
+    columns = list(rows[0])
+    widths = {
+        column: max(len(column), *(len(str(row[column])) for row in rows))
+        for column in columns
+    }
+    lines = ["  ".join(column.ljust(widths[column]) for column in columns)]
+    for row in rows:
+        lines.append(
+            "  ".join(str(row[column]).ljust(widths[column]) for column in columns)
+        )
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+import io
+import math
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Callable, Iterable, List
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from activity.models import Activity
+from activity.serializers import ActivitySerializer
+from benchmarks.generators import ActivityGenerator
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+@dataclass
+class SerializationReport:
+    name: str
+    size: int
+    stdlib: List[float] = field(default_factory=list)
+    fast: List[float] = field(default_factory=list)
+    equal: bool = True
+
+    def as_row(self) -> dict:
+        stdlib = statistics.median(self.stdlib)
+        fast = statistics.median(self.fast)
+        return {
+            "name": self.name,
+            "activities": self.size,
+            "stdlib ms": round(stdlib * 1000, 3),
+            "fast ms": round(fast * 1000, 3),
+            "speedup": round(stdlib / fast, 1) if fast else "-",
+            "equal": "yes" if self.equal else "NO",
+        }
+
+
+class SerializationBenchmark:
+    # Times JSONParser and JSONRenderer against their fast twins on the same
+    # payloads: an ingest request body, listed activities rendered from
+    # ActivitySerializer and track aggregates holding Decimal amounts. Only
+    # parsing and rendering are timed, the serializer runs once per size.
+    tracks = 100
+
+    def __init__(self, repeat: int = 5):
+        self.repeat = repeat
+
+    def run(self, sizes: Iterable[int]) -> List[SerializationReport]:
+        reports = []
+        for size in sizes:
+            activities = self._activities(size=size)
+            reports.append(self._parse(activities=activities))
+            reports.append(
+                self._render(
+                    name="render activities",
+                    size=size,
+                    data=ActivitySerializer(
+                        [self._activity(data=data) for data in activities], many=True
+                    ).data,
+                )
+            )
+            reports.append(
+                self._render(
+                    name="render aggregates",
+                    size=size,
+                    data={
+                        "results": [
+                            {
+                                "track_id": data["track_id"],
+                                "last_status": data["status"],
+                                "amount": Decimal(str(data["billig_amount"])),
+                            }
+                            for data in activities
+                        ]
+                    },
+                )
+            )
+        return reports
+
+    def _activities(self, size: int) -> List[dict]:
+        tracks = max(min(size, self.tracks), 1)
+        generator = ActivityGenerator(
+            tracks=tracks, activities_per_track=math.ceil(size / tracks)
+        )
+        return list(islice(generator.generate(), size))
+
+    @staticmethod
+    def _activity(data: dict) -> Activity:
+        return Activity(
+            id=data["id"],
+            activity_date=datetime.fromisoformat(data["activity_date"]),
+            track_id=data["track_id"],
+            status=data["status"],
+            billig_amount=Decimal(str(data["billig_amount"])),
+        )
+
+    def _parse(self, activities: List[dict]) -> SerializationReport:
+        body = JSONRenderer().render(activities)
+        report = SerializationReport(name="parse request", size=len(activities))
+        results = [
+            self._time(
+                timings=timings,
+                call=lambda: parser.parse(io.BytesIO(body), parser.media_type, {}),
+            )
+            for parser, timings in (
+                (JSONParser(), report.stdlib),
+                (FastJSONParser(), report.fast),
+            )
+        ]
+        report.equal = results[0] == results[1]
+        return report
+
+    def _render(self, name: str, size: int, data) -> SerializationReport:
+        report = SerializationReport(name=name, size=size)
+        results = [
+            self._time(timings=timings, call=lambda: renderer.render(data))
+            for renderer, timings in (
+                (JSONRenderer(), report.stdlib),
+                (FastJSONRenderer(), report.fast),
+            )
+        ]
+        report.equal = results[0] == results[1]
+        return report
+
+    def _time(self, timings: List[float], call: Callable):
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            result = call()
+            timings.append(time.perf_counter() - started)
+        return result
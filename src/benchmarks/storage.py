@@ -0,0 +1,169 @@
+import statistics
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Union
+
+from django.db import connection, transaction
+
+from activity.models import STATUS_CODES
+
+
+@dataclass(frozen=True)
+class StorageLayout:
+    name: str
+    columns: str
+    amount: str = "%s"
+    scale: Decimal = Decimal(1)
+    status_codes: Optional[Dict[str, int]] = None
+
+    def status(self, status: str) -> Union[str, int]:
+        if self.status_codes is None:
+            return status
+        return self.status_codes[status]
+
+    def status_literal(self, status: str) -> str:
+        if self.status_codes is None:
+            return f"'{status}'"
+        return str(self.status_codes[status])
+
+
+# The layout of activities before and after compacting, and the compact one
+# with a surrogate integer key in front of the external ID.
+LAYOUTS = [
+    StorageLayout(
+        name="wide",
+        columns=(
+            "id varchar(20) PRIMARY KEY, activity_date timestamptz NOT NULL, "
+            "track_id varchar(10) NOT NULL, status varchar(1) NOT NULL, "
+            "billig_amount numeric(8, 2) NOT NULL"
+        ),
+    ),
+    StorageLayout(
+        name="compact",
+        columns=(
+            "id varchar(20) PRIMARY KEY, activity_date timestamptz NOT NULL, "
+            "track_id varchar(10) NOT NULL, status smallint NOT NULL, "
+            "billig_amount bigint NOT NULL"
+        ),
+        amount="round(%s * 100)",
+        scale=Decimal(100),
+        status_codes=STATUS_CODES,
+    ),
+    StorageLayout(
+        name="surrogate",
+        columns=(
+            "key bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY, "
+            "id varchar(20) NOT NULL UNIQUE, activity_date timestamptz NOT NULL, "
+            "track_id varchar(10) NOT NULL, status smallint NOT NULL, "
+            "billig_amount bigint NOT NULL"
+        ),
+        amount="round(%s * 100)",
+        scale=Decimal(100),
+        status_codes=STATUS_CODES,
+    ),
+]
+
+
+@dataclass
+class StorageReport:
+    name: str
+    rows: int = 0
+    table_bytes: int = 0
+    index_bytes: int = 0
+    scans: List[float] = field(default_factory=list)
+    fetches: List[float] = field(default_factory=list)
+    totals: Dict[str, Decimal] = field(default_factory=dict)
+
+    def as_row(self) -> dict:
+        return {
+            "name": self.name,
+            "rows": self.rows,
+            "table kB": self.table_bytes // 1024,
+            "index kB": self.index_bytes // 1024,
+            "bytes/row": round((self.table_bytes + self.index_bytes) / self.rows, 1)
+            if self.rows
+            else "-",
+            "scan ms": round(statistics.median(self.scans) * 1000, 2),
+            "fetch ms": round(statistics.median(self.fetches) * 1000, 2),
+        }
+
+
+class StorageBenchmark:
+    # PostgreSQL only. Every layout is loaded into a temporary table with the
+    # same covering index as activities, then measured by size, by a track
+    # aggregate scanned in the database and by fetching the rows the Python
+    # aggregator reads.
+    table_prefix = "benchmark_activity"
+    batch_size = 1000
+
+    def __init__(self, repeat: int = 5):
+        self.repeat = repeat
+
+    def run(self, activities: Iterable[dict]) -> List[StorageReport]:
+        rows = list({activity["id"]: activity for activity in activities}.values())
+        with transaction.atomic(), connection.cursor() as cursor:
+            reports = [
+                self._measure(cursor=cursor, layout=layout, rows=rows)
+                for layout in LAYOUTS
+            ]
+            for layout in LAYOUTS:
+                cursor.execute(f"DROP TABLE {self._table(layout)}")
+        return reports
+
+    def _table(self, layout: StorageLayout) -> str:
+        return connection.ops.quote_name(f"{self.table_prefix}_{layout.name}")
+
+    def _measure(
+        self, cursor, layout: StorageLayout, rows: List[dict]
+    ) -> StorageReport:
+        table = self._table(layout)
+        cursor.execute(f"CREATE TEMPORARY TABLE {table} ({layout.columns})")
+        columns = "id, activity_date, track_id, status, billig_amount"
+        row_sql = f"(%s, %s, %s, %s, {layout.amount})"
+        for start in range(0, len(rows), self.batch_size):
+            end = start + self.batch_size
+            batch = rows[start:end]
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"VALUES {', '.join([row_sql] * len(batch))}",
+                [
+                    value
+                    for row in batch
+                    for value in (
+                        row["id"],
+                        row["activity_date"],
+                        row["track_id"],
+                        layout.status(row["status"]),
+                        Decimal(str(row["billig_amount"])),
+                    )
+                ],
+            )
+        cursor.execute(
+            f"CREATE INDEX ON {table} (track_id, activity_date, id) "
+            "INCLUDE (status, billig_amount)"
+        )
+        cursor.execute(f"ANALYZE {table}")
+
+        report = StorageReport(name=layout.name, rows=len(rows))
+        cursor.execute(f"SELECT pg_table_size('{table}'), pg_indexes_size('{table}')")
+        report.table_bytes, report.index_bytes = cursor.fetchone()
+
+        aggregate = (
+            f"SELECT track_id, sum(CASE status WHEN {layout.status_literal('S')} "
+            f"THEN billig_amount WHEN {layout.status_literal('R')} THEN -billig_amount "
+            f"ELSE 0 END) FROM {table} GROUP BY track_id"
+        )
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            cursor.execute(aggregate)
+            totals = cursor.fetchall()
+            report.scans.append(time.perf_counter() - started)
+        report.totals = {track_id: amount / layout.scale for track_id, amount in totals}
+
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            cursor.execute(f"SELECT status, billig_amount FROM {table}")
+            cursor.fetchall()
+            report.fetches.append(time.perf_counter() - started)
+        return report
@@ -0,0 +1,44 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+
+from benchmarks.connections import ConnectionBenchmark
+
+
+class ConnectionBenchmarkTest(TestCase):
+    def test_persistent_connections_are_reused(self):
+        benchmark = ConnectionBenchmark(
+            requests=5,
+            pooler_host=connection.settings_dict["HOST"],
+            pooler_port=connection.settings_dict["PORT"],
+        )
+        reports = benchmark.run()
+
+        self.assertEqual(
+            {report.name: report.connections for report in reports},
+            {
+                "per request": 5,
+                "persistent": 1,
+                "persistent checked": 1,
+                "pooled per request": 5,
+                "pooled persistent checked": 1,
+            },
+        )
+        self.assertEqual({report.requests for report in reports}, {5})
+        self.assertEqual({report.errors for report in reports}, {0})
+        self.assertEqual({len(report.setups) for report in reports}, {5})
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command("benchmark_connections", "--requests", "3", stdout=stdout)
+
+        lines = stdout.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("name"))
+        self.assertEqual(len(lines), 4)
+
+    def test_command_invalid_pooler(self):
+        with self.assertRaises(CommandError):
+            call_command("benchmark_connections", "--pooler", "pgbouncer")
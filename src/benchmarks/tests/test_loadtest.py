@@ -0,0 +1,71 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from activity.models import Activity
+from activity.tools.balances import activity_balancer
+from benchmarks.reports import LatencyReport, format_table
+
+
+class LatencyReportTest(SimpleTestCase):
+    def test_percentiles(self):
+        report = LatencyReport(
+            name="wsgi",
+            elapsed=2.0,
+            latencies=[index / 1000 for index in range(1, 101)],
+        )
+        self.assertEqual(report.requests, 100)
+        self.assertEqual(report.throughput, 50.0)
+        self.assertEqual(report.percentile(50), 0.05)
+        self.assertEqual(report.percentile(99), 0.099)
+        self.assertIn("p99 ms", format_table(reports=[report]))
+
+    def test_empty_report(self):
+        report = LatencyReport(name="asgi")
+        self.assertEqual(report.throughput, 0.0)
+        self.assertEqual(report.percentile(99), 0.0)
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    def setUp(self) -> None:
+        # Connections of the server threads are not kept, so the test
+        # database can be dropped at the end.
+        patcher = mock.patch.dict(connection.settings_dict, {"CONN_MAX_AGE": 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        Activity.objects.create(
+            id="1",
+            activity_date="2021-04-16T08:05:35.941465",
+            track_id="T123456",
+            status="S",
+            billig_amount=Decimal(10.54),
+        )
+        activity_balancer.rebuild()
+
+    def test_loadtest_sync_and_async_targets(self):
+        stdout = StringIO()
+        call_command(
+            "loadtest",
+            "--target",
+            f"wsgi={self.live_server_url}/v1/activity/{{track_id}}/",
+            "--target",
+            f"asgi={self.live_server_url}/v1/async/activity/{{track_id}}/",
+            "--requests",
+            "20",
+            "--concurrency",
+            "2",
+            "--warmup",
+            "0",
+            stdout=stdout,
+        )
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith("wsgi"))
+        self.assertTrue(lines[2].startswith("asgi"))
+        self.assertEqual(lines[1].split()[1:3], ["20", "0"])
+        self.assertEqual(lines[2].split()[1:3], ["20", "0"])
@@ -0,0 +1,114 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase
+
+from activity.models import Activity, TrackBalance
+from activity.tools.caches import activity_cache
+from benchmarks.generators import ActivityGenerator, read_activities
+from benchmarks.replay import ActivityReplay, TestClientTransport
+
+
+class ActivityGeneratorTest(SimpleTestCase):
+    def test_generate_is_reproducible(self):
+        generator = ActivityGenerator(tracks=5, activities_per_track=20, seed=7)
+        activities = list(generator.generate())
+
+        self.assertEqual(activities, list(generator.generate()))
+        self.assertEqual(len(activities), 100)
+        self.assertEqual(len({activity["id"] for activity in activities}), 100)
+        self.assertEqual(
+            {activity["track_id"] for activity in activities}, set(generator.track_ids)
+        )
+
+    def test_status_mix_and_duplicates(self):
+        generator = ActivityGenerator(
+            tracks=10,
+            activities_per_track=100,
+            status_mix={"S": 1, "R": 0},
+            duplicate_ratio=0.2,
+        )
+        activities = list(generator.generate())
+        unique_ids = {activity["id"] for activity in activities}
+
+        self.assertEqual(len(unique_ids), 1000)
+        self.assertAlmostEqual(len(activities) / len(unique_ids), 1.2, delta=0.05)
+        self.assertEqual({activity["status"] for activity in activities}, {"S"})
+
+    def test_write_and_read(self):
+        generator = ActivityGenerator(tracks=2, activities_per_track=3)
+        output = StringIO()
+
+        self.assertEqual(generator.write(output=output), 6)
+        output.seek(0)
+        self.assertEqual(read_activities(lines=output), list(generator.generate()))
+
+    def test_generate_command_invalid_status_mix(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "generate_activities", "--status-mix", "S=x", stdout=StringIO()
+            )
+
+
+class ActivityReplayTest(TestCase):
+    def setUp(self) -> None:
+        activity_cache.clear()
+        self.activities = list(
+            ActivityGenerator(
+                tracks=4, activities_per_track=10, duplicate_ratio=0.1
+            ).generate()
+        )
+
+    def test_replay_in_process(self):
+        replay = ActivityReplay(
+            transport=TestClientTransport(),
+            batch_size=15,
+            reads_per_track=2,
+            cold_reads=True,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            create, retrieve = replay.run(activities=self.activities)
+
+        self.assertEqual(create.name, "create")
+        self.assertEqual(create.requests, -(-len(self.activities) // 15))
+        self.assertEqual(create.errors, 0)
+        self.assertEqual(len(create.queries), create.requests)
+        self.assertEqual(retrieve.requests, 8)
+        self.assertEqual(retrieve.errors, 0)
+        self.assertEqual(retrieve.queries, [1] * 4 + [0] * 4)
+        self.assertEqual(Activity.objects.count(), 40)
+        self.assertEqual(TrackBalance.objects.count(), 4)
+
+
+class ReplayCommandTest(LiveServerTestCase):
+    def setUp(self) -> None:
+        # Connections of the server threads are not kept, so the test
+        # database can be dropped at the end.
+        patcher = mock.patch.dict(connection.settings_dict, {"CONN_MAX_AGE": 0})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_replay_against_server(self):
+        stdout = StringIO()
+        call_command(
+            "replay_activities",
+            "--url",
+            self.live_server_url,
+            "--tracks",
+            "3",
+            "--activities-per-track",
+            "5",
+            "--batch-size",
+            "5",
+            stdout=stdout,
+        )
+        lines = stdout.getvalue().splitlines()
+
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[1].split()[:3], ["create", "3", "0"])
+        self.assertEqual(lines[2].split()[:3], ["retrieve", "3", "0"])
+        self.assertEqual(lines[2].split()[-1], "-")
+        self.assertEqual(Activity.objects.count(), 15)
@@ -0,0 +1,36 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from benchmarks.serialization import SerializationBenchmark
+
+
+class SerializationBenchmarkTest(SimpleTestCase):
+    def test_fast_classes_give_the_same_results(self):
+        reports = SerializationBenchmark(repeat=2).run(sizes=[1, 150])
+
+        self.assertEqual(
+            [(report.name, report.size) for report in reports],
+            [
+                ("parse request", 1),
+                ("render activities", 1),
+                ("render aggregates", 1),
+                ("parse request", 150),
+                ("render activities", 150),
+                ("render aggregates", 150),
+            ],
+        )
+        self.assertTrue(all(report.equal for report in reports))
+        self.assertEqual({len(report.fast) for report in reports}, {2})
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command(
+            "benchmark_json", "--sizes", "1,10", "--repeat", "1", stdout=stdout
+        )
+
+        lines = stdout.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("name"))
+        self.assertEqual(len(lines), 7)
+        self.assertNotIn("NO", stdout.getvalue())
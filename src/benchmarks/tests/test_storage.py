@@ -0,0 +1,44 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from benchmarks.generators import ActivityGenerator
+from benchmarks.storage import StorageBenchmark
+
+
+class StorageBenchmarkTest(TestCase):
+    def test_layouts_hold_the_same_activities(self):
+        generator = ActivityGenerator(tracks=5, activities_per_track=40, seed=3)
+        reports = StorageBenchmark(repeat=2).run(activities=generator.generate())
+        wide, compact, surrogate = reports
+
+        self.assertEqual(
+            [report.name for report in reports], ["wide", "compact", "surrogate"]
+        )
+        self.assertEqual({report.rows for report in reports}, {200})
+        self.assertEqual(len(wide.totals), 5)
+        self.assertEqual(compact.totals, wide.totals)
+        self.assertEqual(surrogate.totals, wide.totals)
+        self.assertLessEqual(compact.table_bytes, wide.table_bytes)
+        self.assertGreater(surrogate.index_bytes, compact.index_bytes)
+        self.assertEqual(len(compact.scans), 2)
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command(
+            "benchmark_storage",
+            "--tracks",
+            "2",
+            "--activities-per-track",
+            "10",
+            "--repeat",
+            "1",
+            stdout=stdout,
+        )
+
+        lines = stdout.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("name"))
+        self.assertEqual(
+            [line.split()[0] for line in lines[1:]], ["wide", "compact", "surrogate"]
+        )
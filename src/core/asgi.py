@@ -14,4 +14,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once apps are loaded.
+from activity.streams import STREAM_PATH, balance_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Balance streams are served next to Django, see activity.streams.
+    if scope["type"] == "http" and scope["path"] == STREAM_PATH:
+        await balance_stream(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,36 @@
+from django.db.backends.postgresql import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # PostgreSQL backend with CONN_HEALTH_CHECKS of later Django releases: a
+    # persistent connection is checked once per request, right before its
+    # first use, and replaced when the server dropped it while it was idle,
+    # instead of failing that request.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_enabled = self.settings_dict.get("CONN_HEALTH_CHECKS", False)
+        self.health_check_done = False
+
+    def connect(self):
+        # New connections are healthy.
+        self.health_check_done = True
+        super().connect()
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None
+            and self.health_check_enabled
+            and not self.health_check_done
+            and not self.in_atomic_block
+        ):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        # Runs when requests start and finish, its autocommit lookup is not a
+        # use of the connection.
+        self.health_check_done = True
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
@@ -0,0 +1,173 @@
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Tuple
+
+
+Labels = Tuple[Tuple[str, str], ...]
+
+DURATION_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, value: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + value
+
+    def clear(self) -> None:
+        self.values.clear()
+
+    def expose(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(labels)} {format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.counts: Dict[Labels, List[int]] = {}
+        self.sums: Dict[Labels, float] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        if labels not in self.counts:
+            self.counts[labels] = [0] * (len(self.buckets) + 1)
+            self.sums[labels] = 0
+        self.counts[labels][bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def clear(self) -> None:
+        self.counts.clear()
+        self.sums.clear()
+
+    def expose(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, counts in sorted(self.counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else format_value(bound)
+                bucket_labels = format_labels(labels + (("le", le),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            total = format_value(self.sums[labels])
+            lines.append(f"{self.name}_sum{format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {cumulative}")
+        return lines
+
+
+class RequestMetrics:
+    # Metrics live in the memory of a single worker process, every worker
+    # exposes its own numbers.
+    def __init__(self):
+        self.lock = Lock()
+        self.requests = Counter(
+            "http_requests_total", "Number of handled requests by status"
+        )
+        self.duration = Histogram(
+            "http_request_duration_seconds",
+            "Total time spent handling requests",
+            DURATION_BUCKETS,
+        )
+        self.db_duration = Histogram(
+            "http_request_db_duration_seconds",
+            "Time spent on database queries per request",
+            DURATION_BUCKETS,
+        )
+        self.serialization_duration = Histogram(
+            "http_request_serialization_duration_seconds",
+            "Time spent rendering responses",
+            DURATION_BUCKETS,
+        )
+        self.db_queries = Histogram(
+            "http_request_db_queries",
+            "Number of database queries per request",
+            QUERY_BUCKETS,
+        )
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def observe(
+        self,
+        view: str,
+        method: str,
+        status: int,
+        duration: float,
+        db_duration: float,
+        db_queries: int,
+        serialization_duration: float,
+    ) -> None:
+        labels = (("view", view), ("method", method))
+        with self.lock:
+            self.requests.inc(labels + (("status", str(status)),))
+            self.duration.observe(labels, duration)
+            self.db_duration.observe(labels, db_duration)
+            self.db_queries.observe(labels, db_queries)
+            self.serialization_duration.observe(labels, serialization_duration)
+
+    def register_collector(self, collector: Callable[[], List[str]]) -> None:
+        self.collectors.append(collector)
+
+    @property
+    def metrics(self) -> tuple:
+        return (
+            self.requests,
+            self.duration,
+            self.db_duration,
+            self.db_queries,
+            self.serialization_duration,
+        )
+
+    def expose(self) -> str:
+        with self.lock:
+            lines = [line for metric in self.metrics for line in metric.expose()]
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self.lock:
+            for metric in self.metrics:
+                metric.clear()
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,93 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+from django.http import HttpRequest, HttpResponse
+
+from core.metrics import request_metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.db_queries = 0
+        self.db_duration = 0.0
+        self.serialization_duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_duration += time.perf_counter() - started
+
+
+class RequestMetricsMiddleware:
+    # Queries of views that hand the ORM to other threads (async views) are
+    # not seen here, their DB numbers are part of the total time only.
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        timing = RequestTiming()
+        request.timing = timing
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        view = getattr(request.resolver_match, "view_name", None) or "unresolved"
+        db_ms = round(timing.db_duration * 1000, 2)
+        serialize_ms = round(timing.serialization_duration * 1000, 2)
+        total_ms = round(duration * 1000, 2)
+        response["Server-Timing"] = (
+            f'db;dur={db_ms};desc="{timing.db_queries} queries", '
+            f"serialize;dur={serialize_ms}, total;dur={total_ms}"
+        )
+        request_metrics.observe(
+            view=view,
+            method=request.method,
+            status=response.status_code,
+            duration=duration,
+            db_duration=timing.db_duration,
+            db_queries=timing.db_queries,
+            serialization_duration=timing.serialization_duration,
+        )
+        logger.info(
+            json.dumps(
+                {
+                    "event": "request",
+                    "view": view,
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "db_queries": timing.db_queries,
+                    "db_ms": db_ms,
+                    "serialize_ms": serialize_ms,
+                    "total_ms": total_ms,
+                }
+            )
+        )
+        return response
+
+    def process_template_response(
+        self, request: HttpRequest, response: HttpResponse
+    ) -> HttpResponse:
+        # DRF responses are rendered right after this hook, the post render
+        # callback closes the measurement.
+        timing = getattr(request, "timing", None)
+        if timing is not None:
+            started = time.perf_counter()
+
+            def stop(rendered: HttpResponse) -> None:
+                timing.serialization_duration += time.perf_counter() - started
+
+            response.add_post_render_callback(stop)
+        return response
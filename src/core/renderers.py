@@ -0,0 +1,35 @@
+from rest_framework.renderers import JSONRenderer
+
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    # orjson encodes the containers and strings, everything it does not take
+    # as is (datetimes, Decimal, lazy strings) goes through the DRF encoder,
+    # so responses match JSONRenderer. Pretty printed, ASCII only or
+    # non-compact output and values orjson refuses (ints over 64 bits) are
+    # rendered by JSONRenderer itself, as is everything without orjson.
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Strict javascript subset, the same as JSONRenderer.
+        return ret.replace("\u2028".encode(), b"\\u2028").replace(
+            "\u2029".encode(), b"\\u2029"
+        )
@@ -0,0 +1,73 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+replica_reads_enabled: ContextVar[bool] = ContextVar(
+    "replica_reads_enabled", default=False
+)
+current_database: ContextVar[str] = ContextVar(
+    "current_database", default=DEFAULT_DB_ALIAS
+)
+
+
+@contextmanager
+def replica_reads(enabled: bool = True) -> Iterator[None]:
+    token = replica_reads_enabled.set(enabled)
+    try:
+        yield
+    finally:
+        replica_reads_enabled.reset(token)
+
+
+@contextmanager
+def use_database(alias: str) -> Iterator[None]:
+    token = current_database.set(alias)
+    try:
+        yield
+    finally:
+        current_database.reset(token)
+
+
+def database() -> str:
+    return current_database.get()
+
+
+class DatabaseRouter:
+    # Sharded models (settings.ACTIVITY_SHARDED_MODELS) go to the shard set
+    # by use_database(), the rest always to the default database. Reads of
+    # the default database go to a random replica only inside
+    # replica_reads(), which the read paths enter when they can live with
+    # replication lag. Everything else (writes, reads of a write path, reads
+    # of instances loaded from a replica) stays on the primary.
+    def db_for_read(self, model, **hints) -> str:
+        alias = self._database(model)
+        if (
+            alias == DEFAULT_DB_ALIAS
+            and replica_reads_enabled.get()
+            and settings.DATABASE_REPLICAS
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return alias
+
+    def db_for_write(self, model, **hints) -> str:
+        return self._database(model)
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, **hints) -> Optional[bool]:
+        # Replicas get the schema from the primary, shards get all of it.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+    @staticmethod
+    def _database(model) -> str:
+        if model._meta.label_lower in settings.ACTIVITY_SHARDED_MODELS:
+            return current_database.get()
+        return DEFAULT_DB_ALIAS
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -41,11 +41,13 @@ INSTALLED_APPS = [
     "health_check.contrib.psutil",
     # project apps
     "activity",
+    "benchmarks",
 ]
 
 SITE_ID = 1
 
 MIDDLEWARE = [
+    "core.middleware.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -62,6 +64,15 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.AllowAny",),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 TEMPLATES = [
@@ -88,15 +99,82 @@ WSGI_APPLICATION = "core.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": os.environ.get("DB_ENGINE", "core.backends.postgresql"),
         "HOST": os.environ.get("DB_HOST"),
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
         "PORT": os.environ.get("DB_PORT"),
+        # Every worker (and every thread of the async views) keeps its
+        # connection for this many seconds, 0 opens one per request.
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "True") == "True",
+        # Needed behind PgBouncer in transaction pooling mode.
+        "DISABLE_SERVER_SIDE_CURSORS": os.environ.get(
+            "DB_DISABLE_SERVER_SIDE_CURSORS", "False"
+        )
+        == "True",
     }
 }
 
+# Shards of activities, comma separated HOST[:PORT][/NAME]. Every track lives
+# on one of "default" and these, picked by consistent hashing of its ID.
+ACTIVITY_SHARDS = ["default"]
+for index, shard in enumerate(os.environ.get("DB_SHARD_HOSTS", "").split(",")):
+    if not shard.strip():
+        continue
+    shard_address, _, shard_name = shard.strip().partition("/")
+    shard_host, _, shard_port = shard_address.partition(":")
+    ACTIVITY_SHARDS.append(f"shard_{index + 1}")
+    DATABASES[ACTIVITY_SHARDS[-1]] = {
+        **DATABASES["default"],
+        "HOST": shard_host,
+        "PORT": shard_port or DATABASES["default"]["PORT"],
+        "NAME": shard_name or DATABASES["default"]["NAME"],
+    }
+ACTIVITY_SHARDED_MODELS = [
+    "activity.activity",
+    "activity.activitykey",
+    "activity.activityarchive",
+    "activity.trackbalance",
+    "activity.trackcheckpoint",
+    "activity.trackrollup",
+]
+# Threads writing per shard batches of one request side by side.
+ACTIVITY_SHARD_WRITERS = int(os.environ.get("ACTIVITY_SHARD_WRITERS", 4))
+# Direct addresses of "default" and the shards, comma separated HOST[:PORT] in
+# the order of DB_SHARD_HOSTS, used by the LISTEN connections of balance
+# streams. LISTEN does not work through PgBouncer in transaction mode, empty
+# entries connect the same way as the other connections.
+DATABASE_LISTEN_ADDRESSES: Dict[str, Dict[str, str]] = {}
+for alias, address in zip(
+    ACTIVITY_SHARDS, os.environ.get("DB_LISTEN_HOSTS", "").split(",")
+):
+    if not address.strip():
+        continue
+    listen_host, _, listen_port = address.strip().partition(":")
+    DATABASE_LISTEN_ADDRESSES[alias] = {
+        "host": listen_host,
+        "port": listen_port or DATABASES[alias]["PORT"],
+    }
+
+# Read replicas of the default database, comma separated HOST[:PORT]. Reads
+# of tracks without a write in the last DB_REPLICA_STICKY_SECONDS go to them.
+DATABASE_REPLICAS: List[str] = []
+for index, replica in enumerate(os.environ.get("DB_REPLICA_HOSTS", "").split(",")):
+    if not replica.strip():
+        continue
+    replica_host, _, replica_port = replica.strip().partition(":")
+    DATABASE_REPLICAS.append(f"replica_{index + 1}")
+    DATABASES[DATABASE_REPLICAS[-1]] = {
+        **DATABASES["default"],
+        "HOST": replica_host,
+        "PORT": replica_port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
+DATABASE_ROUTERS = ["core.routers.DatabaseRouter"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -148,6 +226,49 @@ HEALTH_CHECK = {
     "MEMORY_MIN": 150,
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/ref/settings/#caches
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "activity": {
+        "BACKEND": os.environ.get(
+            "ACTIVITY_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("ACTIVITY_CACHE_LOCATION", "activity"),
+        "TIMEOUT": int(os.environ.get("ACTIVITY_CACHE_TTL", 60)),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.environ.get("ACTIVITY_CACHE_MAX_ENTRIES", 10000)),
+        },
+    },
+}
+
+# Activities
+ACTIVITY_AGGREGATOR_ENGINE = os.environ.get("ACTIVITY_AGGREGATOR_ENGINE", "database")
+ACTIVITY_CACHE_ALIAS = "activity"
+# Store activity statuses as smallint codes and amounts as bigint cents instead
+# of one-letter strings and numeric. Set it before migrate creates the tables,
+# compact_activity_storage converts databases migrated without it.
+ACTIVITY_COMPACT_STORAGE = os.environ.get("ACTIVITY_COMPACT_STORAGE", "False") == "True"
+# "sync" stores activities in the request, "queue" only enqueues them for the
+# drain_activity_queue worker.
+ACTIVITY_INGEST_MODE = os.environ.get("ACTIVITY_INGEST_MODE", "sync")
+# Lines stored by one request to /v1/activity/bulk/, the report tells where to
+# resume. Keeps a request well within the uwsgi harakiri timeout (start.sh).
+ACTIVITY_BULK_MAX_LINES = int(os.environ.get("ACTIVITY_BULK_MAX_LINES", 10000))
+# Responses of requests sent with an Idempotency-Key header are replayed for
+# that long (seconds), they are kept in the database until
+# purge_idempotency_keys deletes them.
+ACTIVITY_IDEMPOTENCY_TTL = int(os.environ.get("ACTIVITY_IDEMPOTENCY_TTL", 86400))
+# Balance changes reach stream subscribers of other processes through
+# "postgresql" LISTEN/NOTIFY, "memory" delivers them only within the process.
+# "none" turns balance streams off and ingest sends no notifications.
+ACTIVITY_EVENTS_BACKEND = os.environ.get("ACTIVITY_EVENTS_BACKEND", "postgresql")
+# Seconds between keep-alive comments of idle balance streams.
+ACTIVITY_STREAM_HEARTBEAT = int(os.environ.get("ACTIVITY_STREAM_HEARTBEAT", 15))
+
 # Logging
 default_log_level = "DEBUG" if DEBUG else "INFO"
 LOGGING = {
@@ -167,5 +288,10 @@ LOGGING = {
             "propagate": False,
         },
         "django": {"level": "WARNING", "handlers": ["console"], "propagate": True},
+        "core.middleware": {
+            "level": os.environ.get("REQUEST_METRICS_LOG_LEVEL", "INFO"),
+            "handlers": ["console"],
+            "propagate": False,
+        },
     },
 }
@@ -9,6 +9,8 @@ from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework.permissions import AllowAny
 
+from core.views import metrics_view
+
 
 schema_view = get_schema_view(
     openapi.Info(title="Butter Activities API", default_version="v1"),
@@ -21,6 +23,7 @@ urlpatterns: List[path] = (
         path("admin/", admin.site.urls),
         path("v1/", include("core.v1_urls")),
         path("health/", include("health_check.urls")),
+        path("metrics/", metrics_view, name="metrics"),
     ]
     + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -3,4 +3,7 @@ from typing import List
 from django.urls import include, path
 
 
-urlpatterns: List[path] = [path("activity/", include("activity.urls"))]
+urlpatterns: List[path] = [
+    path("activity/", include("activity.urls")),
+    path("async/activity/", include("activity.async_urls")),
+]
@@ -0,0 +1,9 @@
+from django.http import HttpRequest, HttpResponse
+
+from core.metrics import request_metrics
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    return HttpResponse(
+        request_metrics.expose(), content_type="text/plain; version=0.0.4"
+    )
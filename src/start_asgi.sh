@@ -0,0 +1,8 @@
+#!/bin/sh
+cores=$(nproc --all)
+workers=$(($((cores))*2+1))
+uvicorn core.asgi:application \
+--host 0.0.0.0 \
+--port 8001 \
+--workers "${workers}" \
+--limit-max-requests 2000